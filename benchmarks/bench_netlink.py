@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark status parsing: netlink replies vs ``wg show all dump`` text.
+
+Parses the committed fixtures (or a recorded file given with --file) and
+a synthetic N interfaces x M peers dump built in memory, checks that both
+parsers agree, and prints the time per parse.  The CLI backend also pays
+a fork/exec of ``wg`` on every query, so "+exec" adds the cost of
+running a trivial program (``true``) to the dump parse; that still leaves
+out the netlink work wg itself does.  With --live, also times a real
+query through each backend (needs root and the WireGuard module).
+
+    python3 benchmarks/bench_netlink.py --interfaces 4 --peers 5000
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import netlink_fixtures  # noqa: E402
+from wireguard_gui.netlink import NetlinkBackend, parse_replies  # noqa: E402
+from wireguard_gui.status import CliBackend, StatusError, parse_dump  # noqa: E402
+
+
+def best_of(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def exec_cost(repeat):
+    """Seconds to run a program that does nothing, the way CliBackend runs wg."""
+    return best_of(lambda: subprocess.check_output(["true"]), repeat)
+
+
+def report(label, binary, text, repeat, spawn=0.0):
+    parsed = parse_replies(binary)
+    peers = sum(len(i.peers) for i in parsed.values())
+    if text is not None and parse_dump(text) != parsed:
+        print("%-28s MISMATCH between netlink and dump parsers" % label)
+        return False
+    line = "%-28s %6d peers  netlink %8.2f ms" % (label, peers, best_of(lambda: parse_replies(binary), repeat) * 1e3)
+    if text is not None:
+        dump = best_of(lambda: parse_dump(text), repeat)
+        line += "  dump %8.2f ms  +exec %8.2f ms" % (dump * 1e3, (dump + spawn) * 1e3)
+    print(line)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interfaces", type=int, default=4)
+    parser.add_argument("--peers", type=int, default=2500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--file", help="recorded netlink replies to parse")
+    parser.add_argument("--live", action="store_true", help="also time real backend queries")
+    args = parser.parse_args()
+
+    ok = True
+    spawn = exec_cost(args.repeat)
+    if args.file:
+        with open(args.file, "rb") as f:
+            ok &= report(os.path.basename(args.file), f.read(), None, args.repeat)
+    for path in sorted(glob.glob(os.path.join(netlink_fixtures.FIXTURE_DIR, "*.bin"))):
+        with open(path, "rb") as f:
+            binary = f.read()
+        with open(path[:-4] + ".dump") as f:
+            text = f.read()
+        ok &= report(os.path.basename(path), binary, text, args.repeat, spawn)
+
+    devices = netlink_fixtures.synthetic_devices(args.interfaces, args.peers)
+    ok &= report("synthetic %dx%d" % (args.interfaces, args.peers),
+                 netlink_fixtures.encode_dump(devices), netlink_fixtures.dump_text(devices),
+                 args.repeat, spawn)
+
+    if args.live:
+        for backend in (NetlinkBackend(), CliBackend()):
+            try:
+                seconds = best_of(backend.dump, args.repeat)
+                print("%-28s live query %8.2f ms" % (backend.name, seconds * 1e3))
+            except StatusError as e:
+                print("%-28s unavailable: %s" % (backend.name, e))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
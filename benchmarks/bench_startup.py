@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Benchmark GUI startup: time to first paint, interface list and status.
+
+Starts wireguard-gui.py repeatedly under Xvfb against a throwaway
+environment (see benchmarks/stubs.py: HOME, state directory, generated
+configs and stub ``wg``/``wg-quick``/``sudo``), so runs are reproducible
+and never touch the real system.  The GUI writes its startup milestones
+(see wireguard_gui/startup.py) and closes itself; milestones are reported
+in milliseconds after the process was spawned.
+
+    python3 benchmarks/bench_startup.py --runs 10 --configs 50 --save startup.json
+
+Without Xvfb installed, --display runs against an existing X server.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import StubEnvironment, start_xvfb  # noqa: E402
+from wireguard_gui.startup import MILESTONES, TRACE_ENV  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI = os.path.join(ROOT, "wireguard-gui.py")
+RUN_TIMEOUT = 60
+
+
+def run_once(env, trace):
+    """One GUI start; returns {milestone: ms after spawn}."""
+    if os.path.exists(trace):
+        os.unlink(trace)
+    env = dict(env, **{TRACE_ENV: trace})
+    started = time.monotonic()
+    proc = subprocess.Popen([sys.executable, GUI], env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        _, stderr = proc.communicate(timeout=RUN_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        raise RuntimeError("the GUI did not reach all milestones within %ds" % RUN_TIMEOUT)
+    exited = time.monotonic()
+    marks = {}
+    if os.path.exists(trace):
+        with open(trace) as f:
+            for line in f:
+                name, value = line.split()
+                marks[name] = (float(value) - started) * 1e3
+    missing = [m for m in MILESTONES if m not in marks]
+    if missing:
+        raise RuntimeError("missing milestones %s (exit code %s)\n%s"
+                           % (", ".join(missing), proc.returncode, stderr.strip()))
+    marks["exit"] = (exited - started) * 1e3
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1, help="runs not counted (page cache, .pyc)")
+    parser.add_argument("--configs", type=int, default=20, help="configs in the config directory")
+    parser.add_argument("--custom", type=int, default=5, help="saved custom config paths")
+    parser.add_argument("--up", type=int, default=2, help="how many of the configs are running")
+    parser.add_argument("--peers", type=int, default=100, help="peers per config")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every stub command sleeps")
+    parser.add_argument("--display", help="use this X display instead of starting Xvfb")
+    parser.add_argument("--save", help="write the medians to this JSON file")
+    args = parser.parse_args()
+
+    xvfb = None
+    if args.display:
+        display = args.display
+    else:
+        try:
+            xvfb, display = start_xvfb()
+        except RuntimeError as e:
+            sys.exit(str(e))
+    stubs = StubEnvironment(args.configs, args.peers, args.latency, up=args.up, custom=args.custom)
+    try:
+        env = stubs.env()
+        env["DISPLAY"] = display
+        trace = os.path.join(stubs.directory, "trace")
+        for _ in range(args.warmup):
+            run_once(env, trace)
+        runs = [run_once(env, trace) for _ in range(args.runs)]
+    finally:
+        stubs.cleanup()
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    print("%d runs, %d configs + %d custom, %d running, %d peers each"
+          % (args.runs, args.configs, args.custom, args.up, args.peers))
+    print("%-12s %9s %9s %9s" % ("milestone", "min ms", "median ms", "max ms"))
+    medians = {}
+    for name in MILESTONES + ("exit",):
+        values = [run[name] for run in runs]
+        medians[name] = round(statistics.median(values), 1)
+        print("%-12s %9.1f %9.1f %9.1f" % (name, min(values), medians[name], max(values)))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"runs": args.runs, "configs": args.configs, "custom": args.custom,
+                       "up": args.up, "peers": args.peers, "latency": args.latency,
+                       "median_ms": medians}, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Benchmark suite at scale, checked against a stored baseline.
+
+Builds a stub environment (benchmarks/stubs.py) with N interfaces x M
+peers and a per-command latency, points this process at it and times:
+
+    status_parse     parsing the ``wg show all dump`` of every interface
+    status_query     one status query through the stub ``wg``
+    parse_config     parsing the largest generated config
+    scan_configs     the startup config scan (fresh watcher, every config)
+    bulk_up_down     headless up and then down of every interface
+    probe_endpoints  probing 256 UDP echo endpoints and 16 closed ports
+    load_interfaces  GUI: config scan plus filling the dropdown
+    update_status    GUI: status refresh published to every view
+    output_render    GUI: 2,000 lines through the output console, drawn
+    editor_open      GUI: opening the config editor (pooled window)
+
+The GUI benchmarks need a display; without DISPLAY, Xvfb is started, and
+without either they are skipped.  Medians are compared with
+benchmarks/baseline.json; a benchmark more than --tolerance slower (and
+more than --slack ms slower, to ignore noise on fast ones) fails the run.
+A baseline recorded with different sizes is not compared.
+
+Every run also times ``reference``, a fixed pure-Python workload that
+does not touch the code under test, and the baseline is scaled by how
+much faster or slower it ran than when the baseline was recorded, so a
+baseline from another machine still applies.  Benchmarks faster than
+FAST_MS are sampled FAST_REPEAT times as often.
+
+A benchmark without a baseline number fails the run as well, and so does
+skipping the GUI benchmarks without --no-gui, so nothing passes
+unchecked: record the baseline with --update-baseline under a display or
+Xvfb.
+
+    python3 benchmarks/bench_suite.py
+    python3 benchmarks/bench_suite.py --interfaces 20 --peers 2000 --latency 0.02
+    python3 benchmarks/bench_suite.py --update-baseline
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import StubEnvironment, UdpEcho, start_xvfb  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+TOLERANCE = 0.25
+SLACK_MS = 5.0
+FAST_MS = 10.0
+FAST_REPEAT = 5
+OUTPUT_LINES = 2000
+PROBE_ENDPOINTS = 256
+PROBE_CLOSED = 16
+GUI_BENCHMARKS = ("load_interfaces", "update_status", "output_render", "editor_open")
+
+
+def timed(func, repeat, setup=None):
+    """Milliseconds of each of ``repeat`` calls of func (more when it is fast)."""
+    samples = []
+    wanted = repeat
+    while len(samples) < wanted:
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1e3)
+        if len(samples) == repeat and repeat > 1 and statistics.median(samples) < FAST_MS:
+            wanted = repeat * FAST_REPEAT
+    return samples
+
+
+def reference():
+    """A fixed workload (string formatting, sorting, dicts) to scale the baseline by."""
+    table = {}
+    for i in range(20000):
+        key = "peer-%05d/%d" % ((i * 7919) % 20000, i % 7)
+        table[key] = table.get(key, 0) + i
+    return sorted(table.items(), key=lambda item: (item[1], item[0]))[:10]
+
+
+# ---------------------------
+# Without Tk
+# ---------------------------
+def core_benchmarks(stubs, repeat):
+    # Imported late: wireguard_gui.core reads the environment at import.
+    from wireguard_gui import core, headless
+    from wireguard_gui.config import parse_config
+    from wireguard_gui.status import CliBackend, StatusEngine, parse_dump
+    from wireguard_gui.watcher import ConfigWatcher
+
+    results = {"reference": timed(reference, repeat)}
+    dump = "".join(open(os.path.join(stubs.dump_dir, name + ".dump")).read() for name in stubs.up())
+    results["status_parse"] = timed(lambda: parse_dump(dump), repeat)
+    engine = StatusEngine(CliBackend())
+    results["status_query"] = timed(engine.query, repeat)
+
+    largest = max(stubs.names, key=lambda n: os.path.getsize(os.path.join(core.CONFIG_DIR, n + ".conf")))
+    text = open(os.path.join(core.CONFIG_DIR, largest + ".conf")).read()
+    results["parse_config"] = timed(lambda: parse_config(text), repeat)
+
+    def scan():
+        watcher = ConfigWatcher(lambda changes: None, post=lambda callback, *args: None)
+        watcher.watch_dir(core.CONFIG_DIR)
+        for path in core.load_custom_configs():
+            watcher.watch_file(path)
+        watcher.stop()
+
+    results["scan_configs"] = timed(scan, repeat)
+
+    def up_down():
+        session = headless.Session()
+        try:
+            session.bulk("up", stubs.names)
+            session.bulk("down", stubs.names)
+        finally:
+            session.close()
+        failed = [r for r in session.results if r["state"] == "failed"]
+        if failed:
+            raise RuntimeError("stub %s %s failed: %s" % (failed[0]["op"], failed[0]["target"],
+                                                           failed[0]["output"].strip()))
+
+    initially_up = stubs.up()
+    # Start from everything down so both halves run every interface.
+    for name in initially_up:
+        os.unlink(os.path.join(stubs.state_dir, name))
+    results["bulk_up_down"] = timed(up_down, max(1, repeat // 5))
+    for name in initially_up:
+        open(os.path.join(stubs.state_dir, name), "w").close()
+
+    from wireguard_gui import probe
+    with UdpEcho(PROBE_ENDPOINTS, PROBE_CLOSED) as echo:
+        endpoints = echo.endpoints + echo.closed
+
+        def probe_endpoints():
+            results = probe.probe(endpoints)
+            answered = sum(1 for r in results.values() if r.state in (probe.REPLY, probe.REFUSED))
+            if answered != len(endpoints):
+                raise RuntimeError("only %d of %d stand-in endpoints answered" % (answered, len(endpoints)))
+
+        results["probe_endpoints"] = timed(probe_endpoints, repeat)
+    return results
+
+
+# ---------------------------
+# GUI
+# ---------------------------
+def load_gui():
+    spec = importlib.util.spec_from_file_location("wireguard_gui_app", os.path.join(ROOT, "wireguard-gui.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _Finished:
+    """Stands in for a finished Job when calling a completion handler directly."""
+
+    def __init__(self, result):
+        self.result = result
+        self.error = None
+
+
+def gui_benchmarks(stubs, repeat):
+    gui = load_gui()
+    from wireguard_gui.watcher import ConfigWatcher
+
+    root = gui.tk.Tk()
+    app = gui.WireGuardGUI(root)
+
+    def pump(until, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not until():
+            if time.monotonic() > deadline:
+                raise RuntimeError("the GUI did not settle within %ds" % timeout)
+            root.update()
+            time.sleep(0.002)
+
+    try:
+        pump(lambda: app._system_configs and not app.refresher.busy and app._accounting_error != "still loading")
+        results = {}
+
+        def load_interfaces():
+            app.watcher.stop()
+            app.watcher = ConfigWatcher(app.on_config_changes, post=app.jobs.post,
+                                        list_dir=app._list_config_dir)
+            app._configs_scanned(_Finished(app._scan_configs()))
+            root.update_idletasks()
+
+        results["load_interfaces"] = timed(load_interfaces, repeat)
+
+        def update_status():
+            app.status.refresh()
+            root.update_idletasks()
+
+        results["update_status"] = timed(update_status, repeat)
+
+        lines = ["[#] line %d of synthetic command output\n" % i for i in range(OUTPUT_LINES)]
+
+        def render():
+            section = app.console.begin_section("bench")
+            for line in lines:
+                app.console.write(line, section)
+            app.console.flush()
+            root.update_idletasks()
+
+        results["output_render"] = timed(render, repeat, setup=app.console.clear)
+
+        name = stubs.names[-1]
+
+        def open_editor():
+            # The config is read in a worker; wait for the editor to show it
+            app._editor_target = None
+            app.edit_config(name)
+            pump(lambda: app._editor_target is not None)
+            root.update_idletasks()
+
+        results["editor_open_first"] = timed(open_editor, 1)
+        results["editor_open"] = timed(open_editor, repeat, setup=app._hide_editor)
+        return results
+    finally:
+        app.on_close()
+
+
+# ---------------------------
+# Report
+# ---------------------------
+def compare(medians, params, baseline, tolerance, slack):
+    """Print the table; returns the names of regressed and unchecked benchmarks."""
+    base = baseline.get("median_ms", {}) if baseline and baseline.get("params") == params else {}
+    if baseline and not base:
+        print("baseline was recorded with %s; not compared" % baseline.get("params"))
+    scale = 1.0
+    if base.get("reference") and medians.get("reference"):
+        scale = medians["reference"] / base["reference"]
+        print("this machine runs the reference at %.2fx the baseline's time; baseline scaled" % scale)
+    regressions = []
+    print("%-18s %10s %10s %8s" % ("benchmark", "median ms", "baseline", "change"))
+    for name, value in medians.items():
+        if name == "reference":
+            continue
+        old = base.get(name)
+        if old is not None:
+            old *= scale
+        if old is None:
+            regressions.append(name)
+            print("%-18s %10.2f %10s %8s  NO BASELINE" % (name, value, "-", "new"))
+            continue
+        change = (value - old) / old if old else 0.0
+        regressed = value > old * (1 + tolerance) and value - old > slack
+        if regressed:
+            regressions.append(name)
+        print("%-18s %10.2f %10.2f %+7.0f%%%s" % (name, value, old, change * 100,
+                                                 "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interfaces", type=int, default=8)
+    parser.add_argument("--peers", type=int, default=500)
+    parser.add_argument("--up", type=int, help="running interfaces (default: all)")
+    parser.add_argument("--custom", type=int, default=5, help="saved custom config paths")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every stub command sleeps")
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--no-gui", action="store_true", help="skip the benchmarks that need Tk")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--slack", type=float, default=SLACK_MS, help="ms a benchmark may always lose")
+    args = parser.parse_args()
+
+    up = args.interfaces if args.up is None else args.up
+    params = {"interfaces": args.interfaces, "peers": args.peers, "up": up, "custom": args.custom,
+              "latency": args.latency}
+    stubs = StubEnvironment(args.interfaces, args.peers, args.latency, up=args.up, custom=args.custom)
+    xvfb = None
+    gui_skipped = None
+    try:
+        stubs.activate()
+        samples = core_benchmarks(stubs, args.repeat)
+        if not args.no_gui:
+            if not os.environ.get("DISPLAY"):
+                try:
+                    xvfb, os.environ["DISPLAY"] = start_xvfb()
+                except RuntimeError as e:
+                    gui_skipped = str(e)
+                    print("GUI benchmarks skipped: %s" % e)
+            if os.environ.get("DISPLAY"):
+                samples.update(gui_benchmarks(stubs, args.repeat))
+    finally:
+        stubs.cleanup()
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    medians = {name: round(statistics.median(values), 3) for name, values in samples.items()}
+    print("%d interfaces x %d peers, %s up, %.3fs latency, %d repeats"
+          % (args.interfaces, args.peers, "all" if up == args.interfaces else up, args.latency, args.repeat))
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(medians, params, baseline, args.tolerance, args.slack)
+
+    if args.update_baseline:
+        if baseline and baseline.get("params") == params:
+            # Keep the numbers of benchmarks not run this time (e.g. no display).
+            medians = dict(baseline.get("median_ms", {}), **medians)
+        missing = [name for name in GUI_BENCHMARKS if name not in medians]
+        if missing:
+            print("warning: no %s in the baseline; record it with a display or Xvfb" % ", ".join(missing))
+        with open(args.baseline, "w") as f:
+            json.dump({"params": params, "median_ms": medians}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("baseline written to %s" % args.baseline)
+        return 0
+    status = 0
+    if regressions:
+        print("%d regression(s) or benchmark(s) without a baseline: %s"
+              % (len(regressions), ", ".join(regressions)))
+        status = 1
+    if gui_skipped is not None:
+        print("GUI benchmarks not checked (%s); pass --no-gui to skip them on purpose" % gui_skipped)
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Generate WG_CMD_GET_DEVICE reply fixtures.
+
+Writes netlink replies laid out the way the kernel emits them (device
+attributes repeated in every message, peers split across messages of at
+most MESSAGE_SIZE bytes, and a peer's allowed IPs continued in the next
+message when they do not fit), together with the equivalent
+``wg show all dump`` text.  The pairs let the netlink parser be checked
+and benchmarked on machines without the WireGuard module; replies
+recorded from a real kernel with ``python3 -m wireguard_gui.netlink
+--record`` can be used the same way.
+
+    python3 benchmarks/netlink_fixtures.py               # committed fixtures
+    python3 benchmarks/netlink_fixtures.py --interfaces 4 --peers 5000 -o /tmp/big
+"""
+import argparse
+import base64
+import hashlib
+import os
+import socket
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wireguard_gui import netlink as nl  # noqa: E402
+
+# Kernel dumps are built in NLMSG_GOODSIZE (~8 KiB) skbs.
+MESSAGE_SIZE = 8192
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "netlink")
+BASE_TIME = 1700000000
+
+
+def _attr(attr_type, payload, nested=False):
+    return nl._attr(attr_type | (nl.NLA_F_NESTED if nested else 0), payload)
+
+
+def fake_key(*parts):
+    return hashlib.sha256(":".join(str(p) for p in parts).encode()).digest()
+
+
+def synthetic_devices(interfaces, peers, ips_per_peer=2, wide_peer_ips=0):
+    """Deterministic devices: list of (name, device dict, [peer dicts])."""
+    result = []
+    for i in range(interfaces):
+        name = "wg%d" % i
+        device = {"public_key": fake_key(name, "pub"), "listen_port": 51820 + i, "fwmark": 0}
+        peer_list = []
+        for j in range(peers):
+            count = wide_peer_ips if (wide_peer_ips and j == 0) else ips_per_peer
+            allowed = []
+            for k in range(count):
+                if k % 2 == 0:
+                    allowed.append((socket.AF_INET, bytes([10, i, (j >> 8) & 255, j & 255]), 32)
+                                   if k == 0 else
+                                   (socket.AF_INET, bytes([172, 16 + (k >> 9) % 16, (k >> 1) & 255, 0]), 24))
+                else:
+                    allowed.append((socket.AF_INET6,
+                                    b"\xfd\x00" + bytes([i]) + bytes(9) + struct.pack("!I", j * 1000 + k),
+                                    128))
+            peer_list.append({
+                "public_key": fake_key(name, j),
+                "preshared_key": fake_key(name, j, "psk") if j % 3 == 0 else bytes(32),
+                "endpoint": (socket.AF_INET, bytes([198, 51, 100, j % 250 + 1]), 51820 + j % 7)
+                            if j % 5 else
+                            (socket.AF_INET6, socket.inet_pton(socket.AF_INET6, "2001:db8::%x" % (j + 1)), 51820),
+                "keepalive": 25 if j % 2 else 0,
+                "handshake": BASE_TIME - j * 7 if j % 11 else 0,
+                "rx": j * 123457,
+                "tx": j * 654321,
+                "allowed": allowed,
+            })
+        result.append((name, device, peer_list))
+    return result
+
+
+def _sockaddr(endpoint):
+    family, address, port = endpoint
+    if family == socket.AF_INET:
+        return struct.pack("=H", family) + struct.pack("!H", port) + address + bytes(8)
+    return struct.pack("=H", family) + struct.pack("!H", port) + bytes(4) + address + bytes(4)
+
+
+def _allowed_attr(index, allowed):
+    family, address, cidr = allowed
+    return _attr(index, _attr(nl.WGALLOWEDIP_A_FAMILY, struct.pack("=H", family)) +
+                 _attr(nl.WGALLOWEDIP_A_IPADDR, address) +
+                 _attr(nl.WGALLOWEDIP_A_CIDR_MASK, bytes([cidr])), nested=True)
+
+
+def _peer_head(peer):
+    return (_attr(nl.WGPEER_A_PUBLIC_KEY, peer["public_key"]) +
+            _attr(nl.WGPEER_A_PRESHARED_KEY, peer["preshared_key"]) +
+            _attr(nl.WGPEER_A_LAST_HANDSHAKE_TIME, struct.pack("=qq", peer["handshake"], 0)) +
+            _attr(nl.WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL, struct.pack("=H", peer["keepalive"])) +
+            _attr(nl.WGPEER_A_TX_BYTES, struct.pack("=Q", peer["tx"])) +
+            _attr(nl.WGPEER_A_RX_BYTES, struct.pack("=Q", peer["rx"])) +
+            _attr(nl.WGPEER_A_PROTOCOL_VERSION, struct.pack("=I", 1)) +
+            _attr(nl.WGPEER_A_ENDPOINT, _sockaddr(peer["endpoint"])))
+
+
+def encode_device(name, device, peers, seq=1, family_id=0x1b):
+    """Encode one device as the kernel's multi-part dump reply."""
+    header = (_attr(nl.WGDEVICE_A_LISTEN_PORT, struct.pack("=H", device["listen_port"])) +
+              _attr(nl.WGDEVICE_A_FWMARK, struct.pack("=I", device["fwmark"])) +
+              _attr(nl.WGDEVICE_A_IFINDEX, struct.pack("=I", 5)) +
+              _attr(nl.WGDEVICE_A_IFNAME, name.encode() + b"\0") +
+              _attr(nl.WGDEVICE_A_PUBLIC_KEY, device["public_key"]))
+    messages = []
+    budget = MESSAGE_SIZE - 16 - 4 - len(header) - 4
+    peer_attrs = []
+    used = 0
+    index = 0
+
+    def flush():
+        genl = struct.pack("=BBH", nl.WG_CMD_GET_DEVICE, nl.WG_GENL_VERSION, 0)
+        body = genl + header + _attr(nl.WGDEVICE_A_PEERS, b"".join(peer_attrs), nested=True)
+        messages.append(nl._message(family_id, nl.NLM_F_MULTI, seq, body))
+
+    for peer in peers:
+        head = _peer_head(peer)
+        ips = [_allowed_attr(k, ip) for k, ip in enumerate(peer["allowed"])]
+        first = True
+        while first or ips:
+            size = 4 + len(head) + 4
+            chunk = []
+            while ips and used + size + len(ips[0]) <= budget:
+                size += len(ips[0])
+                chunk.append(ips.pop(0))
+            if used + size > budget or (ips and not chunk and peer_attrs):
+                # Message full: end it, the peer continues in the next one.
+                if not peer_attrs:
+                    raise ValueError("peer does not fit into a message")
+                ips = chunk + ips
+                flush()
+                peer_attrs, used, index = [], 0, 0
+                continue
+            body = head + _attr(nl.WGPEER_A_ALLOWEDIPS, b"".join(chunk), nested=True)
+            peer_attrs.append(_attr(index, body, nested=True))
+            used += size
+            index += 1
+            first = False
+            if ips:
+                flush()
+                peer_attrs, used, index = [], 0, 0
+    if peer_attrs or not messages:
+        flush()
+    messages.append(nl._message(nl.NLMSG_DONE, nl.NLM_F_MULTI, seq, struct.pack("=i", 0)))
+    return b"".join(messages)
+
+
+def encode_dump(devices):
+    return b"".join(encode_device(name, device, peers, seq=n + 1)
+                    for n, (name, device, peers) in enumerate(devices))
+
+
+def dump_text(devices):
+    """The ``wg show all dump`` text matching encode_dump(devices)."""
+    def b64(raw):
+        return base64.b64encode(raw).decode() if raw != bytes(32) else "(none)"
+
+    def endpoint(ep):
+        family, address, port = ep
+        host = socket.inet_ntop(family, address)
+        return ("%s:%d" if family == socket.AF_INET else "[%s]:%d") % (host, port)
+
+    lines = []
+    for name, device, peers in devices:
+        lines.append("\t".join([name, "(hidden)", b64(device["public_key"]),
+                                str(device["listen_port"]), "off"]))
+        for peer in peers:
+            allowed = ",".join("%s/%d" % (socket.inet_ntop(f, a), c) for f, a, c in peer["allowed"])
+            lines.append("\t".join([
+                name, b64(peer["public_key"]), b64(peer["preshared_key"]),
+                endpoint(peer["endpoint"]), allowed or "(none)", str(peer["handshake"]),
+                str(peer["rx"]), str(peer["tx"]), str(peer["keepalive"] or "off"),
+            ]))
+    return "\n".join(lines) + "\n"
+
+
+def write_fixture(directory, stem, devices):
+    with open(os.path.join(directory, stem + ".bin"), "wb") as f:
+        f.write(encode_dump(devices))
+    with open(os.path.join(directory, stem + ".dump"), "w") as f:
+        f.write(dump_text(devices))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=FIXTURE_DIR)
+    parser.add_argument("--interfaces", type=int)
+    parser.add_argument("--peers", type=int)
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.interfaces or args.peers:
+        stem = "synthetic-%dx%d" % (args.interfaces or 1, args.peers or 1)
+        write_fixture(args.output, stem, synthetic_devices(args.interfaces or 1, args.peers or 1))
+        print("wrote %s" % os.path.join(args.output, stem + ".bin"))
+        return
+
+    write_fixture(args.output, "small", synthetic_devices(1, 3))
+    write_fixture(args.output, "multi-message", synthetic_devices(2, 150))
+    write_fixture(args.output, "wide-peer", synthetic_devices(1, 4, wide_peer_ips=1500))
+    print("wrote fixtures to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Stand-ins for ``wg``, ``wg-quick`` and ``sudo`` at any scale.
+
+StubEnvironment writes N generated configs with M peers each, the
+matching ``wg show all dump`` text per interface, and small shell
+scripts that behave enough like the real tools for the GUI and the
+headless mode:
+
+    wg show all dump      dumps of the interfaces that are "up"
+    wg / wg show          a short listing of the "up" interfaces
+    wg syncconf           accepted, does nothing
+    wg-quick up|down      marks the interface up or down (fails like the
+                          real one when it already is / is not)
+    wg-quick strip|save   prints the config / does nothing
+    sudo [-opts] cmd      runs cmd
+
+Every command sleeps ``latency`` seconds first.  Which interfaces are up
+lives in a state directory, so ``up`` and ``down`` change what later
+``wg show`` calls report.  ``env`` isolates HOME and the state directory
+and puts the stubs first on PATH; nothing outside the directory is
+touched and no root or kernel module is needed.  start_xvfb gives the
+GUI benchmarks a display, and UdpEcho stands in for peer endpoints that
+answer (plus closed ports that refuse) for the endpoint prober.
+"""
+import base64
+import json
+import os
+import selectors
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+
+from benchmarks import netlink_fixtures
+
+WG = """#!/bin/sh
+sleep %(latency)s
+case "$1 $2 $3" in
+"show all dump")
+    for f in "%(state)s"/*; do
+        [ -e "$f" ] && cat "%(dumps)s/${f##*/}.dump"
+    done
+    exit 0 ;;
+esac
+case "$1" in
+""|show)
+    for f in "%(state)s"/*; do
+        [ -e "$f" ] && printf 'interface: %%s\\n  listening port: 51820\\n\\n' "${f##*/}"
+    done
+    exit 0 ;;
+syncconf|set|setconf|addconf)
+    cat >/dev/null
+    exit 0 ;;
+esac
+echo "Invalid subcommand: \\`$1'" >&2
+exit 1
+"""
+
+WG_QUICK = """#!/bin/sh
+sleep %(latency)s
+target="$2"
+name="${target##*/}"
+name="${name%%.conf}"
+case "$target" in
+*/*) config="$target" ;;
+*) config="%(configs)s/$name.conf" ;;
+esac
+case "$1" in
+up)
+    [ -e "$config" ] || { echo "wg-quick: \\`$target' does not exist" >&2; exit 1; }
+    [ -e "%(state)s/$name" ] && { echo "wg-quick: \\`$name' already exists" >&2; exit 1; }
+    echo "[#] ip link add $name type wireguard"
+    echo "[#] wg setconf $name /dev/fd/63"
+    echo "[#] ip link set mtu 1420 up dev $name"
+    : > "%(state)s/$name" ;;
+down)
+    [ -e "%(state)s/$name" ] || { echo "wg-quick: \\`$name' is not a WireGuard interface" >&2; exit 1; }
+    echo "[#] ip link delete dev $name"
+    rm -f "%(state)s/$name" ;;
+strip)
+    grep -v -E '^(Address|DNS|MTU|Table|PreUp|PostUp|PreDown|PostDown|SaveConfig) *=' "$config" ;;
+save)
+    : ;;
+*)
+    echo "Usage: wg-quick [ up | down | save | strip ] [ CONFIG_FILE | INTERFACE ]" >&2
+    exit 1 ;;
+esac
+"""
+
+SUDO = """#!/bin/sh
+while [ "${1#-}" != "$1" ]; do
+    shift
+done
+exec "$@"
+"""
+
+
+def _key(raw):
+    return base64.b64encode(raw).decode()
+
+
+def config_text(name, device, peers, index):
+    """A wg-quick config matching one synthetic device."""
+    dump = netlink_fixtures.dump_text([(name, device, peers)]).splitlines()
+    lines = ["[Interface]",
+             "PrivateKey = %s" % _key(netlink_fixtures.fake_key(name, "private")),
+             "Address = 10.%d.255.1/16" % (index % 250),
+             "ListenPort = %d" % device["listen_port"],
+             ""]
+    for line in dump[1:]:
+        fields = line.split("\t")
+        lines += ["[Peer]", "PublicKey = %s" % fields[1]]
+        if fields[2] != "(none)":
+            lines.append("PresharedKey = %s" % fields[2])
+        lines += ["Endpoint = %s" % fields[3], "AllowedIPs = %s" % fields[4].replace(",", ", ")]
+        if fields[8] != "off":
+            lines.append("PersistentKeepalive = %s" % fields[8])
+        lines.append("")
+    return "\n".join(lines)
+
+
+class StubEnvironment:
+    """A throwaway directory with configs, dumps and stub executables."""
+
+    def __init__(self, interfaces=4, peers=100, latency=0.0, up=None, custom=0, directory=None):
+        self.interfaces = interfaces
+        self.peers = peers
+        self.latency = latency
+        self.owned = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="wg-gui-stubs-")
+        self.home = os.path.join(self.directory, "home")
+        self.config_dir = os.path.join(self.directory, "wireguard")
+        self.bin_dir = os.path.join(self.directory, "bin")
+        self.state_dir = os.path.join(self.directory, "up")
+        self.dump_dir = os.path.join(self.directory, "dumps")
+        self.custom_dir = os.path.join(self.directory, "custom")
+        for path in (self.home, self.config_dir, self.bin_dir, self.state_dir, self.dump_dir, self.custom_dir):
+            os.makedirs(path, exist_ok=True)
+        self.names = []
+        self._write_configs(interfaces if up is None else up)
+        self._write_custom(custom)
+        self._write_stubs()
+
+    def _write_configs(self, up):
+        devices = netlink_fixtures.synthetic_devices(self.interfaces, self.peers)
+        for index, (name, device, peers) in enumerate(devices):
+            self.names.append(name)
+            with open(os.path.join(self.config_dir, name + ".conf"), "w") as f:
+                f.write(config_text(name, device, peers, index))
+            with open(os.path.join(self.dump_dir, name + ".dump"), "w") as f:
+                f.write(netlink_fixtures.dump_text([(name, device, peers)]))
+            if index < up:
+                open(os.path.join(self.state_dir, name), "w").close()
+
+    def _write_custom(self, count):
+        self.custom = []
+        for i in range(count):
+            path = os.path.join(self.custom_dir, "custom%d.conf" % i)
+            with open(path, "w") as f:
+                f.write("[Interface]\nPrivateKey = %s\n" % _key(netlink_fixtures.fake_key("custom", i)))
+            self.custom.append(path)
+        state = os.path.join(self.home, ".local", "state", "wireguard-gui")
+        os.makedirs(state, exist_ok=True)
+        with open(os.path.join(state, "state.json"), "w") as f:
+            json.dump({"custom_configs": self.custom}, f)
+
+    def _write_stubs(self):
+        values = {"latency": "%.3f" % self.latency, "state": self.state_dir, "dumps": self.dump_dir,
+                  "configs": self.config_dir}
+        for name, template in (("wg", WG), ("wg-quick", WG_QUICK), ("sudo", SUDO)):
+            path = os.path.join(self.bin_dir, name)
+            with open(path, "w") as f:
+                f.write(template % values)
+            os.chmod(path, 0o755)
+
+    def up(self):
+        """Names of the interfaces that are up now."""
+        return sorted(os.listdir(self.state_dir))
+
+    def env(self, base=None):
+        env = dict(os.environ if base is None else base)
+        env.update({
+            "HOME": self.home,
+            "XDG_STATE_HOME": os.path.join(self.home, ".local", "state"),
+            "WG_GUI_CONFIG_DIR": self.config_dir,
+            "WG_GUI_STATUS_BACKEND": "cli",
+            "PATH": self.bin_dir + os.pathsep + env.get("PATH", ""),
+        })
+        return env
+
+    def activate(self):
+        """Point this process at the stubs (before importing wireguard_gui.core)."""
+        os.environ.update(self.env())
+
+    def cleanup(self):
+        if self.owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+def start_xvfb():
+    """Start Xvfb on a free display; returns (process, display)."""
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("Xvfb not found; install it (xvfb package) or pass --display")
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "1280x800x24",
+                             "-nolisten", "tcp"], pass_fds=(write_fd,),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip()
+    if not number:
+        proc.kill()
+        raise RuntimeError("Xvfb did not start")
+    return proc, ":" + number
+
+
+class UdpEcho:
+    """UDP echo servers on 127.0.0.1, answered from one thread.
+
+    ``endpoints`` answer every datagram with itself after ``delay``
+    seconds; ``closed`` are ports that were bound once and released, so
+    datagrams to them get ICMP port unreachable.
+    """
+
+    def __init__(self, count=1, closed=0, delay=0.0):
+        self.delay = delay
+        self.received = 0
+        self._sockets = []
+        self._selector = selectors.DefaultSelector()
+        for _ in range(count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("127.0.0.1", 0))
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ)
+            self._sockets.append(sock)
+        self.endpoints = ["127.0.0.1:%d" % sock.getsockname()[1] for sock in self._sockets]
+        self.closed = []
+        for _ in range(closed):
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.bind(("127.0.0.1", 0))
+                self.closed.append("127.0.0.1:%d" % sock.getsockname()[1])
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="udp-echo", daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            for key, _ in self._selector.select(0.1):
+                try:
+                    data, address = key.fileobj.recvfrom(65535)
+                except OSError:
+                    continue
+                self.received += 1
+                if self.delay:
+                    threading.Timer(self.delay, key.fileobj.sendto, (data, address)).start()
+                else:
+                    key.fileobj.sendto(data, address)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+        self._selector.close()
+        for sock in self._sockets:
+            sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
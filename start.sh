@@ -12,5 +12,10 @@ if ! command -v python3 &> /dev/null; then
     exit 1
 fi
 
-# Run the WireGuard GUI
-sudo python3 wireguard-gui.py
+# Start the privileged helper once per session (asks for the sudo
+# password), then run the GUI itself as the current user
+if [ "$(id -u)" -ne 0 ] && ! python3 -m wireguard_gui.helper --check; then
+    sudo python3 -m wireguard_gui.helper --owner "$(id -u)" --detach || exit 1
+fi
+
+python3 wireguard-gui.py
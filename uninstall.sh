@@ -58,6 +58,14 @@ if [[ $REPLY =~ ^[Yy]$ ]]; then
         ((removed_files++))
     fi
 
+    state_dir="${XDG_STATE_HOME:-$HOME/.local/state}/wireguard-gui"
+    for state_file in "$state_dir/state.json" "$state_dir/failover.log" "$state_dir/failover.log.1"; do
+        if [ -f "$state_file" ]; then
+            rm "$state_file"
+            ((removed_files++))
+        fi
+    done
+
     if [ $removed_files -gt 0 ]; then
         echo "✅ Removed $removed_files user configuration file(s)"
     else
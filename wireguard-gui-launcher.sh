@@ -1,9 +1,15 @@
 #!/bin/bash
 # WireGuard GUI Launcher Wrapper for pkexec
-# This script preserves the DISPLAY environment variable for GUI applications
+# Starts the privileged helper through pkexec (graphical password prompt)
+# and runs the GUI itself as the current user
 
 # Get the script directory
 SCRIPT_DIR="$(cd "$(dirname "$(readlink -f "$0")")" && pwd)"
+cd "$SCRIPT_DIR"
 
-# Run with pkexec, passing display environment variables
-exec pkexec env DISPLAY="$DISPLAY" XAUTHORITY="$XAUTHORITY" python3 "${SCRIPT_DIR}/wireguard-gui.py"
+# Start the helper once per session; later launches reuse it
+if ! python3 -m wireguard_gui.helper --check; then
+    pkexec env PYTHONPATH="${SCRIPT_DIR}" python3 -m wireguard_gui.helper --owner "$(id -u)" --detach || exit 1
+fi
+
+exec python3 "${SCRIPT_DIR}/wireguard-gui.py"
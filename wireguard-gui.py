@@ -1,12 +1,47 @@
 #!/usr/bin/env python3
+import bisect
+import collections
 import os
-import subprocess
+import sys
+import time
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # Batch mode never touches Tk (see wireguard_gui/headless.py)
+    from wireguard_gui.headless import main
+    sys.exit(main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+
+if __name__ == "__main__" and "--exporter" in sys.argv[1:]:
+    # So does the Prometheus exporter (see wireguard_gui/exporter.py)
+    from wireguard_gui.exporter import main
+    sys.exit(main([arg for arg in sys.argv[1:] if arg != "--exporter"]))
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 
-CONFIG_DIR = "/etc/wireguard"
-HISTORY_FILE = os.path.expanduser("~/.wg_gui_last")
-CUSTOM_CONFIGS_FILE = os.path.expanduser("~/.wg_gui_custom_configs")
+from wireguard_gui import accounting, bulk, core, helper, lint, live, timing
+from wireguard_gui.config import CACHE, cached_config
+from wireguard_gui.console import OutputConsole
+from wireguard_gui.failover import WATCHING, FailoverMonitor, format_entry
+from wireguard_gui.core import CONFIG_DIR, QUICK_TIMEOUT, WG_QUICK_TIMEOUT
+from wireguard_gui.jobs import JobRunner, DONE
+from wireguard_gui.metrics import MetricsStore, format_rate, sparkline
+from wireguard_gui.monitor import StatusMonitor
+from wireguard_gui.peer_table import PeerTable
+from wireguard_gui.picker import InterfacePicker
+from wireguard_gui.probe import probe
+from wireguard_gui.routes import RouteIndex, describe
+from wireguard_gui.scheduler import RefreshScheduler
+from wireguard_gui.startup import StartupTrace
+from wireguard_gui.state import STATE
+from wireguard_gui.status import (
+    HANDSHAKE_TIMEOUT, format_age, format_bytes, interface_name
+)
+from wireguard_gui.timing import TIMINGS, Profiler, format_duration
+from wireguard_gui.watcher import ConfigWatcher
+
+# Background job settings
+MAX_JOBS = 4
+JOB_POLL_MS = 30
 
 # Color scheme - Modern dark theme
 COLORS = {
@@ -25,24 +60,74 @@ COLORS = {
     "button_hover": "#2d333b",
 }
 
-def run_cmd(cmd):
-    """Run shell command and return output or error."""
-    try:
-        out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True)
-        return out
-    except subprocess.CalledProcessError as e:
-        return e.output
-
 class WireGuardGUI:
     def __init__(self, root):
         self.root = root
         root.title("🔐 WireGuard Manager")
         root.configure(bg=COLORS["bg"])
-        root.geometry("1100x750")
+        self._track_geometry(root, "main", "1100x750", position=True)
         root.minsize(900, 600)
 
-        # Configure styles
+        # Configure styles; those of secondary windows wait until one opens
         self.setup_styles()
+        self._window_styles = False
+
+        # cProfile capture of the Tk thread, toggled from the diagnostics panel
+        self.profiler = Profiler()
+
+        # Config editor window, built on first use and then reused
+        self._editor = None
+        self._editor_target = None
+        self._editor_diagnostics = []
+
+        # AllowedIPs of running interfaces and configs, for the route lookup
+        self.routes = RouteIndex()
+        self._routes_stale = True
+
+        # Background command execution
+        self.jobs = JobRunner(max_workers=MAX_JOBS)
+        self._running = set()
+        self._bulk_ops = set()
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Privileged helper (see start.sh); without one, commands use sudo.
+        # The client reconnects on the next privileged operation if the
+        # helper is restarted.
+        self.helper = core.connect_helper(post=self.jobs.post, lazy=True)
+
+        # Shared WireGuard status; every status view reads from its snapshot
+        self.status = core.status_engine(self.helper)
+        # Traffic history is sampled first so views below see current rates
+        self.metrics = MetricsStore()
+        self.status.subscribe(self.metrics.record)
+        # Usage history across sessions (see wireguard_gui/accounting.py);
+        # the ring files are opened in the background after startup
+        self.accountant = None
+        self._accounting_error = "still loading"
+        self.status.subscribe(self.on_status_snapshot)
+        self.refresher = RefreshScheduler(root, self.status, self.jobs)
+        self.monitor = StatusMonitor(root, self.status, self.refresher)
+        self.monitor_var = tk.BooleanVar(value=False)
+        self._status_view = None
+
+        # Failover groups switch to an alternative config when the active
+        # one degrades; while any is enabled, status keeps being polled
+        self.failover = FailoverMonitor(self._failover_submit, self.jobs.call, self._load_member_config)
+        self.failover.listeners.append(self._failover_changed)
+        self.status.subscribe(self.failover.on_snapshot)
+        self._failover_held = False
+        self._failover_changed()
+
+        # Config each interface was last brought up or applied with, so
+        # "Apply Live" can tell whether wg-quick level fields changed
+        self.applied_configs = {}
+
+        # Config discovery: one scan at startup, then filesystem events
+        self.watcher = ConfigWatcher(self.on_config_changes, post=self.jobs.post,
+                                     list_dir=self._list_config_dir)
+        self._system_configs = []
+        self._custom_configs = []
+        self._last_used_map = None
 
         self.interface_var = tk.StringVar()
         self.interface_var.trace_add("write", self.on_interface_change)
@@ -73,6 +158,14 @@ class WireGuardGUI:
         )
         self.status_frame.pack(side="right")
 
+        ttk.Checkbutton(
+            header,
+            text="Live monitor",
+            variable=self.monitor_var,
+            command=self.toggle_monitor,
+            style="Custom.TCheckbutton"
+        ).pack(side="right", padx=15)
+
         status_inner = tk.Frame(self.status_frame, bg=COLORS["surface"])
         status_inner.pack(padx=15, pady=8)
 
@@ -116,19 +209,21 @@ class WireGuardGUI:
         )
         label.pack(side="left", padx=(0, 10))
 
-        self.interface_dropdown = ttk.Combobox(
+        self.interface_picker = InterfacePicker(
             select_inner,
-            textvariable=self.interface_var,
+            self.interface_var,
+            connected=lambda: set(self.status.snapshot.interfaces),
+            last_used=self._last_used,
+            colors=COLORS,
             width=35,
-            font=("Segoe UI", 10),
-            style="Custom.TCombobox"
+            font=("Segoe UI", 10)
         )
-        self.interface_dropdown.pack(side="left", padx=5)
+        self.interface_picker.pack(side="left", padx=5)
 
         ttk.Button(
             select_inner,
             text="🔄 Reload",
-            command=self.load_interfaces,
+            command=self.reload_interfaces,
             style="Accent.TButton"
         ).pack(side="left", padx=5)
 
@@ -139,6 +234,15 @@ class WireGuardGUI:
             style="Accent.TButton"
         ).pack(side="left", padx=5)
 
+        self.info_label = tk.Label(
+            select_inner,
+            text="",
+            font=("Segoe UI", 9),
+            bg=COLORS["surface"],
+            fg=COLORS["fg_muted"]
+        )
+        self.info_label.pack(side="right", padx=5)
+
         # --- Control Buttons Card ---
         control_card = tk.Frame(
             main_container,
@@ -179,6 +283,22 @@ class WireGuardGUI:
             command=self.ifdown,
             style="Danger.TButton",
             width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            conn_frame,
+            text="🗂 Bulk…",
+            command=self.show_bulk,
+            style="Info.TButton",
+            width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            conn_frame,
+            text="🔀 Failover…",
+            command=self.show_failover,
+            style="Info.TButton",
+            width=15
         ).pack(side="left")
 
         # Info controls
@@ -208,6 +328,38 @@ class WireGuardGUI:
             command=self.show_status,
             style="Info.TButton",
             width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            info_frame,
+            text="👥 Peers",
+            command=self.show_peers,
+            style="Info.TButton",
+            width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            info_frame,
+            text="📈 Traffic",
+            command=self.show_traffic,
+            style="Info.TButton",
+            width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            info_frame,
+            text="🗓 History",
+            command=self.show_history,
+            style="Info.TButton",
+            width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            info_frame,
+            text="🩺 Diagnostics",
+            command=self.show_diagnostics,
+            style="Info.TButton",
+            width=15
         ).pack(side="left")
 
         # Config controls
@@ -245,6 +397,22 @@ class WireGuardGUI:
             command=self.strip_config,
             style="Warning.TButton",
             width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            config_frame,
+            text="⚡ Apply Live",
+            command=self.apply_live,
+            style="Warning.TButton",
+            width=15
+        ).pack(side="left", padx=(0, 8))
+
+        ttk.Button(
+            config_frame,
+            text="🧭 Route Lookup",
+            command=self.show_routes,
+            style="Warning.TButton",
+            width=15
         ).pack(side="left")
 
         # --- Output Card ---
@@ -272,9 +440,25 @@ class WireGuardGUI:
         ttk.Button(
             output_header,
             text="🗑️  Clear",
-            command=lambda: self.output.delete("1.0", tk.END),
+            command=TIMINGS.timed("ui clear")(lambda: self.console.clear()),
+            style="Small.TButton"
+        ).pack(side="right", padx=(0, 20), pady=8)
+
+        ttk.Button(
+            output_header,
+            text="⏹ Cancel",
+            command=self.cancel_jobs,
             style="Small.TButton"
-        ).pack(side="right", padx=20, pady=8)
+        ).pack(side="right", padx=5, pady=8)
+
+        self.jobs_label = tk.Label(
+            output_header,
+            text="",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        self.jobs_label.pack(side="right", padx=5)
 
         # Output text area container
         output_container = tk.Frame(output_card, bg=COLORS["output_bg"])
@@ -297,14 +481,25 @@ class WireGuardGUI:
         )
         self.output.pack(fill="both", expand=True)
 
-        # Load initial interface list
-        self.load_interfaces()
-
-        # Restore last-used interface
-        self.restore_last_interface()
-
-        # Initial status check
-        self.update_status()
+        # Bounded, batched output with one collapsible section per job
+        self.console = OutputConsole(self.output)
+        self.output.tag_configure("header", foreground=COLORS["accent"])
+        self._sections = {}
+
+        # Everything below the first paint runs in the background: the
+        # config scan, the first status query and the accounting files.
+        # Their results arrive through _pump_jobs once the window is up.
+        self.startup = StartupTrace.from_env(on_complete=lambda: root.after_idle(self.on_close))
+        if self.startup.enabled:
+            root.bind("<Expose>", lambda e: self.startup.mark("window"), add="+")
+            self.status.subscribe(lambda snapshot: self.startup.mark("status"))
+        self.jobs.call(self._scan_configs, on_done=self._configs_scanned, label="scan configs")
+        self.update_status(0)
+        self.jobs.call(accounting.Accountant, on_done=self._accountant_opened, label="open accounting")
+
+        # Deliver output from background jobs
+        self.root.after(JOB_POLL_MS, self._pump_jobs)
+        self.startup.mark("init")
 
     def setup_styles(self):
         """Configure custom ttk styles."""
@@ -421,72 +616,243 @@ class WireGuardGUI:
             relief=[("pressed", "flat")]
         )
 
-        # Combobox
+        # Checkbutton (Live monitor)
         style.configure(
-            "Custom.TCombobox",
-            fieldbackground=COLORS["surface_light"],
-            background=COLORS["surface_light"],
+            "Custom.TCheckbutton",
+            font=("Segoe UI", 9),
+            background=COLORS["bg"],
+            foreground=COLORS["fg_muted"],
+            indicatorbackground=COLORS["surface_light"],
+            indicatorforeground=COLORS["accent"],
+            focuscolor=COLORS["bg"]
+        )
+        style.map("Custom.TCheckbutton",
+            background=[("active", COLORS["bg"])],
+            foreground=[("selected", COLORS["fg"])],
+            indicatorbackground=[("selected", COLORS["surface_light"])]
+        )
+
+    def setup_window_styles(self):
+        """Styles only used by secondary windows, configured on first use."""
+        if self._window_styles:
+            return
+        self._window_styles = True
+        style = ttk.Style()
+
+        # Radiobutton (history ranges)
+        style.configure(
+            "Custom.TRadiobutton",
+            font=("Segoe UI", 9),
+            background=COLORS["bg"],
+            foreground=COLORS["fg_muted"],
+            indicatorbackground=COLORS["surface_light"],
+            indicatorforeground=COLORS["accent"],
+            focuscolor=COLORS["bg"]
+        )
+        style.map("Custom.TRadiobutton",
+            background=[("active", COLORS["bg"])],
+            foreground=[("selected", COLORS["fg"])],
+            indicatorbackground=[("selected", COLORS["surface_light"])]
+        )
+
+        # Peer table
+        style.configure(
+            "Peers.Treeview",
+            background=COLORS["output_bg"],
+            fieldbackground=COLORS["output_bg"],
+            foreground=COLORS["fg"],
+            borderwidth=0,
+            font=("JetBrains Mono", 9)
+        )
+        style.map("Peers.Treeview",
+            background=[("selected", COLORS["surface_light"])],
+            foreground=[("selected", COLORS["fg"])]
+        )
+        style.configure(
+            "Peers.Treeview.Heading",
+            font=("Segoe UI", 9, "bold"),
+            background=COLORS["surface"],
             foreground=COLORS["fg"],
-            arrowcolor=COLORS["fg"],
-            borderwidth=1,
             relief="flat"
         )
-        style.map("Custom.TCombobox",
-            fieldbackground=[("readonly", COLORS["surface_light"])],
-            selectbackground=[("readonly", COLORS["surface_light"])],
-            selectforeground=[("readonly", COLORS["fg"])]
+        style.map("Peers.Treeview.Heading",
+            background=[("active", COLORS["button_hover"])]
         )
 
     def on_interface_change(self, *args):
         """Called when interface selection changes."""
+        # Redraw from the snapshot we already have, then ask for a fresh
+        # one; the scheduler folds a burst of keystrokes into one query.
+        self.on_status_snapshot(self.status.snapshot)
         self.update_status()
 
-    def update_status(self):
-        """Update the connection status indicator."""
+    def update_status(self, delay_ms=None):
+        """Request a (debounced) refresh of the shared status snapshot."""
+        self.refresher.request(delay_ms)
+
+    def on_status_snapshot(self, snapshot):
+        """Update the status indicator and info panel from a snapshot."""
+        view = self._status_view_for(snapshot)
+        if view == self._status_view:
+            return
+        self._status_view = view
+        color, text, info = view
+        self.status_indicator.config(fg=color)
+        self.status_label.config(text=text)
+        self.info_label.config(text=info)
+
+    def _status_view_for(self, snapshot):
+        """Return (indicator color, label, info text) for the current interface."""
         iface = self.interface_var.get()
         if not iface:
-            self.status_indicator.config(fg=COLORS["surface_light"])
-            self.status_label.config(text="No interface selected")
-            return
-
-        # Check if interface is active
-        try:
-            result = subprocess.check_output(["wg", "show"], text=True, stderr=subprocess.DEVNULL)
-            # Extract just the interface name if it's a path
-            iface_name = os.path.basename(iface).replace(".conf", "") if "/" in iface else iface
-
-            if iface_name in result:
-                self.status_indicator.config(fg=COLORS["success"])
-                self.status_label.config(text="Connected")
-            else:
-                self.status_indicator.config(fg=COLORS["danger"])
-                self.status_label.config(text="Disconnected")
-        except:
-            self.status_indicator.config(fg=COLORS["surface_light"])
-            self.status_label.config(text="Unknown")
+            return COLORS["surface_light"], "No interface selected", ""
+
+        state = snapshot.is_up(iface)
+        if state is None:
+            return COLORS["surface_light"], "Unknown", ""
+        if not state:
+            return COLORS["danger"], "Disconnected", ""
+        rx, tx = snapshot.totals(iface)
+        handshake = snapshot.latest_handshake(iface)
+        info = "%d peer(s) · handshake %s · ↓ %s ↑ %s" % (
+            len(snapshot.get(iface).peers),
+            format_age(handshake, snapshot.taken_at),
+            format_bytes(rx),
+            format_bytes(tx),
+        )
+        series = self.metrics.get(iface)
+        if series is not None and len(series) > 1:
+            info += " · ↓ %s ↑ %s" % (format_rate(series.total_rates("rx")[-1]),
+                                      format_rate(series.total_rates("tx")[-1]))
+        if not handshake or snapshot.taken_at - handshake >= HANDSHAKE_TIMEOUT:
+            return COLORS["warning"], "Connected (no recent handshake)", info
+        return COLORS["success"], "Connected", info
+
+    @TIMINGS.timed("ui live monitor")
+    def toggle_monitor(self):
+        if self.monitor_var.get():
+            self.monitor.start()
+        else:
+            self.monitor.stop()
 
     # ---------------------------
     # Interface loading
     # ---------------------------
-    def load_interfaces(self):
-        interfaces = []
-
-        # Load standard interfaces from CONFIG_DIR
-        if os.path.isdir(CONFIG_DIR):
-            for f in os.listdir(CONFIG_DIR):
-                if f.endswith(".conf"):
-                    interfaces.append(f.replace(".conf", ""))
-
-        # Load custom config paths from saved file
-        custom_configs = self.load_custom_configs()
-        interfaces.extend(custom_configs)
+    @TIMINGS.timed("load_interfaces scan")
+    def _scan_configs(self):
+        """Single startup scan, run in the background before the watcher starts."""
+        system = [interface_name(path) for path in self.watcher.watch_dir(CONFIG_DIR)]
+
+        # Custom config paths from the saved file, those that exist
+        custom = [cfg for cfg in self.load_custom_configs() if self.watcher.watch_file(cfg)]
+        return system, custom, core.load_last_interface()
+
+    @TIMINGS.timed("load_interfaces fill")
+    def _configs_scanned(self, job):
+        """Fill the dropdown from the startup scan; later changes come from the watcher."""
+        if job.result is not None:
+            self._system_configs, self._custom_configs, last = job.result
+        else:
+            last = ""
+            self.append_output("[scanning configs failed: %s]\n" % job.error)
+        self.watcher.start()
+
+        interfaces = self._refresh_dropdown()
+        if not self.interface_var.get():
+            # Restore the last-used interface, else the first one
+            if last:
+                self.interface_var.set(last)
+            elif interfaces:
+                self.interface_var.set(interfaces[0])
+                self.save_last_interface()
+        self.startup.mark("interfaces")
+
+    def _accountant_opened(self, job):
+        if job.result is None:
+            self._accounting_error = job.error
+            return
+        self.accountant = job.result
+        self.status.subscribe(self.accountant.record)
+
+    @TIMINGS.timed("ui reload")
+    def reload_interfaces(self):
+        """Explicit rescan, for changes inotify cannot see (network filesystems)."""
+        self.jobs.call(self.watcher.rescan, label="rescan configs")
+
+    def _list_config_dir(self, path):
+        # CONFIG_DIR is root-only; ask the helper when we have one.  Called
+        # by the watcher from its own thread or a worker, never from Tk.
+        if path != os.path.abspath(CONFIG_DIR) or self.helper is None or not self.helper.ensure_connected():
+            return []
+        try:
+            return self.helper.request("list_configs")
+        except helper.HelperError:
+            return []
 
-        self.interface_dropdown["values"] = interfaces
-        if interfaces and not self.interface_var.get():
-            self.interface_var.set(interfaces[0])
+    def _refresh_dropdown(self):
+        interfaces = self._system_configs + self._custom_configs
+        self.interface_picker.set_entries(interfaces)
+        return interfaces
 
-        self.save_last_interface()
+    def _last_used(self):
+        """{interface: unix time last used}, to rank recent ones first in the picker.
 
+        Read from the state once and kept up to date by get_if, so a
+        search does not copy the whole interfaces table.
+        """
+        if self._last_used_map is None:
+            self._last_used_map = {name: meta["last_used"]
+                                   for name, meta in STATE.get("interfaces", {}).items()
+                                   if meta.get("last_used")}
+        return self._last_used_map
+
+    def _is_system_config(self, path):
+        return os.path.dirname(path) == os.path.abspath(CONFIG_DIR)
+
+    def _dropdown_value(self, path):
+        """Dropdown entry for a config path: a name for CONFIG_DIR, else the path."""
+        return interface_name(path) if self._is_system_config(path) else path
+
+    def _add_config(self, path):
+        value = self._dropdown_value(path)
+        if not self._is_system_config(path):
+            if value not in self._custom_configs:
+                self._custom_configs.append(value)
+        elif value not in self._system_configs:
+            bisect.insort(self._system_configs, value)
+        return value
+
+    def _remove_config(self, path):
+        value = self._dropdown_value(path)
+        entries = self._system_configs if self._is_system_config(path) else self._custom_configs
+        if value in entries:
+            entries.remove(value)
+        return value
+
+    def on_config_changes(self, changes):
+        """Apply a batch of watcher changes to the dropdown."""
+        listed = False
+        self._routes_stale = True
+        for change in changes:
+            CACHE.invalidate(change.path)
+            if change.kind == "changed":
+                continue
+            listed = True
+            if change.kind == "added":
+                self._add_config(change.path)
+            elif change.kind == "removed":
+                self._remove_config(change.path)
+            elif change.kind == "renamed":
+                CACHE.invalidate(change.old_path)
+                old = self._remove_config(change.old_path)
+                new = self._add_config(change.path)
+                if self.interface_var.get() == old:
+                    self.interface_var.set(new)
+                    self.save_last_interface()
+        if listed:
+            self._refresh_dropdown()
+
+    @TIMINGS.timed("ui browse config")
     def choose_config(self):
         """Allow user to select a config file anywhere on the filesystem."""
         initialdir = CONFIG_DIR if os.path.isdir(CONFIG_DIR) else os.path.expanduser("~")
@@ -501,11 +867,12 @@ class WireGuardGUI:
         # Set the interface_var to the full config path
         self.interface_var.set(path)
 
-        # Add to dropdown values if not already present
-        values = list(self.interface_dropdown["values"])
-        if path not in values:
-            values.append(path)
-            self.interface_dropdown["values"] = values
+        # Add to dropdown values if not already present, and follow the file
+        if path not in self._custom_configs:
+            self._custom_configs.append(path)
+            self._refresh_dropdown()
+        # The watcher's lock may be held while it polls through the helper
+        self.jobs.call(self.watcher.watch_file, path, label="watch config")
 
         # Save both the interface and update the custom configs list
         self.save_custom_config(path)
@@ -517,132 +884,1395 @@ class WireGuardGUI:
             messagebox.showerror("Error", "No interface selected.")
             return None
         self.save_last_interface()
+        now = int(time.time())
+        self._last_used()[iface] = now
+        STATE.update_interface(iface, last_used=now)
         return iface
 
     # ---------------------------
     # History persistence
     # ---------------------------
     def save_last_interface(self):
-        try:
-            with open(HISTORY_FILE, "w") as f:
-                f.write(self.interface_var.get())
-        except:
-            pass
+        core.save_last_interface(self.interface_var.get())
 
-    def restore_last_interface(self):
-        if os.path.exists(HISTORY_FILE):
-            try:
-                content = open(HISTORY_FILE).read().strip()
-                self.interface_var.set(content)
-            except:
-                pass
+    def _track_geometry(self, window, name, default, position=False):
+        """Open window at its remembered size (and position) and remember changes."""
+        window.geometry(STATE.get("geometry", {}).get(name, default))
+
+        def remember(event):
+            # Bindings on a toplevel also see the events of its children
+            if event.widget is window:
+                STATE.set_item("geometry", name, window.geometry() if position
+                               else "%dx%d" % (event.width, event.height))
+
+        window.bind("<Configure>", remember, add="+")
 
     def load_custom_configs(self):
         """Load list of custom config file paths."""
-        if not os.path.exists(CUSTOM_CONFIGS_FILE):
-            return []
-
-        try:
-            with open(CUSTOM_CONFIGS_FILE, "r") as f:
-                configs = [line.strip() for line in f if line.strip()]
-            # Filter out configs that no longer exist
-            return [cfg for cfg in configs if os.path.exists(cfg)]
-        except:
-            return []
+        return core.load_custom_configs()
 
     def save_custom_config(self, config_path):
         """Save a custom config path to the persistent list."""
-        try:
-            # Load existing configs
-            existing_configs = self.load_custom_configs()
-
-            # Add new config if not already present
-            if config_path not in existing_configs:
-                existing_configs.append(config_path)
-
-            # Save back to file
-            with open(CUSTOM_CONFIGS_FILE, "w") as f:
-                for cfg in existing_configs:
-                    f.write(cfg + "\n")
-        except:
-            pass
+        core.save_custom_config(config_path)
 
     # ---------------------------
     # Output helpers
     # ---------------------------
-    def show_output(self, text):
-        self.output.delete("1.0", tk.END)
-        self.output.insert(tk.END, text)
+    def append_output(self, text, section=None):
+        self.console.write(text, section)
+
+    # ---------------------------
+    # Background jobs
+    # ---------------------------
+    def run_job(self, cmd, timeout=QUICK_TIMEOUT, on_done=None):
+        """Run cmd in the background, streaming its output into the output pane."""
+        on_line, finished = self._job_callbacks(on_done)
+        job = self.jobs.submit(cmd, timeout=timeout, on_line=on_line, on_done=finished)
+        self._job_started(job)
+        return job
+
+    def run_privileged(self, op, iface=None, timeout=WG_QUICK_TIMEOUT, on_done=None):
+        """Run a wg-quick operation as root: through the helper, else sudo."""
+        if self.helper is not None and self.helper.ensure_connected():
+            on_line, finished = self._job_callbacks(on_done)
+            job = self.helper.submit(op, iface, on_line=on_line, on_done=finished)
+            self._job_started(job)
+            return job
+        return self.run_job(core.privileged_command(op, iface), timeout=timeout, on_done=on_done)
+
+    def _job_callbacks(self, on_done):
+        def on_line(job, line):
+            self.append_output(line, self._sections.get(job))
+
+        def finished(job):
+            self._running.discard(job)
+            section = self._sections.pop(job, None)
+            if job.state != DONE:
+                self.append_output("[%s: %s, exit code %s]\n" % (job.label, job.state, job.returncode), section)
+            self.append_output("\n", section)
+            self._update_jobs_label()
+            if on_done:
+                on_done(job)
+
+        return on_line, finished
+
+    def _job_started(self, job):
+        if not job.done:
+            self._running.add(job)
+        self._sections[job] = self.console.begin_section(job.label)
+        self._update_jobs_label()
+
+    def run_call(self, label, func, *args):
+        """Run a Python callable in the background and show its text result."""
+        def finished(job):
+            if job.error is not None:
+                self.append_output("[%s failed: %s]\n" % (label, job.error), section)
+            else:
+                self.append_output(job.result or "", section)
+            self.append_output("\n", section)
+
+        section = self.console.begin_section(label)
+        return self.jobs.call(func, *args, on_done=finished, label=label)
+
+    @TIMINGS.timed("ui cancel")
+    def cancel_jobs(self):
+        for operation in list(self._bulk_ops):
+            operation.cancel()
+        for job in list(self._running):
+            job.cancel()
+
+    def _update_jobs_label(self):
+        count = len(self._running)
+        self.jobs_label.config(text="%d running" % count if count else "")
+
+    def _pump_jobs(self):
+        self.jobs.process_events()
+        self.root.after(JOB_POLL_MS, self._pump_jobs)
+
+    def on_close(self):
+        self.profiler.stop()
+        self.monitor.stop()
+        self.watcher.stop()
+        self.console.cancel()
+        if self.accountant is not None:
+            self.accountant.close()
+        self.refresher.close()
+        self.jobs.shutdown()
+        if self.helper is not None:
+            self.helper.close()
+        STATE.close()
+        self.root.destroy()
 
     # ---------------------------
     # Helper: resolve config path
     # ---------------------------
     def _resolve_conf_path(self, iface):
-        """
-        If iface looks like a path to a config file and it exists, use it.
-        Otherwise, treat iface as an interface name in CONFIG_DIR.
-        """
-        # If iface is an absolute path or contains a path separator and points to an existing file
-        if (os.path.isabs(iface) or os.path.sep in iface) and os.path.exists(iface):
-            return iface
+        return core.resolve_conf_path(iface)
+
+    def _read_config(self, conf_path):
+        """Read a config, going through the helper for root-only files."""
+        return core.read_config(conf_path, self.helper)
 
-        # Otherwise, assume CONFIG_DIR/<iface>.conf
-        conf_path = os.path.join(CONFIG_DIR, iface + ".conf")
-        return conf_path
+    def _write_config(self, conf_path, content):
+        core.write_config(conf_path, content, self.helper)
+
+    def _stat_config(self, conf_path):
+        return core.stat_config(conf_path, self.helper)
+
+    def _load_config(self, conf_path):
+        """Parsed config from the shared cache; root-only files go through the helper."""
+        return cached_config(conf_path, loader=self._read_config, stat=self._stat_config)
 
     # ---------------------------
     # WireGuard commands
     # ---------------------------
+    @TIMINGS.timed("ui show status")
     def show_wg(self):
-        out = run_cmd(["wg"])
-        self.show_output(out)
+        self.run_call("wg show (%s)" % self.status.backend.name, self.status.show)
 
+    @TIMINGS.timed("ui quick status")
     def show_status(self):
-        out = run_cmd(["wg-quick", "status"])
-        self.show_output(out)
+        if self.helper is not None and self.helper.ensure_connected():
+            self.run_privileged("quick_status")
+        else:
+            self.run_job(["wg-quick", "status"])
 
+    @TIMINGS.timed("ui connect")
     def ifup(self):
         iface = self.get_if()
         if iface:
             # wg-quick accepts either interface name or full config path
-            out = run_cmd(["sudo", "wg-quick", "up", iface])
-            self.show_output(out)
-            self.update_status()
+            self.run_privileged("up", iface,
+                                on_done=lambda job: self._connection_changed(job, "up", iface))
 
+    @TIMINGS.timed("ui disconnect")
     def ifdown(self):
         iface = self.get_if()
         if iface:
-            out = run_cmd(["sudo", "wg-quick", "down", iface])
-            self.show_output(out)
-            self.update_status()
+            self.run_privileged("down", iface,
+                                on_done=lambda job: self._connection_changed(job, "down", iface))
+
+    def _connection_changed(self, job, op, iface):
+        self.update_status(0)
+        self.monitor.kick()
+        if op == "up" and job.state == DONE:
+            self._remember_applied(iface)
+            STATE.update_interface(iface, last_connected=int(time.time()))
+        elif op == "down":
+            self.applied_configs.pop(interface_name(iface), None)
+
+    def _remember_applied(self, iface):
+        def load():
+            return self._load_config(self._resolve_conf_path(iface))
+
+        def store(job):
+            if job.result is not None:
+                self.applied_configs[interface_name(iface)] = job.result
+
+        self.jobs.call(load, on_done=store, label="read %s" % iface)
+
+    # ---------------------------
+    # Live reconfiguration
+    # ---------------------------
+    @TIMINGS.timed("ui apply live")
+    def apply_live(self, iface=None):
+        """Push the saved config of iface to the running tunnel (wg syncconf)."""
+        iface = iface or self.get_if()
+        if not iface:
+            return
+        name = interface_name(iface)
+
+        def plan():
+            config = self._load_config(self._resolve_conf_path(iface))
+            running = self.status.backend.dump().get(name)
+            return config, live.plan_live_apply(
+                config, running, self.applied_configs.get(name),
+                live.running_addresses(name), live.running_mtu(name))
+
+        def planned(job):
+            if job.error is not None:
+                self.append_output("[apply live %s failed: %s]\n\n" % (name, job.error), section)
+                return
+            config, live_plan = job.result
+            self.append_output(live_plan.report(), section)
+            if not live_plan.running:
+                self.append_output("\n", section)
+                return
+            if live_plan.needs_restart:
+                if messagebox.askyesno(
+                        "Restart required",
+                        "%s cannot be applied live:\n\n%s\n\nRestart the tunnel now?" % (
+                            name, "\n".join(live_plan.restart_reasons))):
+                    self._restart(iface)
+                return
+            if not live_plan.has_changes:
+                self.append_output("\n", section)
+                return
+            self._push_live(iface, config, live_plan)
+
+        section = self.console.begin_section("apply live %s" % name)
+        self.jobs.call(plan, on_done=planned, label="plan %s" % name)
+
+    def _push_live(self, iface, config, live_plan):
+        table = config.interface.get("Table") or "auto"
+
+        def applied(job):
+            if job.result:
+                self.append_output(job.result)
+            if job.state == DONE:
+                self.applied_configs[interface_name(iface)] = config
+            self.update_status(0)
+            self.monitor.kick()
+
+        if self.helper is not None and self.helper.ensure_connected():
+            on_line, finished = self._job_callbacks(applied)
+            job = self.helper.submit("apply_live", iface, on_line=on_line, on_done=finished,
+                                     label="apply live %s" % iface,
+                                     add_routes=live_plan.add_routes,
+                                     del_routes=live_plan.del_routes, table=table)
+            self._job_started(job)
+            return
+        cmd = core.live_apply_command(iface, table, live_plan.add_routes, live_plan.del_routes)
+        on_line, finished = self._job_callbacks(applied)
+        job = self.jobs.submit(cmd, timeout=WG_QUICK_TIMEOUT, on_line=on_line, on_done=finished,
+                               label="apply live %s" % iface, cwd=core.APP_DIR)
+        self._job_started(job)
+
+    # ---------------------------
+    # Bulk actions
+    # ---------------------------
+    @TIMINGS.timed("ui bulk")
+    def show_bulk(self):
+        """Pick several interfaces and bring them up, down or restart them."""
+        window = tk.Toplevel(self.root)
+        window.title("🗂 Bulk actions")
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "bulk", "420x520")
+
+        tk.Label(
+            window,
+            text="Select interfaces (Ctrl/Shift for several):",
+            font=("Segoe UI", 10, "bold"),
+            bg=COLORS["bg"],
+            fg=COLORS["fg"]
+        ).pack(anchor="w", padx=15, pady=(15, 5))
 
+        listbox = tk.Listbox(
+            window,
+            selectmode="extended",
+            font=("Segoe UI", 10),
+            bg=COLORS["surface_light"],
+            fg=COLORS["fg"],
+            selectbackground=COLORS["accent"],
+            relief="flat",
+            activestyle="none"
+        )
+        listbox.pack(fill="both", expand=True, padx=15)
+        targets = self._system_configs + self._custom_configs
+        snapshot = self.status.snapshot
+        for target in targets:
+            state = {True: "up", False: "down"}.get(snapshot.is_up(target), "?")
+            listbox.insert(tk.END, "%s  [%s]" % (target, state))
+
+        options = tk.Frame(window, bg=COLORS["bg"])
+        options.pack(fill="x", padx=15, pady=10)
+        tk.Label(
+            options,
+            text="At most",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg"],
+            fg=COLORS["fg_muted"]
+        ).pack(side="left")
+        parallel_var = tk.IntVar(value=bulk.MAX_PARALLEL)
+        tk.Spinbox(
+            options,
+            from_=1,
+            to=16,
+            width=3,
+            textvariable=parallel_var,
+            bg=COLORS["surface_light"],
+            fg=COLORS["fg"],
+            relief="flat"
+        ).pack(side="left", padx=5)
+        tk.Label(
+            options,
+            text="at a time",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg"],
+            fg=COLORS["fg_muted"]
+        ).pack(side="left")
+        ttk.Button(
+            options,
+            text="Select all",
+            command=lambda: listbox.selection_set(0, tk.END),
+            style="Small.TButton"
+        ).pack(side="right")
+
+        def run(op):
+            selected = [targets[i] for i in listbox.curselection()]
+            if not selected:
+                messagebox.showerror("Error", "No interfaces selected.", parent=window)
+                return
+            try:
+                parallel = max(1, int(parallel_var.get()))
+            except (tk.TclError, ValueError):
+                parallel = bulk.MAX_PARALLEL
+            self.bulk_action(op, selected, parallel)
+
+        buttons = tk.Frame(window, bg=COLORS["bg"])
+        buttons.pack(fill="x", padx=15, pady=(0, 15))
+        ttk.Button(buttons, text="▲ Up", command=lambda: run("up"),
+                   style="Success.TButton").pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="▼ Down", command=lambda: run("down"),
+                   style="Danger.TButton").pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="⟳ Restart", command=lambda: run("restart"),
+                   style="Warning.TButton").pack(side="left")
+
+    @TIMINGS.timed("ui bulk action")
+    def bulk_action(self, op, targets, max_parallel=bulk.MAX_PARALLEL):
+        """Run up/down/restart over targets in dependency order, several at a time."""
+        section = self.console.begin_section("bulk %s (%d interfaces)" % (op, len(targets)))
+
+        def load():
+            configs = {}
+            for target in targets:
+                try:
+                    configs[target] = self._load_config(self._resolve_conf_path(target))
+                except (OSError, ValueError, helper.HelperError):
+                    pass
+            return bulk.dependencies(configs)
+
+        def planned(job):
+            depends = job.result if job.error is None else {}
+            waves, cyclic = bulk.dependency_waves(targets, depends)
+            if cyclic:
+                self.append_output("dependency cycle between %s; started last\n"
+                                   % ", ".join(interface_name(t) for t in cyclic), section)
+            self.append_output("order: %s\n" % " → ".join(
+                ", ".join(interface_name(t) for t in wave) for wave in waves), section)
+            snapshot = self.status.snapshot
+            if op == "up":
+                self._run_bulk("up", waves, depends, max_parallel, section,
+                               lambda t: snapshot.is_up(t) is not True)
+            elif op == "down":
+                self._run_bulk("down", waves[::-1], depends, max_parallel, section,
+                               lambda t: snapshot.is_up(t) is not False)
+            else:
+                self._run_bulk("down", waves[::-1], depends, max_parallel, section,
+                               lambda t: snapshot.is_up(t) is not False,
+                               then=lambda: self._run_bulk("up", waves, depends, max_parallel, section))
+
+        self.jobs.call(load, on_done=planned, label="bulk %s plan" % op)
+
+    def _run_bulk(self, op, waves, depends, max_parallel, section, wanted=None, then=None):
+        if wanted is not None:
+            skipped = [t for wave in waves for t in wave if not wanted(t)]
+            if skipped:
+                self.append_output("already %s: %s\n" % (op, ", ".join(interface_name(t) for t in skipped)),
+                                   section)
+            waves = [[t for t in wave if wanted(t)] for wave in waves]
+            waves = [wave for wave in waves if wave]
+
+        def submit(op, target, on_done):
+            def finished(job):
+                self._connection_changed(job, op, target)
+                on_done(job)
+            self.run_privileged(op, target, on_done=finished)
+
+        def result(res):
+            self.append_output("%s\n" % res.line(), section)
+
+        def finished(operation):
+            self._bulk_ops.discard(operation)
+            self.append_output("\n" + operation.summary() + "\n", section)
+            if then is not None and not operation.cancelled:
+                then()
+
+        operation = bulk.BulkOperation(op, waves, submit, depends, max_parallel,
+                                       on_result=result, on_finished=finished)
+        self._bulk_ops.add(operation)
+        self.append_output("%s: %d interface(s), up to %d at a time\n"
+                           % (op, sum(len(w) for w in waves), max_parallel), section)
+        operation.start()
+
+    def _restart(self, iface):
+        def after_down(job):
+            self._connection_changed(job, "down", iface)
+            if job.state == DONE:
+                self.run_privileged("up", iface,
+                                    on_done=lambda job: self._connection_changed(job, "up", iface))
+
+        self.run_privileged("down", iface, on_done=after_down)
+
+    # ---------------------------
+    # Failover groups
+    # ---------------------------
+    def _failover_submit(self, op, target, on_done):
+        def finished(job):
+            self._connection_changed(job, op, target)
+            on_done(job)
+
+        self.run_privileged(op, target, on_done=finished)
+
+    def _load_member_config(self, member):
+        return self._load_config(self._resolve_conf_path(member))
+
+    def _failover_changed(self, entry=None):
+        enabled = self.failover.enabled
+        if enabled != self._failover_held:
+            if enabled:
+                self.monitor.hold()
+            else:
+                self.monitor.release()
+            self._failover_held = enabled
+        # Poll fast while a group is degrading or in the middle of a switch
+        if any(g.bad or g.phase != WATCHING for g in self.failover.groups.values()):
+            self.monitor.kick()
+        if entry is None or entry["event"] not in ("switch", "switched", "failed", "restored"):
+            return
+        self.append_output("[failover] %s\n" % format_entry(entry))
+        if entry["event"] == "switch" and entry.get("from") and self.interface_var.get() == entry["from"]:
+            self.interface_var.set(entry["to"])
+
+    @TIMINGS.timed("ui failover")
+    def show_failover(self):
+        """Failover groups: alternative configs, the one in use and the decision log."""
+        self.setup_window_styles()
+        window = tk.Toplevel(self.root)
+        window.title("🔀 Failover groups")
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "failover", "900x680")
+
+        header = tk.Frame(window, bg=COLORS["bg_light"])
+        header.pack(fill="x")
+        tk.Label(
+            header,
+            text="🔀 Failover groups",
+            font=("Segoe UI", 14, "bold"),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg"]
+        ).pack(side="left", padx=20, pady=12)
+        tk.Label(
+            header,
+            text="switches when the active member's handshake goes stale or it stops receiving",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        ).pack(side="left", padx=5, pady=12)
+
+        tree = ttk.Treeview(window, columns=("members", "active", "state"), style="Peers.Treeview", height=6)
+        tree.heading("#0", text="Group")
+        tree.heading("members", text="Members (in order of preference)")
+        tree.heading("active", text="Active")
+        tree.heading("state", text="State")
+        tree.column("#0", width=140, stretch=False)
+        tree.column("members", width=380)
+        tree.column("active", width=120, stretch=False)
+        tree.column("state", width=240)
+        tree.pack(fill="x", padx=15, pady=(15, 10))
+
+        form = tk.Frame(window, bg=COLORS["bg"])
+        form.pack(fill="x", padx=15)
+        form.columnconfigure(1, weight=1)
+        name_var = tk.StringVar()
+        members_var = tk.StringVar()
+        enabled_var = tk.BooleanVar(value=True)
+        for row, (text, variable) in enumerate((("Name:", name_var), ("Members:", members_var))):
+            tk.Label(
+                form,
+                text=text,
+                font=("Segoe UI", 9, "bold"),
+                bg=COLORS["bg"],
+                fg=COLORS["fg"]
+            ).grid(row=row, column=0, sticky="w", pady=3)
+            tk.Entry(
+                form,
+                textvariable=variable,
+                font=("Segoe UI", 10),
+                bg=COLORS["surface_light"],
+                fg=COLORS["fg"],
+                insertbackground=COLORS["accent"],
+                relief="flat"
+            ).grid(row=row, column=1, sticky="ew", padx=(10, 0), pady=3)
+        ttk.Checkbutton(form, text="Enabled", variable=enabled_var,
+                        style="Custom.TCheckbutton").grid(row=0, column=2, padx=(10, 0))
+        tk.Label(
+            form,
+            text="Comma separated, preferred first; double-click a config below to add it.",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg"],
+            fg=COLORS["fg_muted"]
+        ).grid(row=2, column=1, sticky="w", padx=(10, 0))
+
+        configs = tk.Listbox(
+            window,
+            height=6,
+            font=("Segoe UI", 10),
+            bg=COLORS["surface_light"],
+            fg=COLORS["fg"],
+            selectbackground=COLORS["accent"],
+            relief="flat",
+            activestyle="none"
+        )
+        configs.pack(fill="x", padx=15, pady=(5, 10))
+        targets = self._system_configs + self._custom_configs
+        configs.insert(tk.END, *targets)
+
+        log_text = scrolledtext.ScrolledText(
+            window,
+            height=10,
+            font=("JetBrains Mono", 9),
+            bg=COLORS["output_bg"],
+            fg=COLORS["fg"],
+            relief="flat",
+            padx=10,
+            pady=8,
+            wrap="none"
+        )
+
+        def members():
+            return [m.strip() for m in members_var.get().split(",") if m.strip()]
+
+        def add_config(event):
+            selection = configs.curselection()
+            if selection and targets[selection[0]] not in members():
+                members_var.set(", ".join(members() + [targets[selection[0]]]))
+
+        def refresh_tree():
+            groups = self.failover.groups
+            if list(tree.get_children()) != list(groups):
+                tree.delete(*tree.get_children())
+                for name in groups:
+                    tree.insert("", tk.END, iid=name, text=name)
+            for name, group in groups.items():
+                if not group.enabled:
+                    state = "disabled"
+                elif group.phase != WATCHING:
+                    state = group.phase + "…"
+                else:
+                    state = group.status
+                tree.item(name, values=(", ".join(group.members), group.active or "-", state))
+
+        def on_select(event):
+            selection = tree.selection()
+            group = self.failover.groups.get(selection[0]) if selection else None
+            if group is not None:
+                name_var.set(group.name)
+                members_var.set(", ".join(group.members))
+                enabled_var.set(group.enabled)
+
+        def save():
+            name = name_var.get().strip()
+            if not name or len(members()) < 2:
+                messagebox.showerror("Error", "A group needs a name and at least two members.", parent=window)
+                return
+            self.failover.set_group(name, members(), enabled_var.get())
+
+        def delete():
+            name = name_var.get().strip()
+            if name in self.failover.groups and messagebox.askyesno(
+                    "Delete group", "Delete failover group %s?" % name, parent=window):
+                self.failover.delete_group(name)
+
+        def switch_now():
+            name = name_var.get().strip()
+            if name not in self.failover.groups:
+                messagebox.showerror("Error", "Select a saved group first.", parent=window)
+            elif not self.failover.switch_now(name):
+                messagebox.showinfo("Failover", "%s is already switching." % name, parent=window)
+
+        def on_change(entry):
+            if not window.winfo_exists():
+                return
+            refresh_tree()
+            if entry is not None:
+                log_text.insert(tk.END, format_entry(entry) + "\n")
+                log_text.see(tk.END)
+
+        def closed(event):
+            if event.widget is window and on_change in self.failover.listeners:
+                self.failover.listeners.remove(on_change)
+
+        buttons = tk.Frame(window, bg=COLORS["bg"])
+        buttons.pack(fill="x", padx=15)
+        ttk.Button(buttons, text="💾 Save group", command=save,
+                   style="Success.TButton").pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="🗑 Delete", command=delete,
+                   style="Danger.TButton").pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="⚡ Switch to best now", command=switch_now,
+                   style="Accent.TButton").pack(side="left")
+        tk.Label(
+            window,
+            text="Decision log",
+            font=("Segoe UI", 10, "bold"),
+            bg=COLORS["bg"],
+            fg=COLORS["fg"]
+        ).pack(anchor="w", padx=15, pady=(15, 5))
+        log_text.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+        for entry in self.failover.log.entries:
+            log_text.insert(tk.END, format_entry(entry) + "\n")
+        log_text.see(tk.END)
+
+        configs.bind("<Double-1>", add_config)
+        tree.bind("<<TreeviewSelect>>", on_select)
+        window.bind("<Destroy>", closed)
+        self.failover.listeners.append(on_change)
+        refresh_tree()
+
+    @TIMINGS.timed("ui save config")
     def save_config(self):
         iface = self.get_if()
         if iface:
-            out = run_cmd(["sudo", "wg-quick", "save", iface])
-            self.show_output(out)
+            self.run_privileged("save", iface)
 
+    @TIMINGS.timed("ui strip config")
     def strip_config(self):
         iface = self.get_if()
         if iface:
-            out = run_cmd(["sudo", "wg-quick", "strip", iface])
-            self.show_output(out)
+            self.run_privileged("strip", iface, timeout=QUICK_TIMEOUT)
+
+    @TIMINGS.timed("ui peers")
+    def show_peers(self):
+        """Peer table of the selected interface: config merged with live status."""
+        iface = self.get_if()
+        if not iface:
+            return
+        conf_path = self._resolve_conf_path(iface)
+        self.setup_window_styles()
+
+        window = tk.Toplevel(self.root)
+        window.title("👥 Peers of %s" % interface_name(iface))
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "peers", "1050x600")
+
+        header = tk.Frame(window, bg=COLORS["bg_light"])
+        header.pack(fill="x")
+        tk.Label(
+            header,
+            text="👥 Peers",
+            font=("Segoe UI", 14, "bold"),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg"]
+        ).pack(side="left", padx=20, pady=12)
+        count_label = tk.Label(
+            header,
+            text="loading…",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        count_label.pack(side="left", padx=5, pady=12)
+
+        filter_var = tk.StringVar()
+        filter_entry = tk.Entry(
+            header,
+            textvariable=filter_var,
+            width=30,
+            font=("Segoe UI", 10),
+            bg=COLORS["surface_light"],
+            fg=COLORS["fg"],
+            insertbackground=COLORS["accent"],
+            relief="flat"
+        )
+        filter_entry.pack(side="right", padx=20, pady=12)
+        tk.Label(
+            header,
+            text="Filter:",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        ).pack(side="right")
+        probe_button = ttk.Button(header, text="📡 Probe endpoints", style="Info.TButton")
+        probe_button.pack(side="right", padx=(0, 20))
+        probe_label = tk.Label(
+            header,
+            text="",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        probe_label.pack(side="right", padx=5)
+
+        def activate(row):
+            if row.lineno:
+                self.edit_config(iface, line=row.lineno)
+
+        table = PeerTable(window, on_activate=activate)
+        table.pack(fill="both", expand=True, padx=15, pady=15)
+        state = {"config": None}
+
+        def update_count():
+            shown, total = len(table.model), len(table.model.rows)
+            count_label.config(text="%d peers" % total if shown == total else "%d of %d peers" % (shown, total))
+
+        def on_snapshot(snapshot):
+            if not window.winfo_exists():
+                return
+            table.set_peers(state["config"], snapshot.get(iface))
+            update_count()
+
+        def loaded(job):
+            if not window.winfo_exists():
+                return
+            if job.error is not None and not isinstance(job.exception, FileNotFoundError):
+                self.append_output("[peers: cannot read %s: %s]\n" % (conf_path, job.error))
+            state["config"] = job.result
+            on_snapshot(self.status.snapshot)
+
+        def on_filter(*args):
+            table.set_filter(filter_var.get())
+            update_count()
+
+        def probed(job):
+            if not window.winfo_exists():
+                return
+            probe_button.state(["!disabled"])
+            if job.result is None:
+                probe_label.config(text="probe failed: %s" % job.error)
+                return
+            table.set_probes(job.result)
+            states = collections.Counter(result.state for result in job.result.values())
+            probe_label.config(text="%d endpoints in %s: %s" % (
+                len(job.result), format_duration(job.duration),
+                ", ".join("%d %s" % (count, state) for state, count in states.most_common())))
+
+        def probe_endpoints():
+            endpoints = [row.endpoint for row in table.model.rows if row.endpoint]
+            if not endpoints:
+                probe_label.config(text="no peer has an endpoint")
+                return
+            probe_button.state(["disabled"])
+            probe_label.config(text="probing %d endpoints…" % len(set(endpoints)))
+            self.jobs.call(probe, endpoints, on_done=probed, label="probe endpoints")
+
+        def closed(event):
+            if event.widget is window:
+                self.status.unsubscribe(on_snapshot)
+
+        probe_button.config(command=probe_endpoints)
+        filter_var.trace_add("write", on_filter)
+        window.bind("<Destroy>", closed)
+        self.status.subscribe(on_snapshot)
+        self.jobs.call(self._load_config, conf_path, on_done=loaded, label="load peers")
+        self.update_status()
+        filter_entry.focus_set()
 
-    def edit_config(self):
+    @TIMINGS.timed("ui traffic")
+    def show_traffic(self):
+        """Throughput graph of the selected interface and its busiest peers."""
         iface = self.get_if()
+        if not iface:
+            return
+        name = interface_name(iface)
+
+        window = tk.Toplevel(self.root)
+        window.title("📈 Traffic of %s" % name)
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "traffic", "760x520")
+
+        header = tk.Frame(window, bg=COLORS["bg_light"])
+        header.pack(fill="x")
+        tk.Label(
+            header,
+            text="📈 Traffic",
+            font=("Segoe UI", 14, "bold"),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg"]
+        ).pack(side="left", padx=20, pady=12)
+        rate_label = tk.Label(
+            header,
+            text="waiting for samples…",
+            font=("Segoe UI", 10),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        rate_label.pack(side="left", padx=5, pady=12)
+
+        canvas = tk.Canvas(
+            window,
+            height=220,
+            bg=COLORS["output_bg"],
+            highlightthickness=1,
+            highlightbackground=COLORS["border"]
+        )
+        canvas.pack(fill="x", padx=15, pady=(15, 0))
+
+        top = tk.Text(
+            window,
+            height=12,
+            font=("JetBrains Mono", 9),
+            bg=COLORS["output_bg"],
+            fg=COLORS["fg"],
+            relief="flat",
+            padx=15,
+            pady=12
+        )
+        top.pack(fill="both", expand=True, padx=15, pady=15)
+
+        def draw(snapshot):
+            if not window.winfo_exists():
+                return
+            series = self.metrics.get(name)
+            canvas.delete("all")
+            if series is None or len(series) < 3:
+                rate_label.config(text="not running" if snapshot.is_up(name) is False else "waiting for samples…")
+                return
+            rx, tx = series.total_rates("rx"), series.total_rates("tx")
+            times = series.sample_times()[1:]
+            rate_label.config(text="↓ %s   ↑ %s" % (format_rate(rx[-1]), format_rate(tx[-1])))
+
+            width, height, pad = canvas.winfo_width(), canvas.winfo_height(), 8
+            span = (times[-1] - times[0]) or 1
+            peak = max(max(rx), max(tx), 1)
+            for values, color in ((rx, COLORS["success"]), (tx, COLORS["accent"])):
+                points = []
+                for t, value in zip(times, values):
+                    points += [pad + (width - 2 * pad) * (t - times[0]) / span,
+                               height - pad - (height - 2 * pad) * value / peak]
+                canvas.create_line(*points, fill=color, width=2)
+            canvas.create_text(pad, pad, anchor="nw", text=format_rate(peak),
+                               fill=COLORS["fg_muted"], font=("Segoe UI", 8))
+            canvas.create_text(pad, height - pad, anchor="sw", text="-%ds" % span,
+                               fill=COLORS["fg_muted"], font=("Segoe UI", 8))
+
+            lines = ["%-46s %12s  %s" % ("busiest peers (received)", "rate", "history")]
+            for key, rate in series.top_peers(10, "rx"):
+                lines.append("%-46s %12s  %s" % (key, format_rate(rate), sparkline(series.rates(key, "rx"), 30)))
+            top.delete("1.0", tk.END)
+            top.insert(tk.END, "\n".join(lines))
+
+        def closed(event):
+            if event.widget is window:
+                self.status.unsubscribe(draw)
+                self.monitor.unpin()
+
+        window.bind("<Destroy>", closed)
+        self.status.subscribe(draw)
+        # Sample at the fastest rate while the graph is open
+        self.monitor.pin()
+
+    @TIMINGS.timed("ui history")
+    def show_history(self):
+        """Recorded usage of the selected interface over the last hour/day/month."""
+        iface = self.get_if()
+        if not iface:
+            return
+        if self.accountant is None:
+            messagebox.showerror("Error", "Traffic accounting is unavailable: %s" % self._accounting_error)
+            return
+        self.setup_window_styles()
+        name = interface_name(iface)
+
+        window = tk.Toplevel(self.root)
+        window.title("🗓 Usage history of %s" % name)
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "history", "760x560")
+
+        header = tk.Frame(window, bg=COLORS["bg_light"])
+        header.pack(fill="x")
+        tk.Label(
+            header,
+            text="🗓 Usage History",
+            font=("Segoe UI", 14, "bold"),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg"]
+        ).pack(side="left", padx=20, pady=12)
+        total_label = tk.Label(
+            header,
+            text="",
+            font=("Segoe UI", 10),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        total_label.pack(side="left", padx=5, pady=12)
+
+        range_var = tk.IntVar(value=0)
+        ranges = tk.Frame(window, bg=COLORS["bg"])
+        ranges.pack(fill="x", padx=15, pady=(15, 0))
+
+        canvas = tk.Canvas(
+            window,
+            height=200,
+            bg=COLORS["output_bg"],
+            highlightthickness=1,
+            highlightbackground=COLORS["border"]
+        )
+        canvas.pack(fill="x", padx=15, pady=(10, 0))
+
+        table = tk.Text(
+            window,
+            height=12,
+            font=("JetBrains Mono", 9),
+            bg=COLORS["output_bg"],
+            fg=COLORS["fg"],
+            relief="flat",
+            padx=15,
+            pady=12
+        )
+        table.pack(fill="both", expand=True, padx=15, pady=15)
+
+        def query(seconds, resolution):
+            now = time.time()
+            totals = self.accountant.query(seconds, resolution, name, now, totals=True)
+            records = self.accountant.query(seconds, resolution, name, now)
+            since = self.accountant.peers_since(resolution)
+            return (accounting.rollup(totals, now - seconds, now, 60),
+                    sorted(accounting.per_peer(records).items(), key=lambda item: -sum(item[1])),
+                    since if since and since > now - seconds else None)
+
+        def shown(job):
+            if not window.winfo_exists():
+                return
+            if job.error is not None:
+                total_label.config(text="query failed: %s" % job.error)
+                return
+            buckets, peers, since = job.result
+            rx = sum(b[1] for b in buckets)
+            tx = sum(b[2] for b in buckets)
+            total_label.config(text="↓ %s   ↑ %s" % (format_bytes(rx), format_bytes(tx)))
+
+            canvas.delete("all")
+            width, height, pad = canvas.winfo_width(), canvas.winfo_height(), 8
+            peak = max([b[1] + b[2] for b in buckets] + [1])
+            step = (width - 2 * pad) / len(buckets)
+            for i, (_, brx, btx) in enumerate(buckets):
+                x0 = pad + i * step
+                y_rx = height - pad - (height - 2 * pad) * brx / peak
+                y_tx = y_rx - (height - 2 * pad) * btx / peak
+                canvas.create_rectangle(x0, y_rx, x0 + step - 1, height - pad, fill=COLORS["success"], width=0)
+                canvas.create_rectangle(x0, y_tx, x0 + step - 1, y_rx, fill=COLORS["accent"], width=0)
+            canvas.create_text(pad, pad, anchor="nw", text=format_bytes(peak),
+                               fill=COLORS["fg_muted"], font=("Segoe UI", 8))
+
+            lines = ["%-46s %12s %12s" % ("peer", "received", "sent")]
+            if since is not None:
+                lines.insert(0, "per-peer history only reaches back to %s\n"
+                             % time.strftime("%Y-%m-%d %H:%M", time.localtime(since)))
+            for (_, key), (prx, ptx) in peers[:50]:
+                lines.append("%-46s %12s %12s" % (key, format_bytes(prx), format_bytes(ptx)))
+            if not peers:
+                lines.append("no traffic recorded in this range")
+            table.delete("1.0", tk.END)
+            table.insert(tk.END, "\n".join(lines))
+
+        def refresh(*args):
+            _, seconds, resolution = accounting.RANGES[range_var.get()]
+            # Include the minute that is still being accumulated
+            self.accountant.flush()
+            self.jobs.call(query, seconds, resolution, on_done=shown, label="usage history")
+
+        for index, (label, _, _) in enumerate(accounting.RANGES):
+            ttk.Radiobutton(
+                ranges,
+                text=label,
+                value=index,
+                variable=range_var,
+                command=refresh,
+                style="Custom.TRadiobutton"
+            ).pack(side="left", padx=(0, 12))
+
+        window.after(50, refresh)
+
+    @TIMINGS.timed("ui diagnostics")
+    def show_diagnostics(self):
+        """Latency percentiles of instrumented operations, cProfile capture and JSON export."""
+        self.setup_window_styles()
+        window = tk.Toplevel(self.root)
+        window.title("🩺 Diagnostics")
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "diagnostics", "950x650")
+
+        header = tk.Frame(window, bg=COLORS["bg_light"])
+        header.pack(fill="x")
+        tk.Label(
+            header,
+            text="🩺 Diagnostics",
+            font=("Segoe UI", 14, "bold"),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg"]
+        ).pack(side="left", padx=20, pady=12)
+        since_label = tk.Label(
+            header,
+            text="",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        since_label.pack(side="left", padx=5, pady=12)
+
+        columns = ("count", "p50", "p95", "p99", "max", "total")
+        table_frame = tk.Frame(window, bg=COLORS["bg"])
+        table_frame.pack(fill="both", expand=True, padx=15, pady=(15, 0))
+        tree = ttk.Treeview(table_frame, columns=columns, style="Peers.Treeview", height=14)
+        tree.heading("#0", text="Operation", anchor="w")
+        tree.column("#0", width=330, anchor="w")
+        for column in columns:
+            tree.heading(column, text=column, anchor="e")
+            tree.column(column, width=95, anchor="e")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(side="left", fill="both", expand=True)
+
+        profile_text = scrolledtext.ScrolledText(
+            window,
+            height=10,
+            font=("JetBrains Mono", 9),
+            bg=COLORS["output_bg"],
+            fg=COLORS["fg"],
+            relief="flat",
+            padx=10,
+            pady=8,
+            wrap="none"
+        )
+        profile_text.pack(fill="both", expand=True, padx=15, pady=15)
+
+        def show_profile():
+            profile_text.delete("1.0", tk.END)
+            if self.profiler.running:
+                profile_text.insert(tk.END, "Profiling the GUI thread… use the window, then stop.\n")
+            else:
+                profile_text.insert(tk.END, self.profiler.report() or
+                                    "Start profiling to capture where the GUI thread spends its time.\n")
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            summary = TIMINGS.summary()
+            since_label.config(text="since %s · %d operations" % (
+                time.strftime("%H:%M:%S", time.localtime(TIMINGS.started)), len(summary)))
+            # Slowest in total first: that is where the time goes
+            rows = sorted(summary.items(), key=lambda item: item[1]["total"], reverse=True)
+            wanted = [name for name, _ in rows]
+            if list(tree.get_children()) != wanted:
+                tree.delete(*tree.get_children())
+                for name in wanted:
+                    tree.insert("", tk.END, iid=name, text=name)
+            for name, stats in rows:
+                tree.item(name, values=(stats["count"], format_duration(stats["p50"]),
+                                        format_duration(stats["p95"]), format_duration(stats["p99"]),
+                                        format_duration(stats["max"]), format_duration(stats["total"])))
+            window.after(1000, refresh)
+
+        def toggle_profile():
+            if self.profiler.running:
+                self.profiler.stop()
+                profile_button.config(text="⏺ Start profiling")
+            else:
+                self.profiler.start()
+                profile_button.config(text="⏹ Stop profiling")
+            show_profile()
+
+        def reset():
+            TIMINGS.reset()
+            tree.delete(*tree.get_children())
+
+        def export():
+            path = filedialog.asksaveasfilename(
+                parent=window,
+                title="Export diagnostics",
+                defaultextension=".json",
+                initialfile="wireguard-gui-diagnostics.json",
+                filetypes=[("JSON", "*.json"), ("All files", "*.*")]
+            )
+            if not path:
+                return
+            extra = {
+                "status_backend": self.status.backend.name,
+                "helper": self.helper is not None and self.helper.connected,
+                "configs": len(self._system_configs) + len(self._custom_configs),
+                "running_jobs": len(self._running),
+                "metrics_bytes": self.metrics.nbytes,
+            }
+            try:
+                timing.export(path, profiler=self.profiler, extra=extra)
+            except OSError as e:
+                messagebox.showerror("Error", str(e), parent=window)
+
+        buttons = tk.Frame(window, bg=COLORS["bg"])
+        buttons.pack(fill="x", padx=15, pady=(0, 15))
+        profile_button = ttk.Button(
+            buttons,
+            text="⏹ Stop profiling" if self.profiler.running else "⏺ Start profiling",
+            command=toggle_profile,
+            style="Accent.TButton"
+        )
+        profile_button.pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="↺ Reset", command=reset, style="Info.TButton").pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="💾 Export JSON…", command=export,
+                   style="Info.TButton").pack(side="left")
+
+        show_profile()
+        refresh()
+
+    @TIMINGS.timed("ui route lookup")
+    def show_routes(self):
+        """Which peer carries an address, for one address or every address in pasted text or a file."""
+        self.setup_window_styles()
+        window = tk.Toplevel(self.root)
+        window.title("🧭 Route Lookup")
+        window.configure(bg=COLORS["bg"])
+        self._track_geometry(window, "routes", "1000x650")
+
+        header = tk.Frame(window, bg=COLORS["bg_light"])
+        header.pack(fill="x")
+        tk.Label(
+            header,
+            text="🧭 Route Lookup",
+            font=("Segoe UI", 14, "bold"),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg"]
+        ).pack(side="left", padx=20, pady=12)
+        count_label = tk.Label(
+            header,
+            text="loading configs…",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg_light"],
+            fg=COLORS["fg_muted"]
+        )
+        count_label.pack(side="left", padx=5, pady=12)
+
+        query = tk.Frame(window, bg=COLORS["bg"])
+        query.pack(fill="x", padx=15, pady=(15, 5))
+        tk.Label(
+            query,
+            text="Address:",
+            font=("Segoe UI", 10, "bold"),
+            bg=COLORS["bg"],
+            fg=COLORS["fg"]
+        ).pack(side="left")
+        address_var = tk.StringVar()
+        address_entry = tk.Entry(
+            query,
+            textvariable=address_var,
+            width=40,
+            font=("JetBrains Mono", 10),
+            bg=COLORS["surface_light"],
+            fg=COLORS["fg"],
+            insertbackground=COLORS["accent"],
+            relief="flat"
+        )
+        address_entry.pack(side="left", padx=10)
+        answer = tk.Label(
+            window,
+            text="",
+            font=("JetBrains Mono", 9),
+            bg=COLORS["bg"],
+            fg=COLORS["fg"],
+            anchor="w",
+            justify="left"
+        )
+        answer.pack(fill="x", padx=15, pady=(0, 10))
+
+        tk.Label(
+            window,
+            text="Addresses, or any text containing them (a log, `wg show` output):",
+            font=("Segoe UI", 9),
+            bg=COLORS["bg"],
+            fg=COLORS["fg_muted"]
+        ).pack(anchor="w", padx=15)
+        batch = scrolledtext.ScrolledText(
+            window,
+            height=6,
+            font=("JetBrains Mono", 9),
+            bg=COLORS["output_bg"],
+            fg=COLORS["fg"],
+            insertbackground=COLORS["accent"],
+            relief="flat",
+            padx=10,
+            pady=8
+        )
+        batch.pack(fill="x", padx=15, pady=(4, 8))
+
+        buttons = tk.Frame(window, bg=COLORS["bg"])
+        buttons.pack(fill="x", padx=15)
+
+        columns = ("count", "running", "configured")
+        table_frame = tk.Frame(window, bg=COLORS["bg"])
+        table_frame.pack(fill="both", expand=True, padx=15, pady=15)
+        tree = ttk.Treeview(table_frame, columns=columns, style="Peers.Treeview")
+        tree.heading("#0", text="Address", anchor="w")
+        tree.column("#0", width=220, anchor="w")
+        tree.heading("count", text="Seen", anchor="e")
+        tree.column("count", width=60, anchor="e")
+        tree.heading("running", text="Running (where traffic goes now)", anchor="w")
+        tree.column("running", width=330, anchor="w")
+        tree.heading("configured", text="Configured", anchor="w")
+        tree.column("configured", width=330, anchor="w")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(side="left", fill="both", expand=True)
+        locations = {}
+
+        def show_counts():
+            count_label.config(text="%d running, %d configured networks" % (
+                len(self.routes.running), len(self.routes.configured)))
+
+        def look_up(*args):
+            address = address_var.get().strip()
+            if not address:
+                answer.config(text="")
+                return
+            started = time.perf_counter()
+            try:
+                match = self.routes.lookup(address)
+            except ValueError as e:
+                answer.config(text=str(e), fg=COLORS["fg_muted"])
+                return
+            elapsed = time.perf_counter() - started
+            answer.config(text="running:     %s\nconfigured:  %s\n(%s)" % (
+                describe(match.running), describe(match.configured), format_duration(elapsed)),
+                fg=COLORS["fg"] if match.running or match.configured else COLORS["warning"])
+
+        def show_results(results):
+            tree.delete(*tree.get_children())
+            locations.clear()
+            for address, count, match in results:
+                item = tree.insert("", tk.END, text=address,
+                                   values=(count, describe(match.running), describe(match.configured)))
+                if match.configured:
+                    route = match.configured[1][0]
+                    target = route.interface if self._is_system_config(route.path) else route.path
+                    locations[item] = (target, route.lineno)
+            unmatched = sum(1 for _, _, m in results if not m.running and not m.configured)
+            count_label.config(text="%d addresses, %d without a route" % (len(results), unmatched))
+
+        def resolved(job):
+            if not window.winfo_exists():
+                return
+            if job.error is not None:
+                messagebox.showerror("Error", str(job.error), parent=window)
+                return
+            show_results(job.result)
+
+        def resolve_text():
+            show_results(self.routes.resolve(batch.get("1.0", tk.END)))
+
+        def resolve_file():
+            path = filedialog.askopenfilename(parent=window, title="Look up the addresses in a file")
+            if not path:
+                return
+
+            def read_and_resolve():
+                with open(path, errors="replace") as f:
+                    return self.routes.resolve(f.read())
+
+            self.jobs.call(read_and_resolve, on_done=resolved, label="resolve %s" % os.path.basename(path))
+
+        def open_config(event):
+            location = locations.get(tree.focus())
+            if location:
+                self.edit_config(location[0], line=location[1])
+
+        def on_snapshot(snapshot):
+            if not window.winfo_exists():
+                return
+            self.routes.sync_status(snapshot)
+            show_counts()
+            look_up()
+
+        def configs_loaded(job):
+            if not window.winfo_exists() or job.error is not None:
+                return
+            self.routes.sync_configs(job.result)
+            show_counts()
+            look_up()
+
+        def load_configs():
+            configs = {}
+            for target in self._system_configs + self._custom_configs:
+                path = self._resolve_conf_path(target)
+                try:
+                    configs[path] = self._load_config(path)
+                except (OSError, ValueError, helper.HelperError):
+                    pass
+            return configs
+
+        def sync_configs():
+            # Configs changed on disk since the last sync: reload them in the
+            # background; unchanged ones come from the cache and are skipped.
+            if not window.winfo_exists():
+                return
+            if self._routes_stale:
+                self._routes_stale = False
+                self.jobs.call(load_configs, on_done=configs_loaded, label="load routes")
+            window.after(2000, sync_configs)
+
+        def closed(event):
+            if event.widget is window:
+                self.status.unsubscribe(on_snapshot)
+
+        ttk.Button(buttons, text="🔎 Look up all", command=resolve_text,
+                   style="Accent.TButton").pack(side="left", padx=(0, 8))
+        ttk.Button(buttons, text="📂 From file…", command=resolve_file,
+                   style="Info.TButton").pack(side="left")
+
+        address_var.trace_add("write", look_up)
+        address_entry.bind("<Return>", look_up)
+        tree.bind("<Double-1>", open_config)
+        window.bind("<Destroy>", closed)
+        self.status.subscribe(on_snapshot)
+        self.routes.sync_status(self.status.snapshot)
+        show_counts()
+        self._routes_stale = True
+        sync_configs()
+        self.update_status()
+        address_entry.focus_set()
+
+    @TIMINGS.timed("ui edit config")
+    def edit_config(self, iface=None, line=None):
+        iface = iface or self.get_if()
         if not iface:
             return
 
         conf_path = self._resolve_conf_path(iface)
+        # Root-only configs are read through the helper: not on the Tk thread
+        self.jobs.call(self._read_config, conf_path, label="read config",
+                       on_done=lambda job: self._open_editor(iface, conf_path, line, job))
 
-        if not os.path.exists(conf_path):
+    def _open_editor(self, iface, conf_path, line, job):
+        if isinstance(job.exception, FileNotFoundError):
             messagebox.showerror("Error", "%s does not exist." % conf_path)
             return
+        if job.error is not None:
+            messagebox.showerror("Error", job.error)
+            return
+        content = job.result
+
+        # One editor window is built on first use and reused afterwards
+        if self._editor is None or not self._editor.winfo_exists():
+            self._build_editor()
+        editor, text = self._editor, self._editor_text
+        if (editor.winfo_viewable() and text.edit_modified()
+                and not messagebox.askyesno("Unsaved changes", "Discard the changes to %s?"
+                                            % self._editor_target[1], parent=editor)):
+            return
 
-        editor = tk.Toplevel(self.root)
+        self._editor_target = (iface, conf_path)
         editor.title("✏️  Editing %s" % os.path.basename(conf_path))
+        self._editor_subtitle.config(text=conf_path)
+
+        # Load file
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, content)
+        text.edit_modified(False)
+        self._show_lint([])
+        text.mark_set(tk.INSERT, "1.0")
+        text.see("1.0")
+        if line:
+            text.mark_set(tk.INSERT, "%d.0" % line)
+            text.see("%d.0" % line)
+            text.tag_add("sel", "%d.0" % line, "%d.0 lineend" % line)
+        editor.deiconify()
+        editor.lift()
+        text.focus_set()
+
+    def _build_editor(self):
+        editor = tk.Toplevel(self.root)
         editor.configure(bg=COLORS["bg"])
-        editor.geometry("900x650")
+        self._track_geometry(editor, "editor", "900x650")
+        editor.protocol("WM_DELETE_WINDOW", self._hide_editor)
 
         # Header
         header = tk.Frame(editor, bg=COLORS["bg_light"])
@@ -659,7 +2289,7 @@ class WireGuardGUI:
 
         subtitle = tk.Label(
             header,
-            text=conf_path,
+            text="",
             font=("Segoe UI", 9),
             bg=COLORS["bg_light"],
             fg=COLORS["fg_muted"]
@@ -690,26 +2320,75 @@ class WireGuardGUI:
             pady=12
         )
         text.pack(fill="both", expand=True, padx=1, pady=1)
+        text.tag_configure("lint_error", background="#3d1418")
+        text.tag_configure("lint_warning", background="#33290f")
+
+        # Diagnostics from the config linter, click to jump to the line
+        lint_frame = tk.Frame(editor, bg=COLORS["bg"])
+        lint_frame.pack(fill="x", padx=15, pady=(0, 10))
+        lint_summary = tk.Label(
+            lint_frame,
+            text="",
+            font=("Segoe UI", 9, "bold"),
+            bg=COLORS["bg"],
+            fg=COLORS["fg_muted"],
+            anchor="w"
+        )
+        lint_summary.pack(fill="x")
+        lint_list = tk.Listbox(
+            lint_frame,
+            height=5,
+            font=("JetBrains Mono", 9),
+            bg=COLORS["surface_light"],
+            fg=COLORS["fg"],
+            selectbackground=COLORS["accent"],
+            relief="flat",
+            activestyle="none"
+        )
 
-        # Load file
-        with open(conf_path) as f:
-            text.insert(tk.END, f.read())
+        def jump_to_diagnostic(event=None):
+            selection = lint_list.curselection()
+            if not selection:
+                return
+            lineno = self._editor_diagnostics[selection[0]].lineno or 1
+            text.mark_set(tk.INSERT, "%d.0" % lineno)
+            text.see("%d.0" % lineno)
+            text.focus_set()
+
+        lint_list.bind("<<ListboxSelect>>", jump_to_diagnostic)
 
         # Button frame
         button_frame = tk.Frame(editor, bg=COLORS["bg"])
         button_frame.pack(fill="x", padx=15, pady=(0, 15))
 
-        def save_changes():
+        @TIMINGS.timed("ui save editor")
+        def save_changes(apply=False):
+            iface, conf_path = self._editor_target
             content = text.get("1.0", tk.END)
-            try:
-                with open(conf_path, "w") as f:
-                    f.write(content)
-                messagebox.showinfo("✓ Saved", "Configuration saved successfully!")
-                editor.destroy()
-            except PermissionError:
+            problems = lint.errors(self._lint_editor(content))
+            if problems and not messagebox.askyesno(
+                    "Config problems",
+                    "%s has %d error(s):\n\n%s\n\nSave anyway?" % (
+                        os.path.basename(conf_path), len(problems),
+                        lint.format_diagnostics(problems[:8])),
+                    icon="warning", parent=editor):
+                return
+            self.jobs.call(self._write_config, conf_path, content, label="write config",
+                           on_done=lambda job: saved(job, iface, apply))
+
+        def saved(job, iface, apply):
+            if isinstance(job.exception, PermissionError):
                 messagebox.showerror("Error", "Permission denied. Run as root or use sudo.")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+                return
+            if job.error is not None:
+                messagebox.showerror("Error", job.error)
+                return
+            if apply:
+                self._hide_editor()
+                self.apply_live(iface)
+                return
+            messagebox.showinfo("✓ Saved", "Configuration saved successfully!")
+            self._hide_editor()
 
         ttk.Button(
             button_frame,
@@ -718,13 +2397,74 @@ class WireGuardGUI:
             style="Success.TButton"
         ).pack(side="left", padx=5)
 
+        ttk.Button(
+            button_frame,
+            text="⚡ Save & Apply Live",
+            command=lambda: save_changes(apply=True),
+            style="Accent.TButton"
+        ).pack(side="left", padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="🔍 Check",
+            command=self._lint_editor,
+            style="Info.TButton"
+        ).pack(side="left", padx=5)
+
         ttk.Button(
             button_frame,
             text="✖ Cancel",
-            command=editor.destroy,
+            command=self._hide_editor,
             style="Danger.TButton"
         ).pack(side="left", padx=5)
 
+        self._editor = editor
+        self._editor_text = text
+        self._editor_subtitle = subtitle
+        self._editor_lint = lint_list
+        self._editor_lint_summary = lint_summary
+
+    @TIMINGS.timed("ui lint config")
+    def _lint_editor(self, content=None):
+        """Lint the editor text and show the diagnostics; returns them."""
+        if content is None:
+            content = self._editor_text.get("1.0", tk.END)
+        diagnostics = lint.lint(content, self._editor_target[1])
+        self._show_lint(diagnostics)
+        if not diagnostics:
+            self._editor_lint_summary.config(text="✓ No problems found", fg=COLORS["success"])
+        return diagnostics
+
+    def _show_lint(self, diagnostics):
+        """Highlight the lines of diagnostics and list them under the editor."""
+        text, listbox = self._editor_text, self._editor_lint
+        self._editor_diagnostics = diagnostics
+        text.tag_remove("lint_error", "1.0", tk.END)
+        text.tag_remove("lint_warning", "1.0", tk.END)
+        listbox.delete(0, tk.END)
+        for diagnostic in diagnostics:
+            line = diagnostic.lineno or 1
+            text.tag_add("lint_%s" % diagnostic.severity, "%d.0" % line, "%d.0 lineend" % line)
+            listbox.insert(tk.END, "%5d  %-7s  %s" % (line, diagnostic.severity, diagnostic.message))
+            if diagnostic.severity == lint.ERROR:
+                listbox.itemconfig(tk.END, fg=COLORS["danger"])
+        if not diagnostics:
+            listbox.pack_forget()
+            self._editor_lint_summary.config(text="")
+            return
+        # Errors win over warnings on lines that have both
+        text.tag_raise("lint_error", "lint_warning")
+        errors = len(lint.errors(diagnostics))
+        self._editor_lint_summary.config(
+            text="%d error(s), %d warning(s)" % (errors, len(diagnostics) - errors),
+            fg=COLORS["danger"] if errors else COLORS["warning"])
+        listbox.pack(fill="x", pady=(4, 0))
+
+    def _hide_editor(self):
+        """Close the editor; the window is kept for the next edit."""
+        self._editor.withdraw()
+        self._editor_text.edit_modified(False)
+
 # ---------------------------
 # Main
 # ---------------------------
@@ -0,0 +1 @@
+"""Support modules for the WireGuard GUI Manager."""
@@ -0,0 +1,374 @@
+"""Persistent traffic accounting.
+
+The Accountant turns the cumulative rx/tx counters of status snapshots
+into per-peer deltas and appends them, summed per minute and per hour,
+to RingFiles under the user's state directory.  A counter that drops
+means the interface was restarted and counts from zero; traffic after
+the last snapshot before an interface goes down is not seen.
+Per-second sampling costs a dict update per active peer; the files are
+written once a minute.
+
+Per-interface totals go to rings of their own: the per-peer rings hold
+a record per active peer and bucket, so on a big hub they only reach
+back as far as their capacity allows (about 180 active peers for a full
+day or month), while the totals still cover the whole range.
+
+Only one process writes: the Accountant holding the exclusive lock on
+``traffic.lock``.  Other instances (a second GUI) only read, and take
+over once the writer exits, so deltas are never counted twice.
+
+A RingFile is a fixed-size, memory-mapped file: a small header followed
+by ``capacity`` fixed-size records.  Records are packed straight into the
+map with ``struct.pack_into`` and, since they are appended in time order,
+a time range is found by binary search over the ring.  When the ring is
+full the oldest records are overwritten, so the files never grow.
+"""
+import base64
+import binascii
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+
+from wireguard_gui.status import interface_name
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Ranges offered by the history panel: (label, seconds, resolution).
+RANGES = (
+    ("Last hour", HOUR, MINUTE),
+    ("Last day", DAY, MINUTE),
+    ("Last month", 30 * DAY, HOUR),
+)
+
+MINUTE_CAPACITY = 262144
+HOUR_CAPACITY = 131072
+# Interface totals: a day of minutes for 45 interfaces, a month of hours for 90
+TOTALS_CAPACITY = 65536
+WRITER_RETRY = 60
+
+MAGIC = b"WGACCT1\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQI")
+HEADER_SIZE = 64
+# timestamp, flags, reserved, interface name, raw peer public key, rx, tx
+RECORD = struct.Struct("<IHH16s32sQQ")
+
+
+def state_dir():
+    """$XDG_STATE_HOME/wireguard-gui (~/.local/state/wireguard-gui)."""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "wireguard-gui")
+
+
+def _raw_key(public_key):
+    try:
+        raw = base64.b64decode(public_key, validate=True)
+    except (binascii.Error, ValueError):
+        raw = b""
+    return raw if len(raw) == 32 else public_key.encode()[:32].ljust(32, b"\0")
+
+
+def _key_text(raw):
+    return base64.b64encode(raw).decode()
+
+
+class AccountingError(Exception):
+    """The accounting file is unusable."""
+
+
+class RingFile:
+    """Fixed-record ring buffer in a memory-mapped file."""
+
+    def __init__(self, path, capacity, resolution):
+        self.path = path
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                capacity = self._prepare(fd, capacity)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self.capacity = capacity
+            self.map = mmap.mmap(fd, HEADER_SIZE + capacity * RECORD.size)
+        except Exception:
+            os.close(fd)
+            raise
+        self.fd = fd
+
+    def _prepare(self, fd, capacity):
+        """Validate an existing file or lay out a new one; returns the capacity."""
+        size = os.fstat(fd).st_size
+        if size >= HEADER_SIZE:
+            magic, version, record_size, existing, head, count, resolution = HEADER.unpack(
+                os.pread(fd, HEADER.size, 0))
+            if (magic == MAGIC and version == VERSION and record_size == RECORD.size
+                    and size == HEADER_SIZE + existing * RECORD.size):
+                return existing
+            if size:
+                os.rename(self.path, self.path + ".bad")
+                raise AccountingError("%s had an unknown layout; moved to %s.bad" % (self.path, self.path))
+        os.ftruncate(fd, HEADER_SIZE + capacity * RECORD.size)
+        os.pwrite(fd, HEADER.pack(MAGIC, VERSION, RECORD.size, capacity, 0, 0, self.resolution), 0)
+        return capacity
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            os.close(self.fd)
+            self.map = None
+
+    def _state(self):
+        _, _, _, _, head, count, _ = HEADER.unpack_from(self.map, 0)
+        return head, count
+
+    def __len__(self):
+        return self._state()[1]
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+    def append(self, records):
+        """Append (timestamp, interface, public key, rx, tx) records."""
+        if not records:
+            return
+        with self._lock:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                head, count = self._state()
+                for timestamp, iface, key, rx, tx in records:
+                    RECORD.pack_into(self.map, HEADER_SIZE + head * RECORD.size, int(timestamp), 0, 0,
+                                     iface.encode()[:16], _raw_key(key), rx, tx)
+                    head = (head + 1) % self.capacity
+                count = min(self.capacity, count + len(records))
+                struct.pack_into("<QQ", self.map, 24, head, count)
+                self.map.flush()
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    # ---------------------------
+    # Reading
+    # ---------------------------
+    def _timestamp(self, head, count, index):
+        """Timestamp of the index-th oldest record."""
+        slot = (head - count + index) % self.capacity
+        return struct.unpack_from("<I", self.map, HEADER_SIZE + slot * RECORD.size)[0]
+
+    def _bisect(self, head, count, timestamp):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamp(head, count, mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def oldest(self):
+        """Timestamp of the oldest record, or None when empty."""
+        with self._lock:
+            head, count = self._state()
+            return self._timestamp(head, count, 0) if count else None
+
+    def read(self, start, end=None):
+        """Raw records with start <= timestamp < end, oldest first.
+
+        Returns (timestamp, interface, raw key, rx, tx); keys stay raw so
+        callers only encode the ones they show.
+        """
+        with self._lock:
+            # The writer may be another process; see it finish appending first.
+            fcntl.flock(self.fd, fcntl.LOCK_SH)
+            try:
+                head, count = self._state()
+                first = self._bisect(head, count, start)
+                last = count if end is None else self._bisect(head, count, end)
+                if first >= last:
+                    return []
+                # Copy the (at most two) contiguous segments out under the lock.
+                begin = (head - count + first) % self.capacity
+                stop = (head - count + last) % self.capacity or self.capacity
+                if begin < stop:
+                    chunks = [self.map[HEADER_SIZE + begin * RECORD.size:HEADER_SIZE + stop * RECORD.size]]
+                else:
+                    chunks = [self.map[HEADER_SIZE + begin * RECORD.size:],
+                              self.map[HEADER_SIZE:HEADER_SIZE + stop * RECORD.size]]
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        records = []
+        for chunk in chunks:
+            for timestamp, _, _, iface, key, rx, tx in RECORD.iter_unpack(chunk):
+                records.append((timestamp, iface.rstrip(b"\0").decode(), key, rx, tx))
+        return records
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def rollup(records, start, end, buckets):
+    """Downsample records into ``buckets`` equal [(bucket start, rx, tx)] bins."""
+    width = max(1, (end - start) / buckets)
+    rx = [0] * buckets
+    tx = [0] * buckets
+    for timestamp, _, _, r, t in records:
+        index = min(buckets - 1, int((timestamp - start) / width))
+        if index >= 0:
+            rx[index] += r
+            tx[index] += t
+    return [(start + i * width, rx[i], tx[i]) for i in range(buckets)]
+
+
+def per_peer(records):
+    """{(interface, public key): [rx, tx]} totals over records."""
+    totals = {}
+    for _, iface, key, rx, tx in records:
+        entry = totals.get((iface, key))
+        if entry is None:
+            totals[(iface, key)] = [rx, tx]
+        else:
+            entry[0] += rx
+            entry[1] += tx
+    return {(iface, _key_text(key)): value for (iface, key), value in totals.items()}
+
+
+class Accountant:
+    """Turns status snapshots into persistent per-peer traffic deltas."""
+
+    def __init__(self, directory=None, minute_capacity=MINUTE_CAPACITY, hour_capacity=HOUR_CAPACITY,
+                 totals_capacity=TOTALS_CAPACITY):
+        self.directory = directory or state_dir()
+        opened = []
+        try:
+            for name, capacity, resolution in (("traffic-minutes", minute_capacity, MINUTE),
+                                               ("traffic-hours", hour_capacity, HOUR),
+                                               ("traffic-minutes-totals", totals_capacity, MINUTE),
+                                               ("traffic-hours-totals", totals_capacity, HOUR)):
+                opened.append(RingFile(os.path.join(self.directory, name + ".ring"), capacity, resolution))
+            self._lock_fd = os.open(os.path.join(self.directory, "traffic.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        except Exception:
+            # Don't leak the fds and mappings of the rings opened so far
+            for ring in opened:
+                ring.close()
+            raise
+        self.minutes, self.hours, self.minute_totals, self.hour_totals = opened
+        # (resolution, ring, whether it holds interface totals)
+        self._rings = ((MINUTE, self.minutes, False), (HOUR, self.hours, False),
+                       (MINUTE, self.minute_totals, True), (HOUR, self.hour_totals, True))
+        self._last = {}
+        self._interfaces = None
+        self._buckets = {ring: (None, {}) for _, ring, _ in self._rings}
+        self._retry_at = 0
+        self.writer = False
+        self._acquire(0)
+
+    def _acquire(self, now):
+        """Try to become the writer; returns whether this instance is."""
+        if not self.writer and now >= self._retry_at:
+            try:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._retry_at = now + WRITER_RETRY
+                return False
+            # Counters seen so far may already be accounted by the old writer.
+            self.writer = True
+            self._last = {}
+            self._interfaces = None
+        return self.writer
+
+    def close(self):
+        self.flush()
+        for _, ring, _ in self._rings:
+            ring.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            self.writer = False
+
+    def record(self, snapshot):
+        """Account a snapshot; use as a StatusEngine subscriber."""
+        if not snapshot.ok:
+            return
+        now = int(snapshot.taken_at)
+        if not self._acquire(now):
+            return
+        last = self._last
+        running = self._interfaces
+        seen = {}
+        deltas = []
+        for name, interface in snapshot.interfaces.items():
+            for peer in interface.peers:
+                ident = (name, peer.public_key)
+                counters = (peer.rx_bytes, peer.tx_bytes)
+                seen[ident] = counters
+                previous = last.get(ident)
+                if previous is None:
+                    if running is None:
+                        # First snapshot: the counters predate us.
+                        continue
+                    # Came up (or was added) since the last snapshot: all new.
+                    previous = (0, 0)
+                rx = counters[0] - previous[0] if counters[0] >= previous[0] else counters[0]
+                tx = counters[1] - previous[1] if counters[1] >= previous[1] else counters[1]
+                if rx or tx:
+                    deltas.append((ident, rx, tx))
+        self._last = seen
+        self._interfaces = set(snapshot.interfaces)
+        for resolution, ring, totals in self._rings:
+            bucket = now - now % resolution
+            current, sums = self._buckets[ring]
+            if current is not None and bucket != current:
+                self._write(ring, current, sums)
+                sums = {}
+            for ident, rx, tx in deltas:
+                if totals:
+                    ident = (ident[0], "")
+                entry = sums.get(ident)
+                if entry is None:
+                    sums[ident] = [rx, tx]
+                else:
+                    entry[0] += rx
+                    entry[1] += tx
+            self._buckets[ring] = (bucket, sums)
+
+    def flush(self):
+        """Write partial buckets (on exit); a later write of the same bucket adds up."""
+        for _, ring, _ in self._rings:
+            current, sums = self._buckets[ring]
+            if current is not None:
+                self._write(ring, current, sums)
+            self._buckets[ring] = (current, {})
+
+    @staticmethod
+    def _write(ring, bucket, sums):
+        ring.append([(bucket, iface, key, rx, tx) for (iface, key), (rx, tx) in sums.items()])
+
+    def query(self, seconds, resolution=None, iface=None, now=None, totals=False):
+        """Records of the last ``seconds``, from the ring of the given resolution.
+
+        With totals, one record per interface and bucket (key all zeros)
+        from the totals rings, which cover the whole range on big hubs too.
+        """
+        now = now or time.time()
+        if resolution is None:
+            resolution = MINUTE if seconds <= DAY else HOUR
+        if totals:
+            ring = self.minute_totals if resolution == MINUTE else self.hour_totals
+        else:
+            ring = self.minutes if resolution == MINUTE else self.hours
+        records = ring.read(int(now - seconds))
+        if iface is not None:
+            name = interface_name(iface)
+            records = [r for r in records if r[1] == name]
+        return records
+
+    def peers_since(self, resolution):
+        """Oldest time the per-peer ring of resolution still covers, or None."""
+        return (self.minutes if resolution == MINUTE else self.hours).oldest()
@@ -0,0 +1,246 @@
+"""Bring many interfaces up or down at once.
+
+dependency_waves orders interfaces so that a tunnel whose peer endpoint
+is reached through another tunnel (the endpoint address falls inside the
+other config's AllowedIPs) comes up after it and goes down before it.
+BulkOperation then runs the waves with at most ``max_parallel`` commands
+in flight, skips interfaces whose dependency failed, and times every
+interface so the result can be reported in aggregate.
+
+Only IP endpoints are considered; host names would need resolving before
+anything is up, which is exactly what cannot be relied on here.
+"""
+import time
+
+from wireguard_gui.jobs import DONE
+from wireguard_gui.prefixes import PrefixTrie, parse_prefix
+from wireguard_gui.status import interface_name
+
+MAX_PARALLEL = 4
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def _endpoint_address(endpoint):
+    host = endpoint.rpartition(":")[0].strip("[]")
+    if not host:
+        return None
+    try:
+        return parse_prefix(host)
+    except ValueError:
+        return None
+
+
+def _routed_networks(config):
+    """Networks wg-quick routes through this tunnel (none with Table = off)."""
+    if (config.interface.get("Table") or "auto").lower() == "off":
+        return []
+    networks = []
+    for peer in config.peers:
+        for item in peer.get_list("AllowedIPs"):
+            try:
+                networks.append(parse_prefix(item, strict=False))
+            except ValueError:
+                pass
+    return networks
+
+
+def dependencies(configs):
+    """{target: set of targets it is reached through}, from {target: WgConfig}.
+
+    A default route (0.0.0.0/0, ::/0) does not count: wg-quick excludes
+    the tunnel's own endpoints from it with policy routing.  Every tunnel's
+    networks go in a PrefixTrie, so a hub with thousands of peers costs a
+    short walk per endpoint rather than a comparison per network.
+    """
+    routes = {}
+    for target, config in configs.items():
+        trie = routes[target] = PrefixTrie()
+        for network in _routed_networks(config):
+            if network.length:
+                trie.insert(network, target)
+    result = {}
+    for target, config in configs.items():
+        needs = set()
+        for peer in config.peers:
+            address = _endpoint_address(peer.get("Endpoint") or "")
+            if address is None:
+                continue
+            for other, trie in routes.items():
+                if other != target and other not in needs and trie.lookup(address) is not None:
+                    needs.add(other)
+        result[target] = needs
+    return result
+
+
+def dependency_waves(targets, depends):
+    """Split targets into waves; each wave only depends on earlier ones.
+
+    Returns (waves, cyclic) where cyclic lists targets caught in a
+    dependency cycle, which are put in a last wave of their own.
+    """
+    remaining = {t: set(depends.get(t, ())) & set(targets) for t in targets}
+    waves = []
+    while remaining:
+        ready = [t for t in targets if t in remaining and not remaining[t]]
+        if not ready:
+            break
+        waves.append(ready)
+        for t in ready:
+            del remaining[t]
+        for needs in remaining.values():
+            needs.difference_update(ready)
+    cyclic = [t for t in targets if t in remaining]
+    if cyclic:
+        waves.append(cyclic)
+    return waves, cyclic
+
+
+class Result:
+    """Outcome of one interface in a bulk operation."""
+
+    def __init__(self, target, op):
+        self.target = target
+        self.op = op
+        self.state = None
+        self.detail = ""
+        self.started = None
+        self.finished = None
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def line(self):
+        duration = "%6.2fs" % self.duration if self.duration is not None else "      -"
+        text = "%-7s %-5s %s %s" % (self.state or "pending", self.op, duration, interface_name(self.target))
+        return text + ("  (%s)" % self.detail if self.detail else "")
+
+
+class BulkOperation:
+    """Run up/down over waves of targets with bounded concurrency.
+
+    ``submit(op, target, on_done)`` starts the command and must call
+    on_done(job) when it finishes (a Job; state DONE means success).
+    Everything runs on the caller's thread via these callbacks.
+    """
+
+    def __init__(self, op, waves, submit, depends=None, max_parallel=MAX_PARALLEL,
+                 on_result=None, on_finished=None, clock=time.monotonic):
+        self.op = op
+        self.waves = [list(wave) for wave in waves]
+        self.submit = submit
+        self.depends = depends or {}
+        self.max_parallel = max(1, max_parallel)
+        self.on_result = on_result
+        self.on_finished = on_finished
+        self.clock = clock
+        self.results = {}
+        self.started = None
+        self.finished = None
+        self._wave = 0
+        self._queue = []
+        self._running = 0
+        self._cancelled = False
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def start(self):
+        self.started = self.clock()
+        self._next_wave()
+        return self
+
+    def cancel(self):
+        """Start nothing new; running commands finish normally."""
+        self._cancelled = True
+        for wave in self.waves:
+            for target in wave:
+                if target not in self.results:
+                    self._skip(target, "cancelled")
+        self._queue = []
+        self._maybe_finish()
+
+    def _skip(self, target, reason):
+        result = self.results[target] = Result(target, self.op)
+        result.state = SKIPPED
+        result.detail = reason
+        if self.on_result:
+            self.on_result(result)
+
+    def _next_wave(self):
+        while self._wave < len(self.waves) and not self._cancelled:
+            wave = self.waves[self._wave]
+            self._wave += 1
+            self._queue = []
+            for target in wave:
+                if target in self.results:
+                    continue
+                failed = [d for d in self.depends.get(target, ())
+                          if d in self.results and self.results[d].state != OK]
+                if failed and self.op == "up":
+                    self._skip(target, "depends on %s" % ", ".join(interface_name(d) for d in failed))
+                else:
+                    self._queue.append(target)
+            if self._queue:
+                self._pump()
+                return
+        self._maybe_finish()
+
+    def _pump(self):
+        while self._queue and self._running < self.max_parallel:
+            target = self._queue.pop(0)
+            result = self.results[target] = Result(target, self.op)
+            result.started = self.clock()
+            self._running += 1
+            self.submit(self.op, target, lambda job, r=result: self._done(r, job))
+
+    def _done(self, result, job):
+        result.finished = self.clock()
+        self._running -= 1
+        if job.state == DONE:
+            result.state = OK
+        else:
+            result.state = FAILED
+            result.detail = "%s, exit code %s" % (job.state, job.returncode)
+        if self.on_result:
+            self.on_result(result)
+        if self._queue:
+            self._pump()
+        elif not self._running:
+            self._next_wave()
+
+    def _maybe_finish(self):
+        if self._running or self._queue or self.finished is not None:
+            return
+        if self._wave < len(self.waves) and not self._cancelled:
+            return
+        self.finished = self.clock()
+        if self.on_finished:
+            self.on_finished(self)
+
+    def summary(self):
+        """Aggregate report: one line per interface, then totals."""
+        order = [t for wave in self.waves for t in wave]
+        lines = [self.results[t].line() for t in order if t in self.results]
+        counts = {}
+        for result in self.results.values():
+            counts[result.state] = counts.get(result.state, 0) + 1
+        durations = [r.duration for r in self.results.values() if r.duration is not None]
+        wall = (self.finished or self.clock()) - self.started
+        lines.append("")
+        lines.append("%d ok, %d failed, %d skipped in %.2fs (%d wave(s), up to %d at a time; "
+                     "%.2fs of commands, slowest %.2fs)" % (
+                         counts.get(OK, 0), counts.get(FAILED, 0), counts.get(SKIPPED, 0), wall,
+                         len(self.waves), self.max_parallel, sum(durations),
+                         max(durations) if durations else 0.0))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,400 @@
+"""WireGuard config files.
+
+Parses wg-quick style configs into an interface section and a list of
+peer sections.  Keys are matched case-insensitively like wg-quick does
+and stored under their canonical spelling.  Comments, blank lines and
+the spelling of untouched lines are kept, so ``WgConfig.to_text`` gives
+back the original file until something is changed.
+
+Parsed configs are shared through a process-wide ConfigCache keyed by
+path, mtime and size, which also maintains lookup indexes (public key ->
+peer, endpoint -> peers, config -> interface name) over everything it
+holds.  Cached configs are read-only; ``WgConfig.copy`` gives one that
+can be edited (cheap: lines are shared until changed).
+"""
+import collections
+import os
+import threading
+
+# Keys understood by wg itself; everything else in [Interface] is wg-quick's.
+WG_INTERFACE_KEYS = ("PrivateKey", "ListenPort", "FwMark")
+WG_QUICK_INTERFACE_KEYS = (
+    "Address", "DNS", "MTU", "Table", "PreUp", "PostUp", "PreDown", "PostDown", "SaveConfig",
+)
+PEER_KEYS = ("PublicKey", "PresharedKey", "AllowedIPs", "Endpoint", "PersistentKeepalive")
+
+# Keys that may be given several times and are accumulated.
+MULTI_KEYS = ("Address", "DNS", "AllowedIPs", "PreUp", "PostUp", "PreDown", "PostDown")
+
+_CANONICAL = {key.lower(): key for key in WG_INTERFACE_KEYS + WG_QUICK_INTERFACE_KEYS + PEER_KEYS}
+
+CACHE_SIZE = 1024
+
+
+class ConfigError(ValueError):
+    """A config file could not be parsed."""
+
+    def __init__(self, message, lineno=None):
+        ValueError.__init__(self, "line %d: %s" % (lineno, message) if lineno else message)
+        self.lineno = lineno
+
+
+def split_list(value):
+    """Split a comma separated value (Address, DNS, AllowedIPs)."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Line:
+    """One line of a config file; key/value lines are re-rendered when edited."""
+
+    __slots__ = ("raw", "key", "value", "comment", "lineno", "dirty")
+
+    def __init__(self, raw, key=None, value=None, comment="", lineno=None):
+        self.raw = raw
+        self.key = key
+        self.value = value
+        self.comment = comment
+        self.lineno = lineno
+        self.dirty = False
+
+    def render(self):
+        if not self.dirty:
+            return self.raw
+        text = "%s = %s" % (self.key, self.value)
+        return "%s %s" % (text, self.comment) if self.comment else text
+
+
+class Section:
+    """One [Interface] or [Peer] section and the lines that belong to it."""
+
+    def __init__(self, kind, header=None):
+        self.kind = kind
+        self.header = header or Line("[%s]" % kind)
+        self.lines = []
+
+    @property
+    def lineno(self):
+        return self.header.lineno
+
+    def _entries(self, key):
+        return [line for line in self.lines if line.key == key]
+
+    def get(self, key, default=None):
+        """Value of a key; for multi keys the first occurrence."""
+        for line in self.lines:
+            if line.key == key:
+                return line.value
+        return default
+
+    def get_list(self, key):
+        """All values of a key, with comma separated items split."""
+        items = []
+        for line in self._entries(key):
+            items.extend(split_list(line.value))
+        return items
+
+    def line_of(self, key):
+        for line in self.lines:
+            if line.key == key:
+                return line.lineno
+        return None
+
+    @property
+    def values(self):
+        """{key: value} (lists for multi keys), for quick inspection."""
+        result = {}
+        for line in self.lines:
+            if line.key is None:
+                continue
+            if line.key in MULTI_KEYS:
+                result.setdefault(line.key, []).append(line.value)
+            else:
+                result[line.key] = line.value
+        return result
+
+    def add(self, key, value, comment="", lineno=None, raw=None):
+        line = Line(raw if raw is not None else "%s = %s" % (key, value), key, value, comment, lineno)
+        # Keep trailing comments/blank lines after the new entry.
+        index = len(self.lines)
+        while index and self.lines[index - 1].key is None:
+            index -= 1
+        self.lines.insert(index, line)
+        return line
+
+    def set(self, key, value):
+        """Replace all occurrences of key by a single value (None removes it)."""
+        entries = self._entries(key)
+        if value is None:
+            self.remove(key)
+            return
+        if not entries:
+            self.add(key, value)
+            return
+        # Lines are shared between copies of a config, so replace rather than edit.
+        first = entries[0]
+        line = Line(first.raw, key, value, first.comment, first.lineno)
+        line.dirty = True
+        self.lines[self.lines.index(first)] = line
+        for line in entries[1:]:
+            self.lines.remove(line)
+
+    def remove(self, key):
+        self.lines = [line for line in self.lines if line.key != key]
+
+    def render(self):
+        return [self.header.raw] + [line.render() for line in self.lines]
+
+    def copy(self):
+        section = Section(self.kind, self.header)
+        section.lines = list(self.lines)
+        return section
+
+
+class WgConfig:
+    """A parsed wg-quick config."""
+
+    def __init__(self, interface=None, peers=None, path=None):
+        self.interface = interface or Section("Interface")
+        self.peers = peers if peers is not None else []
+        self.path = path
+        self.preamble = []
+        self._order = [self.interface] + list(self.peers)
+        # (mtime_ns, size) of the file this was parsed from, set by ConfigCache
+        self.stamp = None
+
+    @property
+    def name(self):
+        """Interface name wg-quick derives from the file name."""
+        if not self.path:
+            return None
+        base = os.path.basename(self.path)
+        return base[:-5] if base.endswith(".conf") else base
+
+    def peer(self, public_key):
+        for peer in self.peers:
+            if peer.get("PublicKey") == public_key:
+                return peer
+        return None
+
+    def add_peer(self):
+        last = self._order[-1] if self._order else None
+        if last is not None and (not last.lines or last.lines[-1].raw.strip()):
+            last.lines.append(Line(""))
+        section = Section("Peer")
+        self.peers.append(section)
+        self._order.append(section)
+        return section
+
+    def remove_peer(self, section):
+        self.peers.remove(section)
+        self._order.remove(section)
+
+    def copy(self):
+        """A copy that can be edited without changing this config."""
+        sections = {id(section): section.copy() for section in self._order}
+        if id(self.interface) not in sections:
+            sections[id(self.interface)] = self.interface.copy()
+        config = WgConfig(sections[id(self.interface)], [sections[id(p)] for p in self.peers], self.path)
+        config._order = [sections[id(section)] for section in self._order]
+        config.preamble = list(self.preamble)
+        config.stamp = self.stamp
+        return config
+
+    def to_text(self):
+        lines = [line.render() for line in self.preamble]
+        for section in self._order:
+            if section is self.interface and not section.lines and section.header.lineno is None:
+                continue
+            lines.extend(section.render())
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def parse(cls, text, path=None):
+        config = cls(path=path)
+        config._order = []
+        section = None
+        seen_interface = False
+        for lineno, raw in enumerate(text.splitlines(), 1):
+            body, sep, comment = raw.partition("#")
+            line = body.strip()
+            comment = sep + comment if sep else ""
+            if not line:
+                target = section.lines if section is not None else config.preamble
+                target.append(Line(raw, lineno=lineno))
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                name = line[1:-1].strip().lower()
+                header = Line(raw, lineno=lineno)
+                if name == "interface":
+                    if seen_interface:
+                        raise ConfigError("duplicate [Interface] section", lineno)
+                    seen_interface = True
+                    section = config.interface
+                    section.header = header
+                elif name == "peer":
+                    section = Section("Peer", header)
+                    config.peers.append(section)
+                else:
+                    raise ConfigError("unknown section [%s]" % line[1:-1], lineno)
+                config._order.append(section)
+                continue
+            if "=" not in line:
+                raise ConfigError("expected key = value", lineno)
+            if section is None:
+                raise ConfigError("key outside of a section", lineno)
+            key, value = line.split("=", 1)
+            key = _CANONICAL.get(key.strip().lower(), key.strip())
+            section.lines.append(Line(raw, key, value.strip(), comment.strip(), lineno))
+        if not seen_interface:
+            config._order.insert(0, config.interface)
+        return config
+
+
+def parse_config(text, path=None):
+    return WgConfig.parse(text, path)
+
+
+def load_config(path):
+    with open(path) as f:
+        return WgConfig.parse(f.read(), path)
+
+
+# ---------------------------
+# Cache and indexes
+# ---------------------------
+class ConfigIndex:
+    """Secondary lookups over a set of parsed configs, updated per path."""
+
+    def __init__(self):
+        self.by_key = collections.defaultdict(list)
+        self.by_endpoint = collections.defaultdict(list)
+        self.names = {}
+        self._entries = {}
+
+    def add(self, path, config):
+        self.remove(path)
+        keys = []
+        endpoints = []
+        for peer in config.peers:
+            key = peer.get("PublicKey")
+            if key:
+                self.by_key[key].append((path, peer))
+                keys.append(key)
+            endpoint = peer.get("Endpoint")
+            if endpoint:
+                self.by_endpoint[endpoint].append((path, peer))
+                endpoints.append(endpoint)
+        self.names[path] = config.name
+        self._entries[path] = (keys, endpoints)
+
+    def remove(self, path):
+        entry = self._entries.pop(path, None)
+        self.names.pop(path, None)
+        if entry is None:
+            return
+        keys, endpoints = entry
+        for table, values in ((self.by_key, keys), (self.by_endpoint, endpoints)):
+            for value in values:
+                remaining = [item for item in table[value] if item[0] != path]
+                if remaining:
+                    table[value] = remaining
+                else:
+                    del table[value]
+
+    def peers_by_key(self, public_key):
+        """[(config path, peer Section)] for a peer public key."""
+        return list(self.by_key.get(public_key, ()))
+
+    def peers_by_endpoint(self, endpoint):
+        return list(self.by_endpoint.get(endpoint, ()))
+
+    def interface_name(self, path):
+        return self.names.get(path)
+
+    def paths_for_interface(self, name):
+        return [path for path, value in self.names.items() if value == name]
+
+
+class ConfigCache:
+    """LRU cache of parsed configs, validated against (mtime, size).
+
+    ``loader`` lets callers supply the text of files they cannot read
+    directly (root-only configs read through the helper), and ``stat``
+    their (mtime_ns, size); without ``stat`` such files are parsed on
+    every call.  A hit returns the cached config itself, so it costs a
+    stat and a dict lookup; callers must not change it, and copy() it
+    first when they need to.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.index = ConfigIndex()
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def get(self, path, loader=None, stat=None):
+        """Return a WgConfig for path, parsing it only when it changed."""
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except PermissionError:
+            if loader is None:
+                raise
+            if stat is None:
+                self.misses += 1
+                return parse_config(loader(path), path)
+            stamp = tuple(stat(path))
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        if loader is not None:
+            text = loader(path)
+        else:
+            with open(path) as f:
+                text = f.read()
+        config = parse_config(text, path)
+        self.put(path, config, stamp)
+        return config
+
+    def put(self, path, config, stamp):
+        config.stamp = stamp
+        with self._lock:
+            self._entries[path] = (stamp, config)
+            self._entries.move_to_end(path)
+            self.index.add(path, config)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self.index.remove(old)
+
+    def invalidate(self, path=None):
+        """Forget one path, or everything."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.index = ConfigIndex()
+            elif self._entries.pop(path, None) is not None:
+                self.index.remove(path)
+
+    def paths(self):
+        with self._lock:
+            return list(self._entries)
+
+
+CACHE = ConfigCache()
+
+
+def cached_config(path, loader=None, stat=None):
+    """Parsed config for path from the process-wide cache."""
+    return CACHE.get(path, loader, stat)
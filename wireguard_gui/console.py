@@ -0,0 +1,136 @@
+"""Bounded output console on top of a Tk Text widget.
+
+Writes are queued and flushed once per frame from ``after_idle``, with
+one Text insert per run of same-section text, so a job streaming
+thousands of lines costs a handful of Tk calls per frame instead of one
+per line.  The widget is the only copy of the text and keeps at most
+``max_lines`` lines: once it runs ``trim_chunk`` lines over, the oldest
+lines are deleted from the top in one go, so memory stays bounded and
+trimming stays rare.
+
+Output can be grouped into sections (one per job); clicking a section
+header collapses or expands its body using Text tag elision.
+
+Only the Text widget's methods are used, so this module does not import
+tkinter itself.
+"""
+import itertools
+
+from wireguard_gui.timing import TIMINGS
+
+MAX_LINES = 5000
+TRIM_CHUNK = 500
+
+EXPANDED = "▾"
+COLLAPSED = "▸"
+
+
+class OutputConsole:
+    """Append-only, size-limited view of command output."""
+
+    def __init__(self, text, max_lines=MAX_LINES, trim_chunk=TRIM_CHUNK):
+        self.text = text
+        self.max_lines = max_lines
+        self.trim_chunk = trim_chunk
+        self.sections = {}
+        self._pending = []
+        self._flush_id = None
+        self._ids = itertools.count(1)
+        text.tag_configure("header")
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+    def write(self, data, section=None):
+        """Queue data for display; it appears with the next idle flush."""
+        if not data:
+            return
+        self._pending.append((section, data))
+        if self._flush_id is None:
+            self._flush_id = self.text.after_idle(self.flush)
+
+    def begin_section(self, title):
+        """Start a collapsible section; returns its id for later writes."""
+        section = next(self._ids)
+        self.sections[section] = {"title": title, "collapsed": False}
+        header = "header-%d" % section
+        self.text.tag_bind(header, "<Button-1>", lambda e, s=section: self.toggle(s))
+        self.text.tag_bind(header, "<Enter>", lambda e: self.text.config(cursor="hand2"))
+        self.text.tag_bind(header, "<Leave>", lambda e: self.text.config(cursor=""))
+        self._pending.append((("header", section), "%s $ %s\n" % (EXPANDED, title)))
+        if self._flush_id is None:
+            self._flush_id = self.text.after_idle(self.flush)
+        return section
+
+    def clear(self):
+        self.cancel()
+        self.text.delete("1.0", "end")
+        for section in self.sections:
+            self.text.tag_delete("header-%d" % section, "body-%d" % section)
+        self.sections.clear()
+        self._pending = []
+
+    def cancel(self):
+        if self._flush_id is not None:
+            self.text.after_cancel(self._flush_id)
+            self._flush_id = None
+
+    # ---------------------------
+    # Flushing
+    # ---------------------------
+    @TIMINGS.timed("console flush")
+    def flush(self):
+        """Insert everything queued since the last flush."""
+        self._flush_id = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        at_end = self.text.yview()[1] >= 0.999
+
+        # Merge consecutive writes to the same section into one insert.
+        runs = []
+        for section, data in pending:
+            if runs and runs[-1][0] == section and not isinstance(section, tuple):
+                runs[-1][1].append(data)
+            else:
+                runs.append((section, [data]))
+        for section, chunks in runs:
+            if isinstance(section, tuple):
+                tags = ("header", "header-%d" % section[1])
+            elif section is not None:
+                tags = ("body-%d" % section,)
+            else:
+                tags = ()
+            self.text.insert("end", "".join(chunks), tags)
+
+        self._trim()
+        if at_end:
+            self.text.see("end")
+
+    def _trim(self):
+        lines = int(self.text.index("end-1c").split(".")[0])
+        if lines <= self.max_lines + self.trim_chunk:
+            return
+        self.text.delete("1.0", "%d.0" % (lines - self.max_lines + 1))
+        # Forget sections that have scrolled out entirely.
+        for section in list(self.sections):
+            if not self.text.tag_ranges("header-%d" % section) and not self.text.tag_ranges("body-%d" % section):
+                self.text.tag_delete("header-%d" % section, "body-%d" % section)
+                del self.sections[section]
+
+    # ---------------------------
+    # Sections
+    # ---------------------------
+    def toggle(self, section, collapsed=None):
+        info = self.sections.get(section)
+        if info is None:
+            return
+        if collapsed is None:
+            collapsed = not info["collapsed"]
+        info["collapsed"] = collapsed
+        self.text.tag_configure("body-%d" % section, elide=collapsed)
+        ranges = self.text.tag_ranges("header-%d" % section)
+        if ranges:
+            start = ranges[0]
+            self.text.delete(start, "%s+1c" % start)
+            self.text.insert(start, COLLAPSED if collapsed else EXPANDED, ("header", "header-%d" % section))
@@ -0,0 +1,183 @@
+"""Command layer shared by the GUI and the headless CLI.
+
+Everything here is plain Python: locating configs, reading them (through
+the privileged helper when they are root-only), building the privileged
+command lines, and what the GUI remembers between sessions (kept in
+wireguard_gui.state).
+Nothing in this module, nor anything it imports, may import tkinter, so
+``wireguard-gui.py --headless`` starts quickly and runs from cron.
+"""
+import fnmatch
+import glob
+import os
+import subprocess
+import sys
+
+from wireguard_gui import helper
+from wireguard_gui.state import STATE
+from wireguard_gui.status import FallbackBackend, StatusEngine, make_backend
+from wireguard_gui.timing import TIMINGS, command_kind
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# WG_GUI_CONFIG_DIR points the GUI at another directory (benchmarks, testing)
+CONFIG_DIR = os.environ.get("WG_GUI_CONFIG_DIR") or "/etc/wireguard"
+
+QUICK_TIMEOUT = 15      # wg show / wg-quick status / strip
+WG_QUICK_TIMEOUT = 120  # wg-quick up/down can spend a while on DNS and routes
+
+
+def run_cmd(cmd):
+    """Run shell command and return output or error."""
+    with TIMINGS.timer("run_cmd %s" % command_kind(cmd)):
+        try:
+            out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True)
+            return out
+        except subprocess.CalledProcessError as e:
+            return e.output
+
+
+def resolve_conf_path(iface, config_dir=CONFIG_DIR):
+    """
+    If iface looks like a path to a config file and it exists, use it.
+    Otherwise, treat iface as an interface name in config_dir.
+    """
+    # If iface is an absolute path or contains a path separator and points to an existing file
+    if (os.path.isabs(iface) or os.path.sep in iface) and os.path.exists(iface):
+        return iface
+
+    # Otherwise, assume config_dir/<iface>.conf
+    return os.path.join(config_dir, iface + ".conf")
+
+
+def read_config(conf_path, client=None):
+    """Read a config, going through the helper for root-only files."""
+    try:
+        with open(conf_path) as f:
+            return f.read()
+    except PermissionError:
+        if client is None or not client.ensure_connected():
+            raise
+        return client.request("read_config", target=conf_path)
+
+
+def stat_config(conf_path, client=None):
+    """(mtime_ns, size) of a config, going through the helper for root-only files."""
+    try:
+        st = os.stat(conf_path)
+    except PermissionError:
+        if client is None or not client.ensure_connected():
+            raise
+        return tuple(client.request("stat_config", target=conf_path))
+    return st.st_mtime_ns, st.st_size
+
+
+def write_config(conf_path, content, client=None):
+    try:
+        with open(conf_path, "w") as f:
+            f.write(content)
+    except PermissionError:
+        if client is None or not client.ensure_connected():
+            raise
+        client.request("write_config", target=conf_path, content=content)
+
+
+def list_configs(config_dir=CONFIG_DIR, client=None):
+    """Interface names of the configs in config_dir, sorted."""
+    try:
+        return sorted(f[:-5] for f in os.listdir(config_dir) if f.endswith(".conf"))
+    except PermissionError:
+        # config_dir is root-only; ask the helper when we have one
+        if client is None or not client.ensure_connected():
+            raise
+        return client.request("list_configs")
+    except FileNotFoundError:
+        return []
+
+
+def expand_targets(patterns, config_dir=CONFIG_DIR, client=None):
+    """Interface names and config paths for names, paths and glob patterns.
+
+    A pattern with a path separator is globbed on the filesystem;
+    anything else is matched against the configs in config_dir and the
+    saved custom configs.  "all" means every known config.
+    """
+    names = None
+    targets = []
+    for pattern in patterns:
+        if os.path.sep in pattern:
+            matches = sorted(glob.glob(os.path.expanduser(pattern))) if glob.has_magic(pattern) else [pattern]
+        else:
+            if names is None:
+                try:
+                    names = list_configs(config_dir, client)
+                except OSError:
+                    names = []
+                names += [path for path in load_custom_configs() if os.path.exists(path)]
+            if pattern == "all":
+                matches = names
+            elif glob.has_magic(pattern):
+                matches = [n for n in names if fnmatch.fnmatchcase(os.path.basename(n).replace(".conf", ""),
+                                                                   pattern)]
+            else:
+                matches = [pattern]
+        for match in matches:
+            if match not in targets:
+                targets.append(match)
+    return targets
+
+
+def privileged_command(op, iface=None, sudo_args=()):
+    """wg-quick command line for op, with sudo unless already root."""
+    cmd = ["wg-quick", "status" if op == "quick_status" else op] + ([iface] if iface else [])
+    if os.geteuid() != 0:
+        cmd = ["sudo"] + list(sudo_args) + cmd
+    return cmd
+
+
+def live_apply_command(iface, table, add_routes=(), del_routes=(), sudo_args=()):
+    """Command that applies iface live outside the helper (run with cwd=APP_DIR)."""
+    cmd = [sys.executable, "-m", "wireguard_gui.live", iface, "--table", table]
+    for route in add_routes:
+        cmd += ["--add-route", route]
+    for route in del_routes:
+        cmd += ["--del-route", route]
+    if os.geteuid() != 0:
+        cmd = ["sudo"] + list(sudo_args) + cmd
+    return cmd
+
+
+def connect_helper(post=None, lazy=False):
+    """Client for the privileged helper when not root, else None (see helper.connect)."""
+    return helper.connect(post=post, lazy=lazy) if os.geteuid() != 0 else None
+
+
+def status_engine(client=None):
+    """StatusEngine that asks the helper first when there is one."""
+    if client is not None:
+        return StatusEngine(FallbackBackend(helper.HelperBackend(client), make_backend()))
+    return StatusEngine()
+
+
+# ---------------------------
+# Remembered state
+# ---------------------------
+def load_last_interface():
+    return STATE.get("last_interface", "")
+
+
+def save_last_interface(iface):
+    STATE.set("last_interface", iface)
+
+
+def load_custom_configs():
+    """Load list of custom config file paths."""
+    # Configs that no longer exist are kept; the GUI's watcher shows them
+    # again if they come back
+    return STATE.get("custom_configs", [])
+
+
+def save_custom_config(config_path):
+    """Save a custom config path to the persistent list."""
+    configs = load_custom_configs()
+    if config_path not in configs:
+        STATE.set("custom_configs", configs + [config_path])
@@ -0,0 +1,247 @@
+"""Prometheus exporter mode: ``wireguard-gui.py --exporter``.
+
+Serves tunnel metrics in the Prometheus text format, either over HTTP
+(``/metrics`` on 127.0.0.1:9586 by default) or by rewriting a file for the
+node_exporter textfile collector:
+
+    wireguard-gui.py --exporter
+    wireguard-gui.py --exporter --listen 0.0.0.0:9586 --interval 10
+    wireguard-gui.py --exporter --textfile /var/lib/node_exporter/wireguard.prom
+
+Status comes from the same StatusEngine as the GUI (helper, netlink or
+``wg show all dump``).  SnapshotCache queries at most once per --interval
+no matter how many scrapes arrive: concurrent scrapes wait for the one
+query in flight and all get its result, and the rendered page is kept
+with the snapshot so a scrape is a dictionary lookup.
+
+Nothing here imports tkinter.
+"""
+import argparse
+import http.server
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from wireguard_gui import core
+from wireguard_gui.helper import HelperError
+from wireguard_gui.status import HANDSHAKE_TIMEOUT
+from wireguard_gui.timing import TIMINGS
+
+DEFAULT_LISTEN = "127.0.0.1:9586"
+DEFAULT_INTERVAL = 5.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name: (type, help)
+METRICS = (
+    ("wireguard_exporter_up", "gauge", "Whether the last status query succeeded."),
+    ("wireguard_exporter_queries_total", "counter", "Status queries made by the exporter."),
+    ("wireguard_exporter_query_duration_seconds", "gauge", "Duration of the last status query."),
+    ("wireguard_exporter_snapshot_timestamp_seconds", "gauge", "When the served snapshot was taken."),
+    ("wireguard_interface_up", "gauge", "Whether a configured or running interface is up."),
+    ("wireguard_interface_peers", "gauge", "Peers of a running interface."),
+    ("wireguard_interface_listen_port", "gauge", "UDP port a running interface listens on."),
+    ("wireguard_peer_info", "gauge", "Endpoint and allowed IPs of a peer (always 1)."),
+    ("wireguard_peer_received_bytes_total", "counter", "Bytes received from a peer."),
+    ("wireguard_peer_sent_bytes_total", "counter", "Bytes sent to a peer."),
+    ("wireguard_peer_latest_handshake_seconds", "gauge", "Unix time of the latest handshake, 0 for never."),
+    ("wireguard_peer_handshake_age_seconds", "gauge", "Seconds since the latest handshake, at snapshot time."),
+    ("wireguard_peer_connected", "gauge", "Whether the latest handshake is recent enough for the session to be valid."),
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{%s}" % ",".join('%s="%s"' % (key, _escape(value)) for key, value in labels.items())
+
+
+def render(snapshot, configs=(), queries=0, duration=None):
+    """Prometheus text exposition of a StatusSnapshot.
+
+    configs are the configured interface names; those not running are
+    exported as down, so a tunnel that went away is visible as a 0 and not
+    as a missing series.
+    """
+    samples = {name: [] for name, _, _ in METRICS}
+
+    def add(name, value, **labels):
+        samples[name].append("%s%s %s" % (name, _labels(**labels) if labels else "", value))
+
+    add("wireguard_exporter_up", int(snapshot.ok))
+    add("wireguard_exporter_queries_total", queries)
+    if duration is not None:
+        add("wireguard_exporter_query_duration_seconds", "%.6f" % duration)
+    add("wireguard_exporter_snapshot_timestamp_seconds", "%.3f" % snapshot.taken_at)
+
+    if snapshot.ok:
+        for name in sorted(set(configs) | set(snapshot.interfaces)):
+            add("wireguard_interface_up", int(name in snapshot.interfaces), interface=name)
+    for interface in snapshot.interfaces.values():
+        add("wireguard_interface_peers", len(interface.peers), interface=interface.name)
+        if interface.listen_port:
+            add("wireguard_interface_listen_port", interface.listen_port, interface=interface.name)
+        for peer in interface.peers:
+            key = dict(interface=interface.name, public_key=peer.public_key)
+            add("wireguard_peer_info", 1, **dict(key, endpoint=peer.endpoint or "",
+                                                 allowed_ips=",".join(peer.allowed_ips)))
+            add("wireguard_peer_received_bytes_total", peer.rx_bytes, **key)
+            add("wireguard_peer_sent_bytes_total", peer.tx_bytes, **key)
+            add("wireguard_peer_latest_handshake_seconds", peer.latest_handshake, **key)
+            if peer.latest_handshake:
+                age = max(0, int(snapshot.taken_at) - peer.latest_handshake)
+                add("wireguard_peer_handshake_age_seconds", age, **key)
+                add("wireguard_peer_connected", int(age < HANDSHAKE_TIMEOUT), **key)
+            else:
+                add("wireguard_peer_connected", 0, **key)
+
+    lines = []
+    for name, kind, help_text in METRICS:
+        if samples[name]:
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, kind))
+            lines.extend(samples[name])
+    return "\n".join(lines) + "\n"
+
+
+class SnapshotCache:
+    """Rendered metrics, refreshed at most once per min_interval seconds."""
+
+    def __init__(self, engine, min_interval=DEFAULT_INTERVAL, list_configs=None):
+        self.engine = engine
+        self.min_interval = min_interval
+        self.list_configs = list_configs or (lambda: ())
+        self.queries = 0
+        self.snapshot = None
+        self.body = None
+        self._fetched = None
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return self._fetched is None or time.monotonic() - self._fetched >= self.min_interval
+
+    def get(self):
+        """Current page; queries status only when the cached one is stale."""
+        # Scrapes arriving during a query block on the lock and then find
+        # the fresh page, so they never start a second query.
+        with self._lock:
+            if self._stale():
+                started = time.monotonic()
+                snapshot = self.engine.query()
+                duration = time.monotonic() - started
+                try:
+                    configs = self.list_configs()
+                except (OSError, HelperError):
+                    configs = ()
+                self.queries += 1
+                self.snapshot = snapshot
+                self.body = render(snapshot, configs, self.queries, duration).encode()
+                self._fetched = time.monotonic()
+            return self.body
+
+
+# ---------------------------
+# HTTP
+# ---------------------------
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Server6(_Server):
+    address_family = socket.AF_INET6
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    cache = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            with TIMINGS.timer("exporter scrape"):
+                body = self.cache.get()
+            self._reply(200, CONTENT_TYPE, body)
+        elif path == "/":
+            self._reply(200, "text/html; charset=utf-8",
+                        b'<html><body><a href="/metrics">WireGuard metrics</a></body></html>\n')
+        else:
+            self._reply(404, "text/plain; charset=utf-8", b"not found\n")
+
+    def _reply(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(cache, host, port):
+    """HTTP server for cache; call serve_forever() on it."""
+    handler = type("Handler", (_Handler,), {"cache": cache})
+    server = _Server6 if ":" in host else _Server
+    return server((host, port), handler)
+
+
+# ---------------------------
+# Textfile collector
+# ---------------------------
+def write_textfile(cache, path):
+    """Atomically replace path with the current page (the collector may read at any time)."""
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(cache.get())
+    os.replace(tmp, path)
+
+
+def _parse_listen(value):
+    host, _, port = value.rpartition(":")
+    try:
+        return host.strip("[]") or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected HOST:PORT, got %r" % value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="wireguard-gui.py --exporter",
+        description="Export WireGuard interface and peer metrics for Prometheus.")
+    parser.add_argument("--listen", type=_parse_listen, default=DEFAULT_LISTEN,
+                        help="HTTP address to serve /metrics on (default %s)" % DEFAULT_LISTEN)
+    parser.add_argument("--textfile", help="write metrics to this file instead of serving HTTP")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="minimum seconds between status queries (default %(default)s)")
+    parser.add_argument("--once", action="store_true", help="with --textfile: write once and exit")
+    args = parser.parse_args(argv)
+    if args.once and not args.textfile:
+        parser.error("--once needs --textfile")
+
+    client = core.connect_helper()
+    cache = SnapshotCache(core.status_engine(client), args.interval,
+                          list_configs=lambda: core.list_configs(client=client))
+    try:
+        if args.textfile:
+            while True:
+                write_textfile(cache, args.textfile)
+                if args.once:
+                    return 0 if cache.snapshot.ok else 1
+                time.sleep(args.interval)
+        host, port = args.listen
+        server = serve(cache, host, port)
+        sys.stderr.write("serving WireGuard metrics on http://%s:%d/metrics\n" % (host, port))
+        server.serve_forever()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
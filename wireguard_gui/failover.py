@@ -0,0 +1,450 @@
+"""Failover groups: alternative configs for the same network.
+
+A group is an ordered list of configs (interface names or paths) that
+reach the same network through different endpoints, typically one per
+PoP, of which at most one is up.  Groups live in the GUI state under
+``failover_groups``.  FailoverMonitor follows the status snapshots and,
+for every enabled group, judges the member that is up:
+
+    stale      it has sent something that needed a new handshake (its
+               session was older than HANDSHAKE_TIMEOUT, or it never had
+               one) and none followed within GRACE seconds
+    stalled    it has been sending for STALL_AFTER seconds without
+               receiving anything
+
+WireGuard only handshakes when there is something to send (or when
+PersistentKeepalive makes it send), so an idle tunnel with an old
+handshake is not judged at all; keepalives count as sending.
+
+After BAD_SAMPLES such snapshots in a row, and no sooner than MIN_DWELL
+seconds after the previous switch (so a flapping network does not make
+the group flap too), the other members are scored and the best one
+replaces the active one.  Scoring happens before anything is touched:
+their endpoints are probed in a worker (wireguard_gui.probe), so the
+outage is only the down of the old and the up of the new, run back to
+back.  The new member must receive something (its handshake response
+counts) within CONFIRM_TIMEOUT once it sends; if its up fails the next
+best is tried, and if none works the old one is brought back.
+
+Score of a candidate, higher is better: 100 minus its position in the
+group (the order is the preference), minus up to 30 for the probe round
+trip, minus up to 20 for how long it took to handshake the last time the
+group switched to it, minus up to 50 if it failed within FAILURE_MEMORY.
+Candidates whose endpoints all refuse or do not resolve are skipped;
+see probe.py for why "no reply" does not count against them.
+
+Every decision and switch goes to a DecisionLog (JSON lines in the
+state directory) with the reason, the scores, the switch latency
+(decision to first handshake) and the time the commands took.
+
+No Tk here: commands and background work go through the ``submit`` and
+``call`` callables the GUI passes in.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+from wireguard_gui import probe
+from wireguard_gui.accounting import state_dir
+from wireguard_gui.helper import HelperError
+from wireguard_gui.jobs import DONE
+from wireguard_gui.state import STATE
+from wireguard_gui.status import HANDSHAKE_TIMEOUT, interface_name
+from wireguard_gui.timing import TIMINGS
+
+LOG_FILE = os.path.join(state_dir(), "failover.log")
+LOG_ENTRIES = 500
+MAX_LOG_BYTES = 1 << 20
+TAIL_BYTES = 256 << 10
+
+STALE_AFTER = HANDSHAKE_TIMEOUT
+STALL_AFTER = 30
+GRACE = 30
+BAD_SAMPLES = 3
+MIN_DWELL = 120
+CONFIRM_TIMEOUT = 30
+FAILURE_MEMORY = 900
+
+# Group phases
+WATCHING = "watching"
+PROBING = "probing"
+SWITCHING = "switching"
+CONFIRMING = "confirming"
+
+
+def load_groups():
+    """{name: {"members": [...], "enabled": bool}} from the GUI state."""
+    return STATE.get("failover_groups", {})
+
+
+def score_candidate(position, results, meta, now):
+    """(score, reason) of a group member; score is None when it cannot work.
+
+    results are the member's endpoint ProbeResults (or an error text),
+    meta is its remembered interface state.
+    """
+    if isinstance(results, str):
+        return None, results
+    if not results:
+        return None, "no peer has an Endpoint"
+    usable = [r for r in results if r.state in (probe.REPLY, probe.SILENT)]
+    if not usable:
+        return None, "endpoint %s" % results[0].state
+    score = 100.0 - position
+    why = []
+    rtts = [r.rtt for r in usable if r.rtt is not None]
+    if rtts:
+        score -= min(30.0, min(rtts) * 100)
+        why.append("rtt %.1f ms" % (min(rtts) * 1000))
+    handshake = meta.get("handshake_seconds")
+    if handshake is not None:
+        score -= min(20.0, handshake * 2)
+        why.append("handshook in %.1fs last time" % handshake)
+    failed = meta.get("failover_failed")
+    if failed and now - failed < FAILURE_MEMORY:
+        score -= 50.0 * (1 - (now - failed) / float(FAILURE_MEMORY))
+        why.append("failed %ds ago" % (now - failed))
+    return round(score, 1), ", ".join(why) or "reachable"
+
+
+class DecisionLog:
+    """Recent decisions in memory, all of them appended to a JSON lines file."""
+
+    def __init__(self, path=LOG_FILE, size=LOG_ENTRIES):
+        self.path = path
+        self.entries = collections.deque(maxlen=size)
+        self.error = None
+        self._lock = threading.Lock()
+        try:
+            with open(path, "rb") as f:
+                # The tail is enough to fill the deque; a partial first line fails to parse.
+                f.seek(max(0, os.fstat(f.fileno()).st_size - TAIL_BYTES))
+                for line in f:
+                    try:
+                        self.entries.append(json.loads(line.decode("utf-8")))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+
+    def add(self, **entry):
+        entry = dict(entry, time=round(time.time(), 3))
+        with self._lock:
+            self.entries.append(entry)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > MAX_LOG_BYTES:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry, sort_keys=True) + "\n")
+                self.error = None
+            except OSError as e:
+                self.error = e
+        return entry
+
+
+def format_entry(entry):
+    """One line for the log view."""
+    text = "%s  %s  %s" % (time.strftime("%H:%M:%S", time.localtime(entry["time"])),
+                           entry.get("group", ""), entry.get("event", ""))
+    if entry.get("to"):
+        text += "  %s → %s" % (entry.get("from") or "-", entry["to"])
+    elif entry.get("from"):
+        text += "  %s" % entry["from"]
+    if entry.get("seconds") is not None:
+        text += "  in %.1fs" % entry["seconds"]
+    if entry.get("reason"):
+        text += "  (%s)" % entry["reason"]
+    return text
+
+
+class _Progress:
+    """Handshake age and transfer progress of the active member."""
+
+    def __init__(self, since):
+        self.since = since
+        self.rx = self.tx = None
+        self.sending = None  # first time something was sent since rx last moved
+        self.handshake = None
+        self.waiting = None  # first time something was sent that needed a new handshake
+
+    def assess(self, snapshot, member):
+        """(healthy, reason) of member in snapshot."""
+        now = snapshot.taken_at
+        rx, tx = snapshot.totals(member)
+        sent = self.tx is not None and tx != self.tx
+        if self.rx is not None and rx != self.rx:
+            self.sending = None
+        elif sent and self.sending is None:
+            self.sending = now
+        self.rx, self.tx = rx, tx
+        handshake = snapshot.latest_handshake(member)
+        if handshake != self.handshake:
+            self.handshake, self.waiting = handshake, None
+        expired = handshake + STALE_AFTER if handshake else self.since
+        if sent and self.waiting is None and now > expired:
+            self.waiting = now
+        if self.waiting is not None and now - self.waiting > GRACE:
+            if not handshake:
+                return False, "no handshake %ds after sending" % (now - self.waiting)
+            return False, "no new handshake %ds after sending, last one %ds ago" % (
+                now - self.waiting, now - handshake)
+        if self.sending is not None and now - self.sending >= STALL_AFTER:
+            return False, "sending without receiving for %ds" % (now - self.sending)
+        if not handshake:
+            return True, "waiting for the first handshake" if self.waiting else "idle, no handshake yet"
+        return True, "handshake %ds ago" % (now - handshake)
+
+
+class _Group:
+    def __init__(self, name, members, enabled):
+        self.name = name
+        self.members = list(members)
+        self.enabled = enabled
+        self.phase = WATCHING
+        self.active = None
+        self.status = "no member is up"
+        self.bad = 0
+        self.last_switch = 0.0
+        self.progress = None
+        self.switch = None
+
+
+class FailoverMonitor:
+    """Watches enabled failover groups and switches them when the active member degrades.
+
+    submit(op, target, on_done) runs wg-quick ``up``/``down`` and calls
+    on_done(job); call(func, *args, on_done=...) runs func in a worker.
+    Both deliver on the thread that publishes the snapshots.
+    """
+
+    def __init__(self, submit, call, load_config, log=None, clock=time.time):
+        self.submit = submit
+        self.call = call
+        self.load_config = load_config
+        self.log = log if log is not None else DecisionLog()
+        self.clock = clock
+        self.groups = collections.OrderedDict()
+        self.listeners = []
+        self.reload()
+
+    # ---------------------------
+    # Groups
+    # ---------------------------
+    def reload(self):
+        """Follow the groups in the GUI state; runtime state of unchanged groups is kept."""
+        stored = load_groups()
+        groups = collections.OrderedDict()
+        for name in sorted(stored):
+            fields = stored[name]
+            group = self.groups.get(name)
+            if group is None or group.members != fields.get("members", []):
+                group = _Group(name, fields.get("members", []), fields.get("enabled", True))
+            group.enabled = fields.get("enabled", True)
+            groups[name] = group
+        self.groups = groups
+        self._changed()
+
+    def set_group(self, name, members, enabled=True):
+        STATE.set_item("failover_groups", name, {"members": list(members), "enabled": bool(enabled)})
+        self.reload()
+
+    def delete_group(self, name):
+        groups = load_groups()
+        groups.pop(name, None)
+        STATE.set("failover_groups", groups)
+        self.reload()
+
+    @property
+    def enabled(self):
+        """Whether any group is watched (status must then be polled)."""
+        return any(group.enabled for group in self.groups.values())
+
+    def _changed(self, entry=None):
+        for callback in list(self.listeners):
+            callback(entry)
+
+    def _record(self, group, event, **fields):
+        entry = self.log.add(group=group.name, event=event, **fields)
+        self._changed(entry)
+        return entry
+
+    # ---------------------------
+    # Watching
+    # ---------------------------
+    def on_snapshot(self, snapshot):
+        if not snapshot.ok:
+            return
+        for group in self.groups.values():
+            if not group.enabled:
+                continue
+            if group.phase == CONFIRMING:
+                self._confirm(group, snapshot)
+            if group.phase != WATCHING:
+                continue
+            active = next((m for m in group.members if snapshot.is_up(m)), None)
+            if active is None:
+                group.active, group.progress, group.bad = None, None, 0
+                group.status = "no member is up"
+                continue
+            if active != group.active or group.progress is None:
+                group.active, group.bad = active, 0
+                group.progress = _Progress(snapshot.taken_at)
+            healthy, group.status = group.progress.assess(snapshot, active)
+            if healthy:
+                group.bad = 0
+                continue
+            group.bad += 1
+            if group.bad == BAD_SAMPLES:
+                STATE.update_interface(active, failover_failed=int(self.clock()))
+                self._record(group, "degraded", **{"from": active, "reason": group.status})
+            if (group.bad >= BAD_SAMPLES and len(group.members) > 1
+                    and self.clock() - group.last_switch >= MIN_DWELL):
+                self._evaluate(group, group.status)
+        self._changed()
+
+    def switch_now(self, name):
+        """Score every member now and switch if another one is better."""
+        group = self.groups[name]
+        if group.phase != WATCHING:
+            return False
+        self._evaluate(group, "requested", keep_active=True)
+        return True
+
+    # ---------------------------
+    # Deciding
+    # ---------------------------
+    def _survey(self, members):
+        """{member: [ProbeResult] or error text}; runs in a worker."""
+        endpoints = {}
+        for member in members:
+            try:
+                config = self.load_config(member)
+            except (OSError, ValueError, HelperError) as e:
+                endpoints[member] = str(e)
+                continue
+            endpoints[member] = probe.endpoints_of({member: config})
+        wanted = [e for found in endpoints.values() if not isinstance(found, str) for e in found]
+        results = probe.probe(wanted) if wanted else {}
+        return {member: found if isinstance(found, str) else [results[e] for e in found]
+                for member, found in endpoints.items()}
+
+    def _evaluate(self, group, reason, keep_active=False):
+        group.phase = PROBING
+        decided = self.clock()
+        candidates = [m for m in group.members if keep_active or m != group.active]
+        self.call(self._survey, candidates,
+                  on_done=lambda job: self._surveyed(group, job, reason, decided, keep_active))
+        self._changed()
+
+    def _surveyed(self, group, job, reason, decided, keep_active):
+        group.phase = WATCHING
+        if job.result is None:
+            group.last_switch = self.clock()
+            self._record(group, "error", reason="probing failed: %s" % job.error)
+            return
+        now = self.clock()
+        scores, why = {}, {}
+        for position, member in enumerate(group.members):
+            if member not in job.result:
+                continue
+            scores[member], why[member] = score_candidate(position, job.result[member],
+                                                          STATE.interface(member), now)
+        if keep_active and group.active in scores and scores[group.active] is not None and group.bad == 0:
+            scores[group.active] += 10  # a working tunnel has to be beaten clearly
+        ranked = sorted((m for m in scores if scores[m] is not None), key=lambda m: -scores[m])
+        summary = {m: {"score": scores[m], "why": why[m]} for m in scores}
+        if not ranked or ranked[0] == group.active:
+            group.last_switch = now
+            self._record(group, "stay", **{"from": group.active, "scores": summary,
+                                           "reason": reason if ranked else "no usable alternative"})
+            return
+        self._switch(group, ranked, reason, decided, summary)
+
+    # ---------------------------
+    # Switching
+    # ---------------------------
+    def _switch(self, group, ranked, reason, decided, summary, original=None):
+        target = ranked[0]
+        old = group.active
+        original = original if original is not None else old
+        group.phase = SWITCHING
+        group.switch = {"from": old, "to": target, "decided": decided, "started": self.clock()}
+        self._record(group, "switch", reason=reason, scores=summary, **{"from": old, "to": target})
+
+        def up_done(job):
+            commands = self.clock() - group.switch["started"]
+            if job.state == DONE:
+                group.phase = CONFIRMING
+                group.switch["commands"] = commands
+                self._changed()
+                return
+            STATE.update_interface(target, failover_failed=int(self.clock()))
+            self._record(group, "failed", reason="up failed: exit code %s" % job.returncode,
+                         seconds=commands, **{"to": target})
+            group.active = None
+            rest = ranked[1:]
+            if rest:
+                self._switch(group, rest, "%s failed" % interface_name(target), decided, summary, original)
+            elif original is not None:
+                self._restore(group, original)
+            else:
+                group.phase = WATCHING
+                group.last_switch = self.clock()
+
+        def down_done(job):
+            if job.state != DONE:
+                group.phase = WATCHING
+                group.last_switch = self.clock()
+                self._record(group, "failed", reason="down failed: exit code %s" % job.returncode,
+                             **{"from": old})
+                return
+            group.active = None
+            self.submit("up", target, up_done)
+
+        if old is not None:
+            self.submit("down", old, down_done)
+        else:
+            self.submit("up", target, up_done)
+
+    def _restore(self, group, member):
+        def done(job):
+            group.phase = WATCHING
+            group.last_switch = self.clock()
+            self._record(group, "restored" if job.state == DONE else "failed",
+                         reason="no alternative came up", **{"to": member})
+
+        self.submit("up", member, done)
+
+    def _confirm(self, group, snapshot):
+        # The member was down before the up, so anything received (the
+        # handshake response included) proves its endpoint answers.  If
+        # nothing has been sent there was no reason to handshake yet; the
+        # watcher judges it once traffic starts.
+        switch = group.switch
+        target = switch["to"]
+        rx, tx = snapshot.totals(target)
+        now = self.clock()
+        if rx > 0:
+            seconds = now - switch["decided"]
+            TIMINGS.record("failover switch", seconds)
+            STATE.update_interface(target, handshake_seconds=round(now - switch["started"], 3))
+            self._record(group, "switched", seconds=round(seconds, 3), commands=round(switch["commands"], 3),
+                         **{"from": switch["from"], "to": target})
+        elif now - switch["started"] <= CONFIRM_TIMEOUT:
+            return
+        elif tx == 0:
+            self._record(group, "switched", commands=round(switch["commands"], 3),
+                         reason="idle, nothing sent yet", **{"from": switch["from"], "to": target})
+        else:
+            STATE.update_interface(target, failover_failed=int(now))
+            self._record(group, "failed", reason="nothing received %ds after up" % (now - switch["started"]),
+                         **{"to": target})
+            # Let the watcher judge it right away instead of after MIN_DWELL
+            now -= MIN_DWELL
+        group.phase = WATCHING
+        group.active, group.progress, group.bad = target, None, 0
+        group.last_switch = now
+        group.switch = None
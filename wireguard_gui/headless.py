@@ -0,0 +1,341 @@
+"""Headless batch mode: ``wireguard-gui.py --headless ACTION [TARGET...]``.
+
+Runs the GUI's commands without a display, for scripts and cron:
+
+    list                 configs matching the targets (default: all)
+    status               running interfaces and their peers
+    up, down, restart    wg-quick over the targets, in dependency order
+    apply                push saved configs to running tunnels live
+    route                which peer carries each address (targets are
+                         addresses; --input reads more from a file or -)
+    probe                reachability and round trip of the peer
+                         Endpoints of the targets (default: all)
+
+Targets are interface names, config paths or glob patterns ("office-*",
+"/srv/wg/*.conf"); "all" means every known config.  Commands go through
+the privileged helper when one is running, else ``sudo -n`` (never a
+password prompt).  The result is a single JSON document on stdout and
+the exit status is 1 when anything failed.
+
+Nothing here imports tkinter.
+"""
+import argparse
+import json
+import queue
+import sys
+import time
+
+from wireguard_gui import bulk, core, helper, live, probe
+from wireguard_gui.config import cached_config
+from wireguard_gui.jobs import DONE, JobRunner
+from wireguard_gui.routes import RouteIndex
+from wireguard_gui.status import interface_name
+
+ACTIONS = ("list", "status", "up", "down", "restart", "apply", "route", "probe")
+POLL_INTERVAL = 0.1
+SUDO_ARGS = ("-n",)
+
+
+def _peer(peer):
+    fields = peer._asdict()
+    del fields["interface"], fields["preshared_key"]
+    return fields
+
+
+def _routes(found):
+    if not found:
+        return None
+    prefix, routes = found
+    return [{"interface": route.interface, "public_key": route.public_key, "network": str(prefix),
+             "path": route.path, "line": route.lineno} for route in routes]
+
+
+def _result(target, op, state, detail="", job=None, duration=None):
+    return {
+        "target": target,
+        "interface": interface_name(target),
+        "op": op,
+        "state": state,
+        "detail": detail,
+        "returncode": job.returncode if job is not None else None,
+        "duration": round(duration if duration is not None else job.duration if job is not None else 0.0, 3),
+        "output": job.output if job is not None else "",
+    }
+
+
+class Session:
+    """Job runner, helper connection and status of one headless run.
+
+    Callbacks are dispatched on the calling thread by ``wait``, the same
+    way the GUI's Tk loop pumps ``JobRunner.process_events``.
+    """
+
+    def __init__(self, parallel=bulk.MAX_PARALLEL, timeout=core.WG_QUICK_TIMEOUT):
+        self.parallel = max(1, parallel)
+        self.timeout = timeout
+        self.runner = JobRunner(max_workers=self.parallel)
+        self.client = core.connect_helper(post=self.runner.post)
+        self.status = core.status_engine(self.client)
+        self.results = []
+
+    def close(self):
+        self.runner.shutdown()
+        if self.client is not None:
+            self.client.close()
+
+    def wait(self, done):
+        """Run posted callbacks until done() is true."""
+        events = self.runner.events
+        while not done():
+            try:
+                callback, args = events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            callback(*args)
+
+    def call(self, func, *args):
+        """func(*args) in the pool, waited for; returns the finished Job."""
+        job = self.runner.call(func, *args)
+        self.wait(lambda: job.done)
+        return job
+
+    def read_config(self, conf_path):
+        return core.read_config(conf_path, self.client)
+
+    def stat_config(self, conf_path):
+        return core.stat_config(conf_path, self.client)
+
+    def load(self, target):
+        return cached_config(core.resolve_conf_path(target), loader=self.read_config,
+                             stat=self.stat_config)
+
+    def privileged(self, op, target, on_done, **params):
+        """Run a helper op (wg-quick up/down, apply_live) as root."""
+        if self.client is not None and self.client.ensure_connected():
+            return self.client.submit(op, target, on_done=on_done, **params)
+        if op == "apply_live":
+            cmd = core.live_apply_command(target, params["table"], params["add_routes"],
+                                          params["del_routes"], sudo_args=SUDO_ARGS)
+        else:
+            cmd = core.privileged_command(op, target, sudo_args=SUDO_ARGS)
+        return self.runner.submit(cmd, timeout=self.timeout, on_done=on_done, cwd=core.APP_DIR)
+
+    # ---------------------------
+    # Actions
+    # ---------------------------
+    def bulk(self, action, targets):
+        """up/down/restart over targets; appends one result per command."""
+        job = self.call(self._dependencies, targets)
+        depends = job.result or {}
+        waves, cyclic = bulk.dependency_waves(targets, depends)
+        snapshot = self.status.query()
+        if action in ("down", "restart"):
+            self._run_bulk("down", waves[::-1], depends, lambda t: snapshot.is_up(t) is not False)
+        if action in ("up", "restart"):
+            wanted = None if action == "restart" else (lambda t: snapshot.is_up(t) is not True)
+            self._run_bulk("up", waves, depends, wanted)
+
+    def _dependencies(self, targets):
+        configs = {}
+        for target in targets:
+            try:
+                configs[target] = self.load(target)
+            except (OSError, ValueError, helper.HelperError):
+                pass
+        return bulk.dependencies(configs)
+
+    def _run_bulk(self, op, waves, depends, wanted=None):
+        if wanted is not None:
+            for target in [t for wave in waves for t in wave if not wanted(t)]:
+                self.results.append(_result(target, op, bulk.SKIPPED, "already %s" % op))
+            waves = [wave for wave in ([t for t in wave if wanted(t)] for wave in waves) if wave]
+        jobs = {}
+
+        def submit(op, target, on_done):
+            jobs[target] = self.privileged(op, target, on_done)
+
+        def record(result):
+            self.results.append(_result(result.target, op, result.state, result.detail,
+                                        jobs.get(result.target), result.duration))
+
+        operation = bulk.BulkOperation(op, waves, submit, depends, self.parallel, on_result=record)
+        operation.start()
+        self.wait(lambda: operation.done)
+
+    def apply(self, targets, restart=False):
+        """Apply targets live; with restart, restart those that need it."""
+        snapshot = self.status.query()
+        plans = [(target, self.runner.call(self._plan, target, snapshot)) for target in targets]
+        self.wait(lambda: all(job.done for _, job in plans))
+        pushing = set()
+        needs_restart = []
+        for target, job in plans:
+            if job.error is not None:
+                self.results.append(_result(target, "apply", bulk.FAILED, job.error))
+                continue
+            config, plan = job.result
+            if not plan.running:
+                self.results.append(_result(target, "apply", bulk.SKIPPED, "not running"))
+            elif plan.needs_restart:
+                reasons = "; ".join(plan.restart_reasons)
+                if restart:
+                    needs_restart.append(target)
+                    self.results.append(_result(target, "apply", bulk.SKIPPED, "restarting: " + reasons))
+                else:
+                    self.results.append(_result(target, "apply", bulk.FAILED, "restart required: " + reasons))
+            elif not plan.has_changes:
+                self.results.append(_result(target, "apply", bulk.OK, "no changes"))
+            else:
+                pushing.add(target)
+                self._push(target, config, plan, pushing.discard)
+        # Wait for the callbacks, not just the jobs, so every result is in.
+        self.wait(lambda: not pushing)
+        if needs_restart:
+            self.bulk("restart", needs_restart)
+
+    def _plan(self, target, snapshot):
+        config = self.load(target)
+        name = interface_name(target)
+        return config, live.plan_live_apply(config, snapshot.get(name), None,
+                                            live.running_addresses(name), live.running_mtu(name))
+
+    def _push(self, target, config, plan, on_done):
+        def finished(job):
+            state = bulk.OK if job.state == DONE else bulk.FAILED
+            detail = "%d added, %d removed, %d changed" % (len(plan.added), len(plan.removed), len(plan.changed))
+            if job.result:
+                job.lines.append(job.result)
+            self.results.append(_result(target, "apply", state, detail, job))
+            on_done(target)
+
+        return self.privileged("apply_live", target, finished, table=config.interface.get("Table") or "auto",
+                               add_routes=plan.add_routes, del_routes=plan.del_routes)
+
+    def list_configs(self, targets):
+        snapshot = self.status.query()
+        return [{"target": t, "interface": interface_name(t), "path": core.resolve_conf_path(t),
+                 "up": snapshot.is_up(t)} for t in targets]
+
+    def route_report(self, text):
+        """Longest-prefix match of every address in text, running and configured."""
+        index = RouteIndex()
+        index.sync_status(self.status.query())
+        configs = {}
+        for target in core.expand_targets(["all"], client=self.client):
+            try:
+                configs[core.resolve_conf_path(target)] = self.load(target)
+            except (OSError, ValueError, helper.HelperError):
+                pass
+        index.sync_configs(configs)
+        return [{"address": address, "count": count, "running": _routes(match.running),
+                 "configured": _routes(match.configured)}
+                for address, count, match in index.resolve(text)]
+
+    def probe_report(self, targets, concurrency=probe.CONCURRENCY, timeout=probe.TIMEOUT):
+        """Probe every peer Endpoint of the targets' configs at once."""
+        configs, users = {}, {}
+        for target in targets:
+            try:
+                config = configs[target] = self.load(target)
+            except (OSError, ValueError, helper.HelperError):
+                continue
+            for peer in config.peers:
+                if peer.get("Endpoint"):
+                    users.setdefault(peer.get("Endpoint"), []).append(
+                        {"interface": interface_name(target), "public_key": peer.get("PublicKey")})
+        results = probe.probe(probe.endpoints_of(configs), concurrency, timeout=timeout)
+        return [dict(result._asdict(), rtt=round(result.rtt, 6) if result.rtt is not None else None,
+                     peers=users[endpoint])
+                for endpoint, result in results.items()]
+
+    def status_report(self, names=None):
+        snapshot = self.status.query()
+        interfaces = []
+        for name, interface in sorted(snapshot.interfaces.items()):
+            if names is not None and name not in names:
+                continue
+            fields = interface._asdict()
+            fields["peers"] = [_peer(peer) for peer in interface.peers]
+            interfaces.append(fields)
+        return snapshot, interfaces
+
+
+def _summary(results):
+    counts = {bulk.OK: 0, bulk.FAILED: 0, bulk.SKIPPED: 0}
+    for result in results:
+        counts[result["state"]] = counts.get(result["state"], 0) + 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="wireguard-gui.py --headless",
+        description="Run WireGuard operations over many interfaces without the GUI.")
+    parser.add_argument("action", choices=ACTIONS)
+    parser.add_argument("targets", nargs="*", help="interface names, config paths or glob patterns "
+                        "(default: all, for list, status and probe)")
+    parser.add_argument("-j", "--parallel", type=int, default=bulk.MAX_PARALLEL,
+                        help="commands to run at once (default %(default)s)")
+    parser.add_argument("--timeout", type=float, default=core.WG_QUICK_TIMEOUT,
+                        help="seconds before a command is killed (default %(default)s)")
+    parser.add_argument("--restart", action="store_true",
+                        help="apply: restart tunnels whose changes cannot be applied live")
+    parser.add_argument("--input", metavar="FILE",
+                        help="route: also look up every address in FILE (- for stdin), e.g. a log")
+    parser.add_argument("--probe-timeout", type=float, default=probe.TIMEOUT,
+                        help="probe: seconds to wait for an answer per endpoint (default %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=probe.CONCURRENCY,
+                        help="probe: endpoints probed at once (default %(default)s)")
+    parser.add_argument("--indent", type=int, default=None, help="pretty-print the JSON output")
+    args = parser.parse_args(argv)
+
+    if not args.targets and args.action not in ("list", "status", "probe") and not (args.action == "route" and args.input):
+        parser.error("%s needs at least one target" % args.action)
+
+    started = time.monotonic()
+    session = Session(args.parallel, args.timeout)
+    try:
+        report = {"action": args.action}
+        if args.action == "status":
+            names = None
+            if args.targets:
+                names = {interface_name(t) for t in core.expand_targets(args.targets, client=session.client)}
+            snapshot, interfaces = session.status_report(names)
+            report.update(ok=snapshot.ok, error=snapshot.error, backend=session.status.backend.name,
+                          interfaces=interfaces)
+        elif args.action == "route":
+            text = "\n".join(args.targets)
+            if args.input:
+                with (sys.stdin if args.input == "-" else open(args.input, errors="replace")) as f:
+                    text += "\n" + f.read()
+            addresses = session.route_report(text)
+            report.update(ok=True, addresses=addresses,
+                          unmatched=sum(1 for a in addresses if not a["running"] and not a["configured"]))
+        else:
+            targets = core.expand_targets(args.targets or ["all"], client=session.client)
+            if args.action == "list":
+                report.update(ok=True, configs=session.list_configs(targets))
+            elif args.action == "probe":
+                endpoints = session.probe_report(targets, args.concurrency, args.probe_timeout)
+                states = {}
+                for endpoint in endpoints:
+                    states[endpoint["state"]] = states.get(endpoint["state"], 0) + 1
+                report.update(ok=True, endpoints=endpoints, summary=states)
+            else:
+                if args.action == "apply":
+                    session.apply(targets, args.restart)
+                else:
+                    session.bulk(args.action, targets)
+                summary = _summary(session.results)
+                report.update(ok=not summary[bulk.FAILED], results=session.results, summary=summary)
+    finally:
+        session.close()
+    report["elapsed"] = round(time.monotonic() - started, 3)
+
+    json.dump(report, sys.stdout, indent=args.indent)
+    sys.stdout.write("\n")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,664 @@
+"""Privileged helper daemon.
+
+The GUI runs as the desktop user; everything that needs root goes through
+this helper, which is started once per session (``sudo``/``pkexec``) and
+then serves requests over a Unix socket instead of paying for a sudo/PAM
+round trip on every click.
+
+Protocol: one JSON object per line in each direction.  Requests carry a
+client chosen ``id`` and an ``op``::
+
+    {"id": 1, "op": "up", "target": "wg0"}
+    {"id": 2, "op": "cancel", "job": 1}
+
+and are answered with any number of ``line`` events followed by exactly
+one ``done`` event for that id::
+
+    {"id": 1, "event": "line", "line": "[#] ip link add wg0 type wireguard\\n"}
+    {"id": 1, "event": "done", "state": "done", "returncode": 0, ...}
+
+Only the uid given with --owner (and root) may connect; the socket itself
+is created mode 0600 and owned by that user.  Operations are a fixed
+whitelist: wg-quick up/down/save/strip and live config application on
+an interface name or a .conf path, status queries, and
+listing/stat'ing/reading/writing configs in CONFIG_DIR.
+
+wg-quick runs the PreUp/PostUp/... hooks of a config as root, so a config
+path is only accepted inside CONFIG_DIR, or when the file and every
+directory above it are owned by root and writable by nobody else (a user
+could otherwise have the helper run any command).
+
+The helper exits once no client has been connected and no job has been
+running for --idle-timeout seconds; start.sh starts it again on demand.
+"""
+import argparse
+import ipaddress
+import json
+import os
+import re
+import socket
+import struct
+import stat
+import sys
+import threading
+import time
+
+from wireguard_gui import live
+from wireguard_gui.jobs import Job, JobRunner, DONE, FAILED
+from wireguard_gui.status import StatusError, format_dump, make_backend, parse_dump
+from wireguard_gui.timing import TIMINGS
+
+CONFIG_DIR = "/etc/wireguard"
+SOCKET_DIR = "/run/wireguard-gui"
+SOCKET_ENV = "WG_GUI_HELPER_SOCKET"
+
+MAX_WORKERS = 4
+WG_QUICK_TIMEOUT = 120
+REQUEST_TIMEOUT = 30
+IDLE_TIMEOUT = 600
+RECONNECT_INTERVAL = 5.0
+
+WG_QUICK_OPS = ("up", "down", "save", "strip")
+# Same rule as wg-quick: IFNAMSIZ - 1 characters from this set.
+IFNAME_RE = re.compile(r"^[a-zA-Z0-9_=+.-]{1,15}$")
+TABLE_RE = re.compile(r"^(auto|main|[0-9]+|[a-zA-Z_][a-zA-Z0-9_-]*)$")
+
+_UCRED = struct.Struct("3i")
+
+
+class HelperError(Exception):
+    """A request was rejected or the helper is unreachable."""
+
+
+def socket_path(uid=None):
+    """Default socket path for the helper serving uid."""
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    return os.path.join(SOCKET_DIR, "helper-%d.sock" % (os.getuid() if uid is None else uid))
+
+
+def validate_target(target):
+    """Return an interface name, or the real path of a config root may run.
+
+    Config paths must lie in CONFIG_DIR or be trusted (see _trusted).
+    """
+    if not isinstance(target, str):
+        raise HelperError("missing target")
+    if IFNAME_RE.match(target):
+        return target
+    if not (os.path.isabs(target) and target.endswith(".conf")):
+        raise HelperError("invalid interface or config path: %r" % target)
+    path = os.path.realpath(target)
+    if not path.endswith(".conf") or not os.path.isfile(path):
+        raise HelperError("invalid interface or config path: %r" % target)
+    if os.path.dirname(path) == os.path.realpath(CONFIG_DIR) or _trusted(path):
+        return path
+    raise HelperError("%s must be in %s, or owned by root and writable only by root "
+                      "(as must every directory above it)" % (target, CONFIG_DIR))
+
+
+def _trusted(path):
+    """True if path and all its parent directories are root-owned and not
+    group or world writable, so only root can have changed its hooks."""
+    while True:
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return False
+        if st.st_uid != 0 or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return False
+        parent = os.path.dirname(path)
+        if parent == path:
+            return True
+        path = parent
+
+
+def validate_routes(routes):
+    if not isinstance(routes, list):
+        raise HelperError("routes must be a list")
+    try:
+        return [str(ipaddress.ip_network(route, strict=False)) for route in routes]
+    except (TypeError, ValueError) as e:
+        raise HelperError("invalid route: %s" % e)
+
+
+def config_dir_path(target):
+    """Map a name or path to a file inside CONFIG_DIR, refusing anything else."""
+    if not isinstance(target, str):
+        raise HelperError("missing target")
+    if IFNAME_RE.match(target):
+        target = os.path.join(CONFIG_DIR, target + ".conf")
+    path = os.path.realpath(target)
+    if os.path.dirname(path) != os.path.realpath(CONFIG_DIR) or not path.endswith(".conf"):
+        raise HelperError("only configs in %s are handled by the helper" % CONFIG_DIR)
+    return path
+
+
+# ---------------------------
+# Server
+# ---------------------------
+class _Connection:
+    """One connected client; sends are serialized across worker threads."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.open = True
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self.lock:
+            if not self.open:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.open = False
+
+
+class HelperServer:
+    """Serves whitelisted privileged operations to one desktop user."""
+
+    def __init__(self, path, owner_uid, max_workers=MAX_WORKERS, idle_timeout=IDLE_TIMEOUT):
+        self.path = path
+        self.owner_uid = owner_uid
+        self.runner = JobRunner(max_workers=max_workers, default_timeout=WG_QUICK_TIMEOUT)
+        self.backend = make_backend()
+        self.sock = None
+        self.idle_timeout = idle_timeout
+        self.clients = 0
+        self.last_active = time.monotonic()
+        self._clients_lock = threading.Lock()
+
+    def bind(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, mode=0o755, exist_ok=True)
+        if os.path.exists(self.path):
+            if _alive(self.path):
+                raise HelperError("a helper is already listening on %s" % self.path)
+            os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        os.chown(self.path, self.owner_uid, -1)
+        sock.listen(8)
+        self.sock = sock
+
+    def serve_forever(self):
+        threading.Thread(target=self._dispatch, name="wg-helper-dispatch", daemon=True).start()
+        if self.idle_timeout:
+            self.sock.settimeout(min(self.idle_timeout, 30))
+        try:
+            while True:
+                try:
+                    conn, _ = self.sock.accept()
+                except socket.timeout:
+                    if self.idle():
+                        return
+                    continue
+                conn.settimeout(None)
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def idle(self):
+        """True once nobody has been connected or running jobs for idle_timeout."""
+        with self._clients_lock:
+            if self.clients or self.runner.active_jobs:
+                self.last_active = time.monotonic()
+                return False
+            return time.monotonic() - self.last_active >= self.idle_timeout
+
+    def close(self):
+        self.runner.shutdown()
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def _dispatch(self):
+        # Job callbacks are queued by the runner; deliver them in order.
+        while True:
+            callback, args = self.runner.events.get()
+            callback(*args)
+
+    def _peer_uid(self, conn):
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _UCRED.size)
+        return _UCRED.unpack(creds)[1]
+
+    def _serve(self, sock):
+        conn = _Connection(sock)
+        with self._clients_lock:
+            self.clients += 1
+        try:
+            if self._peer_uid(sock) not in (0, self.owner_uid):
+                conn.send({"id": None, "event": "done", "state": FAILED,
+                           "error": "permission denied"})
+                return
+            for raw in sock.makefile("r", encoding="utf-8"):
+                request = None
+                try:
+                    request = json.loads(raw)
+                    self._handle(conn, request)
+                except (ValueError, HelperError) as e:
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    conn.send({"id": request_id, "event": "done", "state": FAILED,
+                               "error": str(e)})
+        except OSError:
+            pass
+        finally:
+            # Running wg-quick jobs are left to finish: killing them halfway
+            # would leave interfaces half configured.
+            conn.open = False
+            sock.close()
+            with self._clients_lock:
+                self.clients -= 1
+                self.last_active = time.monotonic()
+
+    def _handle(self, conn, request):
+        if not isinstance(request, dict):
+            raise HelperError("request must be an object")
+        request_id = request.get("id")
+        op = request.get("op")
+
+        def on_line(job, line):
+            conn.send({"id": request_id, "event": "line", "line": line})
+
+        def on_done(job):
+            conn.jobs.pop(request_id, None)
+            conn.send({
+                "id": request_id,
+                "event": "done",
+                "state": job.state,
+                "returncode": job.returncode,
+                "result": job.result,
+                "error": job.error,
+                "duration": job.duration,
+            })
+
+        if op in WG_QUICK_OPS:
+            target = validate_target(request.get("target"))
+            job = self.runner.submit(["wg-quick", op, target], on_line=on_line, on_done=on_done)
+        elif op == "quick_status":
+            job = self.runner.submit(["wg-quick", "status"], timeout=REQUEST_TIMEOUT,
+                                     on_line=on_line, on_done=on_done)
+        elif op == "apply_live":
+            target = validate_target(request.get("target"))
+            table = request.get("table", "auto")
+            if not isinstance(table, str) or not TABLE_RE.match(table):
+                raise HelperError("invalid routing table %r" % table)
+            job = self.runner.call(live.apply_live, target,
+                                   validate_routes(request.get("add_routes", [])),
+                                   validate_routes(request.get("del_routes", [])),
+                                   table, on_done=on_done)
+        elif op == "dump":
+            job = self.runner.call(lambda: format_dump(self.backend.dump()), on_done=on_done)
+        elif op == "show":
+            job = self.runner.call(self.backend.show, on_done=on_done)
+        elif op == "list_configs":
+            job = self.runner.call(_list_configs, on_done=on_done)
+        elif op == "read_config":
+            path = config_dir_path(request.get("target"))
+            job = self.runner.call(_read_file, path, on_done=on_done)
+        elif op == "stat_config":
+            path = config_dir_path(request.get("target"))
+            job = self.runner.call(_stat_file, path, on_done=on_done)
+        elif op == "write_config":
+            path = config_dir_path(request.get("target"))
+            content = request.get("content")
+            if not isinstance(content, str):
+                raise HelperError("missing content")
+            job = self.runner.call(_write_file, path, content, on_done=on_done)
+        elif op == "cancel":
+            job = conn.jobs.get(request.get("job"))
+            if job is not None:
+                job.cancel()
+            conn.send({"id": request_id, "event": "done", "state": DONE})
+            return
+        elif op == "ping":
+            conn.send({"id": request_id, "event": "done", "state": DONE, "result": os.getpid()})
+            return
+        else:
+            raise HelperError("unknown op %r" % op)
+        if not job.done:
+            conn.jobs[request_id] = job
+
+
+def _list_configs():
+    return sorted(f[:-5] for f in os.listdir(CONFIG_DIR) if f.endswith(".conf"))
+
+
+def _read_file(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _stat_file(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _write_file(path, content):
+    # Keep the 0600 root-only mode wg-quick expects for configs.
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return len(content)
+
+
+def _alive(path):
+    try:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(1)
+        probe.connect(path)
+        probe.close()
+        return True
+    except OSError:
+        return False
+
+
+# ---------------------------
+# Client
+# ---------------------------
+class RemoteJob(Job):
+    """Client side view of a job running in the helper."""
+
+    def __init__(self, client, request_id, op, target=None, on_line=None, on_done=None, label=None):
+        cmd = ["wg-quick", op, target] if op in WG_QUICK_OPS else [op]
+        Job.__init__(self, cmd, on_line=on_line, on_done=on_done, label=label)
+        self.kind = "helper %s" % op
+        self.client = client
+        self.request_id = request_id
+
+    def cancel(self):
+        if self.done:
+            return False
+        try:
+            self.client._send({"id": self.client._next_id(), "op": "cancel", "job": self.request_id})
+        except HelperError:
+            # The helper is gone; the lost connection fails the job anyway
+            return False
+        return True
+
+
+class HelperClient:
+    """Connection to a running HelperServer.
+
+    Callbacks of submitted jobs are handed to ``post`` (normally
+    JobRunner.post) so they run on the GUI thread like local jobs.  A lost
+    connection (the helper was restarted) is re-established by
+    ensure_connected, at most every RECONNECT_INTERVAL seconds.
+    """
+
+    def __init__(self, path=None, post=None):
+        self.path = path or socket_path()
+        self.post = post or (lambda callback, *args: callback(*args))
+        self.sock = None
+        self._ids = 0
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._waiters = {}
+        self._connect_lock = threading.Lock()
+        self._reconnect_at = 0.0
+        self._closed = False
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+    def connect(self, timeout=2):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        self.sock = sock
+        threading.Thread(target=self._read, args=(sock,), name="wg-helper-client", daemon=True).start()
+        return self
+
+    def ensure_connected(self):
+        """Whether the helper is connected, reconnecting first if the connection was lost."""
+        if self.sock is not None:
+            return True
+        with self._connect_lock:
+            if self.sock is not None:
+                return True
+            if self._closed or time.monotonic() < self._reconnect_at:
+                return False
+            self._reconnect_at = time.monotonic() + RECONNECT_INTERVAL
+            try:
+                self.connect()
+            except OSError:
+                return False
+            return True
+
+    def close(self):
+        self._closed = True
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _send(self, message):
+        if not self.ensure_connected():
+            raise HelperError("helper is not connected")
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self._lock:
+            sock = self.sock
+            try:
+                if sock is None:
+                    raise OSError("connection closed")
+                sock.sendall(data)
+            except OSError as e:
+                raise HelperError("helper connection lost: %s" % e)
+
+    def submit(self, op, target=None, on_line=None, on_done=None, label=None, **params):
+        """Start op in the helper; returns a RemoteJob updated as events arrive."""
+        request_id = self._next_id()
+        job = RemoteJob(self, request_id, op, target, on_line=on_line, on_done=on_done,
+                        label=label)
+        self._jobs[request_id] = job
+        message = dict(params, id=request_id, op=op)
+        if target is not None:
+            message["target"] = target
+        # Before sending: the reader thread may complete the job right away
+        job.state = "running"
+        job.started = job.submitted
+        try:
+            self._send(message)
+        except HelperError as e:
+            self._jobs.pop(request_id, None)
+            self._complete(job, {"state": FAILED, "error": str(e)})
+        return job
+
+    def request(self, op, timeout=REQUEST_TIMEOUT, **params):
+        """Blocking request; returns the result or raises HelperError."""
+        request_id = self._next_id()
+        waiter = [threading.Event(), None]
+        self._waiters[request_id] = waiter
+        try:
+            with TIMINGS.timer("helper request %s" % op):
+                self._send(dict(params, id=request_id, op=op))
+                if not waiter[0].wait(timeout):
+                    raise HelperError("helper did not answer %s within %ds" % (op, timeout))
+        finally:
+            self._waiters.pop(request_id, None)
+        reply = waiter[1]
+        if reply.get("state") != DONE:
+            raise HelperError(reply.get("error") or "%s failed" % op)
+        return reply.get("result")
+
+    def _read(self, sock):
+        try:
+            for raw in sock.makefile("r", encoding="utf-8"):
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    continue
+                self._deliver(message)
+        except (OSError, ValueError):
+            pass
+        # Fail whatever was still outstanding, before a reconnect can add more.
+        jobs = list(self._jobs.items())
+        waiters = list(self._waiters.values())
+        if self.sock is sock:
+            self.sock = None
+        for request_id, job in jobs:
+            self._jobs.pop(request_id, None)
+            self._complete(job, {"state": FAILED, "error": "helper connection lost"})
+        for waiter in waiters:
+            if not waiter[0].is_set():
+                waiter[1] = {"state": FAILED, "error": "helper connection lost"}
+                waiter[0].set()
+
+    def _deliver(self, message):
+        request_id = message.get("id")
+        if request_id in self._waiters:
+            if message.get("event") == "done":
+                waiter = self._waiters[request_id]
+                waiter[1] = message
+                waiter[0].set()
+            return
+        job = self._jobs.get(request_id)
+        if job is None:
+            return
+        if message.get("event") == "line":
+            line = message.get("line", "")
+            job.lines.append(line)
+            if job.on_line is not None:
+                self.post(job.on_line, job, line)
+        elif message.get("event") == "done":
+            self._jobs.pop(request_id, None)
+            self._complete(job, message)
+
+    def _complete(self, job, message):
+        job.state = message.get("state", FAILED)
+        job.returncode = message.get("returncode")
+        job.result = message.get("result")
+        job.error = message.get("error")
+        if job.started is None:
+            job.started = job.submitted
+        job.finished = job.started + (message.get("duration") or 0.0)
+        TIMINGS.record(job.kind, job.duration)
+        if job.error and not job.lines:
+            job.lines.append(job.error + "\n")
+            if job.on_line is not None:
+                self.post(job.on_line, job, job.error + "\n")
+        if job.on_done is not None:
+            self.post(job.on_done, job)
+
+
+class HelperBackend:
+    """StatusEngine backend that asks the helper for ``wg show all dump``."""
+
+    name = "helper"
+
+    def __init__(self, client):
+        self.client = client
+
+    def available(self):
+        return self.client.ensure_connected()
+
+    def dump(self):
+        try:
+            return parse_dump(self.client.request("dump"))
+        except HelperError as e:
+            raise StatusError(str(e))
+
+    def show(self):
+        try:
+            return self.client.request("show")
+        except HelperError as e:
+            raise StatusError(str(e))
+
+
+def connect(post=None, path=None, lazy=False):
+    """Return a connected HelperClient, or None when no helper is running.
+
+    With lazy, a client is returned either way; it connects on first use
+    once a helper runs (see HelperClient.ensure_connected).
+    """
+    client = HelperClient(path, post=post)
+    try:
+        return client.connect()
+    except OSError:
+        return client if lazy else None
+
+
+# ---------------------------
+# Entry point
+# ---------------------------
+def _detach():
+    if os.fork():
+        os._exit(0)
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WireGuard GUI privileged helper.")
+    parser.add_argument("--owner", type=int,
+                        help="uid allowed to connect (the desktop user)")
+    parser.add_argument("--socket", help="socket path (default %s)" % socket_path(0).replace("-0", "-<uid>"))
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--detach", action="store_true", help="run in the background")
+    parser.add_argument("--idle-timeout", type=int, default=IDLE_TIMEOUT,
+                        help="exit after this many seconds without clients or jobs "
+                             "(0: never, default %(default)s)")
+    parser.add_argument("--check", action="store_true",
+                        help="only report whether a helper for this user is running")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 0 if _alive(args.socket or socket_path()) else 1
+    if args.owner is None:
+        parser.error("--owner is required")
+    if os.geteuid() != 0:
+        parser.error("the helper must run as root")
+    path = args.socket or socket_path(args.owner)
+    if _alive(path):
+        print("helper already running on %s" % path)
+        return 0
+
+    server = HelperServer(path, args.owner, max_workers=args.workers,
+                          idle_timeout=args.idle_timeout)
+    try:
+        server.bind()
+    except (OSError, HelperError) as e:
+        print("wireguard-gui helper: %s" % e, file=sys.stderr)
+        return 1
+    if args.detach:
+        _detach()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Background command execution.
+
+Commands run in a small pool of worker threads so the Tk main loop never
+blocks on ``sudo wg-quick``.  Workers never touch widgets: every callback
+is queued and executed by whoever calls ``JobRunner.process_events`` (the
+GUI does that from ``root.after``).
+"""
+import itertools
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from wireguard_gui.timing import TIMINGS, command_kind
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed out"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+
+class Job:
+    """A single command (or Python callable) submitted to a JobRunner."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, cmd, timeout=None, on_line=None, on_done=None, label=None, func=None,
+                 cwd=None):
+        self.id = next(self._ids)
+        self.cmd = list(cmd)
+        self.cwd = cwd
+        self.func = func
+        self.label = label or " ".join(self.cmd) or getattr(func, "__name__", "call")
+        # Operation name for the latency histograms (see wireguard_gui.timing)
+        self.kind = command_kind(self.cmd) if self.cmd else "call"
+        self.timeout = timeout
+        self.on_line = on_line
+        self.on_done = on_done
+        self.state = PENDING
+        self.returncode = None
+        self.lines = []
+        self.error = None
+        self.exception = None
+        self.result = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._proc = None
+        self._lock = threading.Lock()
+
+    @property
+    def output(self):
+        return "".join(self.lines)
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def done(self):
+        return self.state in FINISHED_STATES
+
+    def cancel(self):
+        """Cancel the job; kills the process group if it is already running."""
+        with self._lock:
+            if self.done:
+                return False
+            if self.state == PENDING:
+                self.state = CANCELLED
+                return True
+            self.state = CANCELLED
+            proc = self._proc
+        _terminate(proc)
+        return True
+
+    def _expire(self):
+        with self._lock:
+            if self.state != RUNNING:
+                return
+            self.state = TIMED_OUT
+            proc = self._proc
+        _terminate(proc)
+
+    def __repr__(self):
+        return "<Job #%d %s [%s]>" % (self.id, self.label, self.state)
+
+
+def _terminate(proc):
+    """Stop a process and everything it spawned (sudo forwards to wg-quick)."""
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (OSError, AttributeError):
+        try:
+            proc.terminate()
+        except OSError:
+            pass
+
+
+class JobRunner:
+    """Bounded worker pool running commands and streaming their output."""
+
+    def __init__(self, max_workers=4, default_timeout=None, events=None):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        # Another runner's queue, to have its process_events run the callbacks
+        self.events = queue.Queue() if events is None else events
+        self._pending = queue.Queue()
+        self._active = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._idle = 0
+        self._closed = False
+
+    # ---------------------------
+    # Submission
+    # ---------------------------
+    def submit(self, cmd, timeout=None, on_line=None, on_done=None, label=None, cwd=None):
+        """Queue a command and return its Job.
+
+        ``on_line(job, line)`` is called for every output line (stderr is
+        merged into stdout, as ``run_cmd`` always did) and ``on_done(job)``
+        once the job has finished, both from ``process_events``.
+        """
+        if self._closed:
+            raise RuntimeError("JobRunner has been shut down")
+        if timeout is None:
+            timeout = self.default_timeout
+        job = Job(cmd, timeout=timeout, on_line=on_line, on_done=on_done, label=label, cwd=cwd)
+        return self._queue(job)
+
+    def call(self, func, *args, on_done=None, label=None):
+        """Run func(*args) in the pool; the return value ends up in job.result.
+
+        Exceptions are caught and stored in job.exception, their text in
+        job.error (state FAILED).
+        Timeouts do not apply to calls.
+        """
+        if self._closed:
+            raise RuntimeError("JobRunner has been shut down")
+        job = Job((), on_done=on_done, label=label, func=lambda: func(*args))
+        if label is None:
+            job.label = getattr(func, "__name__", "call")
+        job.kind = "call %s" % getattr(func, "__qualname__", job.label).replace(".<locals>", "")
+        return self._queue(job)
+
+    def _queue(self, job):
+        with self._lock:
+            self._active[job.id] = job
+            self._spawn_worker()
+        self._pending.put(job)
+        return job
+
+    def _spawn_worker(self):
+        # Workers are started lazily, only when no idle worker is left to
+        # pick up the job about to be queued.
+        if self._pending.qsize() >= self._idle and len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name="wg-job-worker", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    @property
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self._active.values() if not job.done]
+
+    def cancel_all(self):
+        for job in self.active_jobs:
+            job.cancel()
+
+    def shutdown(self):
+        """Cancel everything and let the workers exit."""
+        self._closed = True
+        self.cancel_all()
+        for _ in self._workers:
+            self._pending.put(None)
+
+    # ---------------------------
+    # Worker side
+    # ---------------------------
+    def _work(self):
+        while True:
+            with self._lock:
+                self._idle += 1
+            job = self._pending.get()
+            with self._lock:
+                self._idle -= 1
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job):
+        with job._lock:
+            if job.state == CANCELLED:
+                job.finished = time.monotonic()
+                self._finish(job)
+                return
+            job.state = RUNNING
+            job.started = time.monotonic()
+            if job.func is None:
+                self._start_process(job)
+        if job.func is not None:
+            self._run_call(job)
+        elif job._proc is None:
+            self._finish(job)
+        else:
+            self._stream(job)
+
+    def _start_process(self, job):
+        try:
+            job._proc = subprocess.Popen(
+                job.cmd,
+                cwd=job.cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+                start_new_session=True,
+            )
+        except OSError as e:
+            job.state = FAILED
+            job.error = str(e)
+            job.lines.append("%s\n" % e)
+            job.finished = time.monotonic()
+            self._emit(job.on_line, job, "%s\n" % e)
+
+    def _stream(self, job):
+        timer = None
+        if job.timeout:
+            timer = threading.Timer(job.timeout, job._expire)
+            timer.daemon = True
+            timer.start()
+        try:
+            for line in job._proc.stdout:
+                job.lines.append(line)
+                self._emit(job.on_line, job, line)
+            job._proc.stdout.close()
+            job.returncode = job._proc.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+        with job._lock:
+            job.finished = time.monotonic()
+            if job.state == RUNNING:
+                job.state = DONE if job.returncode == 0 else FAILED
+        self._finish(job)
+
+    def _run_call(self, job):
+        # A running call cannot be interrupted; cancelling it only discards
+        # the result.
+        exception = None
+        try:
+            result = job.func()
+            error = None
+        except Exception as e:
+            result = None
+            exception = e
+            error = str(e) or e.__class__.__name__
+        with job._lock:
+            job.finished = time.monotonic()
+            job.result = result
+            job.error = error
+            job.exception = exception
+            if job.state == RUNNING:
+                job.state = DONE if error is None else FAILED
+        self._finish(job)
+
+    def _finish(self, job):
+        with self._lock:
+            self._active.pop(job.id, None)
+        if job.started is not None:
+            TIMINGS.record("job queue wait", job.started - job.submitted)
+            TIMINGS.record(job.kind, job.duration)
+        self._emit(job.on_done, job)
+
+    def _emit(self, callback, *args):
+        if callback is not None:
+            self.events.put((callback, args))
+
+    def post(self, callback, *args):
+        """Queue callback(*args) for process_events; safe from any thread."""
+        self._emit(callback, *args)
+
+    # ---------------------------
+    # Main-thread side
+    # ---------------------------
+    def process_events(self, limit=500):
+        """Run queued callbacks on the calling thread; returns how many ran."""
+        handled = 0
+        while handled < limit:
+            try:
+                callback, args = self.events.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+            handled += 1
+        return handled
@@ -0,0 +1,191 @@
+"""Config linter: mistakes that wg-quick accepts but that break routing.
+
+``lint(text)`` parses a config and returns Diagnostics with the line
+they belong to:
+
+    errors    the config does not parse, a key or CIDR is malformed, a
+              peer has no or a duplicate PublicKey, or the same network
+              is in the AllowedIPs of two peers (wg gives it to the last
+              one and the first silently loses it)
+    warnings  unknown keys, single-value keys given twice, host bits set
+              in a CIDR, networks inside another peer's AllowedIPs
+              (legal, the more specific wins, but often a typo) and
+              redundant entries within one peer
+
+Overlaps come from one PrefixTrie holding every AllowedIPs network, so
+the cost grows with the number of networks rather than its square.
+"""
+import base64
+import binascii
+import collections
+import ipaddress
+
+from wireguard_gui.config import (
+    _CANONICAL, MULTI_KEYS, PEER_KEYS, WG_INTERFACE_KEYS, WG_QUICK_INTERFACE_KEYS, ConfigError,
+    WgConfig, split_list,
+)
+from wireguard_gui.prefixes import PrefixTrie, parse_prefix
+
+ERROR = "error"
+WARNING = "warning"
+
+Diagnostic = collections.namedtuple("Diagnostic", ["lineno", "severity", "message"])
+
+INTERFACE_KEYS = WG_INTERFACE_KEYS + WG_QUICK_INTERFACE_KEYS
+KEY_FIELDS = ("PrivateKey", "PublicKey", "PresharedKey")
+PORT_FIELDS = ("ListenPort", "PersistentKeepalive")
+
+
+def _valid_key(value):
+    try:
+        return len(base64.b64decode(value, validate=True)) == 32
+    except (binascii.Error, ValueError):
+        return False
+
+
+def _valid_port(value, allow_off=False):
+    if allow_off and value.lower() == "off":
+        return True
+    return value.isdigit() and int(value) <= 65535
+
+
+def _valid_endpoint(value):
+    host, sep, port = value.rpartition(":")
+    if not sep or not host or not _valid_port(port) or port == "0":
+        return False
+    if host.startswith("["):
+        if not host.endswith("]"):
+            return False
+        try:
+            ipaddress.IPv6Address(host[1:-1].split("%")[0])
+        except ValueError:
+            return False
+    return True
+
+
+def _describe(lineno, index):
+    return "peer at line %d" % lineno if lineno else "peer %d" % (index + 1)
+
+
+class _Linter:
+    def __init__(self, config):
+        self.config = config
+        self.diagnostics = []
+
+    def report(self, lineno, severity, message, *args):
+        self.diagnostics.append(Diagnostic(lineno, severity, message % args if args else message))
+
+    def section(self, section, known):
+        seen = {}
+        for line in section.lines:
+            if line.key is None:
+                continue
+            if line.key not in known:
+                if line.key.lower() in _CANONICAL:
+                    self.report(line.lineno, WARNING, "%s does not belong in [%s]", line.key, section.kind)
+                else:
+                    self.report(line.lineno, WARNING, "unknown key %s", line.key)
+                continue
+            if line.key not in MULTI_KEYS:
+                if line.key in seen:
+                    self.report(line.lineno, WARNING, "%s is already set on line %d; only one is used",
+                                line.key, seen[line.key])
+                seen.setdefault(line.key, line.lineno)
+            value = line.value
+            if not value:
+                self.report(line.lineno, ERROR, "%s has no value", line.key)
+            elif line.key in KEY_FIELDS and not _valid_key(value):
+                self.report(line.lineno, ERROR, "%s is not a base64 encoded 32 byte key", line.key)
+            elif line.key in PORT_FIELDS and not _valid_port(value, allow_off=line.key == "PersistentKeepalive"):
+                self.report(line.lineno, ERROR, "%s must be a number from 0 to 65535", line.key)
+            elif line.key == "Endpoint" and not _valid_endpoint(value):
+                self.report(line.lineno, ERROR, "Endpoint must be host:port ([address]:port for IPv6)")
+            elif line.key == "Address":
+                for item in split_list(value):
+                    try:
+                        ipaddress.ip_interface(item)
+                    except ValueError:
+                        self.report(line.lineno, ERROR, "%s is not an address", item)
+
+    def run(self):
+        config = self.config
+        self.section(config.interface, INTERFACE_KEYS)
+        if config.interface.lineno is None:
+            self.report(1, ERROR, "no [Interface] section")
+        elif not config.interface.get("PrivateKey"):
+            self.report(config.interface.lineno, ERROR, "[Interface] has no PrivateKey")
+
+        keys = {}
+        trie = PrefixTrie()
+        for index, peer in enumerate(config.peers):
+            self.section(peer, PEER_KEYS)
+            key = peer.get("PublicKey")
+            if not key:
+                self.report(peer.lineno, ERROR, "[Peer] has no PublicKey")
+            elif key in keys:
+                self.report(peer.line_of("PublicKey"), ERROR, "PublicKey already used by the %s",
+                            _describe(*keys[key]))
+            else:
+                keys[key] = (peer.lineno, index)
+            for line in peer.lines:
+                if line.key != "AllowedIPs":
+                    continue
+                for item in split_list(line.value):
+                    try:
+                        network = parse_prefix(item)
+                    except ValueError:
+                        try:
+                            network = parse_prefix(item, strict=False)
+                        except ValueError:
+                            self.report(line.lineno, ERROR, "%s is not a network (CIDR)", item)
+                            continue
+                        self.report(line.lineno, WARNING, "%s has host bits set; it means %s", item, network)
+                    trie.insert(network, (index, peer.lineno, line.lineno))
+        self.overlaps(trie)
+        self.diagnostics.sort(key=lambda d: (d.lineno or 0, d.severity != ERROR))
+        return self.diagnostics
+
+    def overlaps(self, trie):
+        for network, owners, covering in trie.items():
+            first = owners[0]
+            seen = {first[0]}
+            for index, _, lineno in owners[1:]:
+                if index in seen:
+                    self.report(lineno, WARNING, "%s is listed twice for this peer", network)
+                else:
+                    self.report(lineno, ERROR, "%s is also in the AllowedIPs of the %s; only one peer gets it",
+                                network, _describe(first[1], first[0]))
+                    seen.add(index)
+            if covering is None:
+                continue
+            outer, outer_owners = covering
+            for index, _, lineno in owners:
+                same = [o for o in outer_owners if o[0] == index]
+                if same:
+                    self.report(lineno, WARNING, "%s is redundant: %s on line %d already covers it",
+                                network, outer, same[0][2])
+                elif outer.length:
+                    # A default route under more specific ones is the usual hub layout
+                    other = outer_owners[0]
+                    self.report(lineno, WARNING, "%s is inside %s of the %s; traffic to it goes here instead",
+                                network, outer, _describe(other[1], other[0]))
+
+
+def lint(text, path=None):
+    """Diagnostics for config text, sorted by line."""
+    try:
+        config = WgConfig.parse(text, path)
+    except ConfigError as e:
+        message = str(e)
+        if e.lineno:
+            message = message.split(": ", 1)[1]
+        return [Diagnostic(e.lineno or 1, ERROR, message)]
+    return _Linter(config).run()
+
+
+def errors(diagnostics):
+    return [d for d in diagnostics if d.severity == ERROR]
+
+
+def format_diagnostics(diagnostics):
+    return "\n".join("line %d: %s: %s" % (d.lineno or 0, d.severity, d.message) for d in diagnostics)
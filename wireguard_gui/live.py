@@ -0,0 +1,300 @@
+"""Apply an edited config to a running interface without a down/up cycle.
+
+plan_live_apply compares a parsed config with the running device and
+works out what changed.  Peer changes are pushed with ``wg syncconf``,
+which only touches the peers that differ, so established sessions of
+the other peers survive; routes for added or removed AllowedIPs are
+updated the way wg-quick would have set them up.  Changes to wg-quick
+level interface fields (Address, DNS, MTU, Table, hooks) cannot be
+applied that way and make the plan ask for a full restart instead.
+
+apply_live runs as root (in the helper, or via ``sudo python3 -m
+wireguard_gui.live``).
+"""
+import argparse
+import ipaddress
+import os
+import subprocess
+import sys
+
+from wireguard_gui.config import WG_QUICK_INTERFACE_KEYS
+from wireguard_gui.status import interface_name
+
+SYSFS_NET = "/sys/class/net"
+DEFAULT_ROUTES = ("0.0.0.0/0", "::/0")
+
+
+class LiveApplyError(Exception):
+    """Applying a config to the running interface failed."""
+
+
+class LivePlan:
+    """What an "Apply live" would change on one interface."""
+
+    def __init__(self, name):
+        self.name = name
+        self.running = True
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.interface_changes = []
+        self.restart_reasons = []
+        self.notes = []
+        self.add_routes = []
+        self.del_routes = []
+
+    @property
+    def needs_restart(self):
+        return bool(self.restart_reasons)
+
+    @property
+    def has_changes(self):
+        return bool(self.added or self.removed or self.changed or self.interface_changes
+                    or self.restart_reasons)
+
+    def report(self):
+        lines = []
+        if not self.running:
+            return "%s is not running; nothing to apply live.\n" % self.name
+        if not self.has_changes:
+            lines.append("%s: running configuration already matches." % self.name)
+        for key in self.added:
+            lines.append("+ peer %s" % key)
+        for key in self.removed:
+            lines.append("- peer %s" % key)
+        for key, fields in self.changed:
+            lines.append("~ peer %s: %s" % (key, ", ".join(fields)))
+        for field in self.interface_changes:
+            lines.append("~ interface %s" % field)
+        for route in self.add_routes:
+            lines.append("+ route %s" % route)
+        for route in self.del_routes:
+            lines.append("- route %s" % route)
+        for reason in self.restart_reasons:
+            lines.append("! restart needed: %s" % reason)
+        for note in self.notes:
+            lines.append("  note: %s" % note)
+        return "\n".join(lines) + "\n"
+
+
+def _normalize_networks(items):
+    result = set()
+    for item in items:
+        try:
+            result.add(str(ipaddress.ip_network(item, strict=False)))
+        except ValueError:
+            result.add(item)
+    return result
+
+
+def _normalize_addresses(items):
+    result = set()
+    for item in items:
+        try:
+            address = ipaddress.ip_interface(item)
+        except ValueError:
+            result.add(item)
+            continue
+        if not address.is_link_local:
+            result.add(str(address))
+    return result
+
+
+def _is_ip_endpoint(endpoint):
+    host = endpoint.rsplit(":", 1)[0].strip("[]")
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _normalize_endpoint(endpoint):
+    host, _, port = endpoint.rpartition(":")
+    host = host.strip("[]")
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return endpoint
+    return ("[%s]:%s" if address.version == 6 else "%s:%s") % (address, port)
+
+
+def running_addresses(name):
+    """Addresses configured on a link, from ``ip -o addr`` (no root needed)."""
+    try:
+        out = subprocess.check_output(["ip", "-o", "addr", "show", "dev", name],
+                                      text=True, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    addresses = set()
+    for line in out.splitlines():
+        fields = line.split()
+        for family in ("inet", "inet6"):
+            if family in fields:
+                addresses.add(fields[fields.index(family) + 1])
+    return addresses
+
+
+def running_mtu(name):
+    try:
+        with open(os.path.join(SYSFS_NET, name, "mtu")) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def plan_live_apply(config, interface, previous=None, addresses=None, mtu=None):
+    """Compare config (WgConfig) with the running status Interface.
+
+    ``previous`` is the config that was last brought up or applied, when
+    known; it is the only way to tell whether DNS, Table or the hooks
+    changed.  ``addresses``/``mtu`` are the live link values (see
+    running_addresses/running_mtu).
+    """
+    name = interface.name if interface is not None else interface_name(config.path or "")
+    plan = LivePlan(name)
+    if interface is None:
+        plan.running = False
+        return plan
+
+    iface = config.interface
+    table = (iface.get("Table") or "auto").lower()
+
+    # wg-quick level fields.
+    if previous is not None:
+        for key in WG_QUICK_INTERFACE_KEYS:
+            if key in ("Address", "DNS", "PreUp", "PostUp", "PreDown", "PostDown"):
+                changed = iface.get_list(key) != previous.interface.get_list(key)
+            else:
+                changed = iface.get(key) != previous.interface.get(key)
+            if changed:
+                plan.restart_reasons.append("%s changed" % key)
+    else:
+        if addresses is not None and iface.get("Address"):
+            if _normalize_addresses(iface.get_list("Address")) != _normalize_addresses(addresses):
+                plan.restart_reasons.append("Address changed")
+        if mtu is not None and iface.get("MTU") and iface.get("MTU") != str(mtu):
+            plan.restart_reasons.append("MTU changed")
+        unverified = [k for k in ("DNS", "Table", "PreUp", "PostUp", "PreDown", "PostDown")
+                      if iface.get(k)]
+        if unverified:
+            plan.notes.append("%s not compared (interface was not brought up from this window)"
+                              % ", ".join(unverified))
+
+    # wg level interface fields are handled by syncconf.
+    port = iface.get("ListenPort")
+    if port and interface.listen_port and int(port) != interface.listen_port:
+        plan.interface_changes.append("ListenPort %s -> %s" % (interface.listen_port, port))
+    fwmark = iface.get("FwMark")
+    if fwmark and fwmark.lower() not in ("off", "0") and int(fwmark, 0) != int(interface.fwmark or "0", 0):
+        plan.interface_changes.append("FwMark %s -> %s" % (interface.fwmark or "off", fwmark))
+
+    # Peers.
+    running = {peer.public_key: peer for peer in interface.peers}
+    wanted = {}
+    for section in config.peers:
+        key = section.get("PublicKey")
+        if key:
+            wanted[key] = section
+    old_networks = set()
+    new_networks = set()
+    for key, peer in running.items():
+        old_networks |= _normalize_networks(peer.allowed_ips)
+        if key not in wanted:
+            plan.removed.append(key)
+    for key, section in wanted.items():
+        networks = _normalize_networks(section.get_list("AllowedIPs"))
+        new_networks |= networks
+        peer = running.get(key)
+        if peer is None:
+            plan.added.append(key)
+            continue
+        fields = []
+        if networks != _normalize_networks(peer.allowed_ips):
+            fields.append("AllowedIPs")
+        endpoint = section.get("Endpoint")
+        if endpoint:
+            if _is_ip_endpoint(endpoint):
+                if _normalize_endpoint(endpoint) != peer.endpoint:
+                    fields.append("Endpoint")
+            elif previous is not None:
+                old = previous.peer(key)
+                if old is None or old.get("Endpoint") != endpoint:
+                    fields.append("Endpoint")
+        keepalive = section.get("PersistentKeepalive")
+        keepalive = None if keepalive in (None, "off", "0") else int(keepalive)
+        if keepalive != peer.persistent_keepalive:
+            fields.append("PersistentKeepalive")
+        if (section.get("PresharedKey") or None) != peer.preshared_key:
+            fields.append("PresharedKey")
+        if fields:
+            plan.changed.append((key, fields))
+
+    # Routes, as wg-quick sets them up for Table=auto/<n>.
+    if table != "off":
+        added = new_networks - old_networks
+        removed = old_networks - new_networks
+        defaults = [r for r in added | removed if r in DEFAULT_ROUTES]
+        if defaults:
+            plan.restart_reasons.append("default route %s changes policy routing" % ", ".join(sorted(defaults)))
+        plan.add_routes = sorted(r for r in added if r not in DEFAULT_ROUTES)
+        plan.del_routes = sorted(r for r in removed if r not in DEFAULT_ROUTES)
+    return plan
+
+
+def _route_cmd(action, route, name, table):
+    network = ipaddress.ip_network(route, strict=False)
+    cmd = ["ip", "-6" if network.version == 6 else "-4", "route", action, str(network), "dev", name]
+    if table not in ("auto", "main"):
+        cmd += ["table", table]
+    return cmd
+
+
+def apply_live(target, add_routes=(), del_routes=(), table="auto"):
+    """Push the config of target to its running interface; returns a log.
+
+    Must run as root.  Raises LiveApplyError when a step fails.
+    """
+    name = interface_name(target)
+    log = []
+
+    def run(cmd, data=None):
+        log.append("[#] %s\n" % " ".join(cmd))
+        result = subprocess.run(cmd, input=data, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+        if result.stdout:
+            log.append(result.stdout)
+        if result.returncode != 0:
+            raise LiveApplyError("".join(log))
+        return result.stdout
+
+    try:
+        stripped = subprocess.check_output(["wg-quick", "strip", target], text=True,
+                                           stderr=subprocess.PIPE)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise LiveApplyError("wg-quick strip %s failed: %s" % (target, getattr(e, "stderr", "") or e))
+    run(["wg", "syncconf", name, "/dev/stdin"], stripped)
+    for route in del_routes:
+        run(_route_cmd("del", route, name, table))
+    for route in add_routes:
+        run(_route_cmd("replace", route, name, table))
+    return "".join(log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a WireGuard config to its running interface.")
+    parser.add_argument("target", help="interface name or config path")
+    parser.add_argument("--add-route", action="append", default=[])
+    parser.add_argument("--del-route", action="append", default=[])
+    parser.add_argument("--table", default="auto")
+    args = parser.parse_args(argv)
+    try:
+        sys.stdout.write(apply_live(args.target, args.add_route, args.del_route, args.table))
+    except LiveApplyError as e:
+        sys.stdout.write(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Per-peer traffic time series.
+
+MetricsStore samples every status snapshot into fixed-size ring buffers:
+per interface one array of sample times and, per peer, ``length`` slots
+of rx bytes, tx bytes (array('Q')) and latest handshake (array('I'), unix
+seconds) inside shared flat arrays.  Nothing is allocated per sample, so
+memory is known up front: 20 bytes per peer per sample slot, i.e. 24 MB
+for 10,000 peers with the default 120 samples (two minutes at 1 Hz).
+Interface totals are kept in their own rings so a graph never has to
+add up thousands of peers.
+
+Rates are derived from consecutive counter samples; a counter that goes
+backwards (interface restarted) counts as zero for that interval.
+"""
+from array import array
+
+from wireguard_gui.status import interface_name
+
+SERIES_LENGTH = 120
+# Snapshots closer together than this are not sampled twice.
+MIN_SAMPLE_INTERVAL = 0.5
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class InterfaceSeries:
+    """Ring buffers for one interface and its peers."""
+
+    def __init__(self, name, length=SERIES_LENGTH):
+        self.name = name
+        self.length = length
+        self.times = array("d", bytes(8 * length))
+        self.total_rx = array("Q", bytes(8 * length))
+        self.total_tx = array("Q", bytes(8 * length))
+        self.rx = array("Q")
+        self.tx = array("Q")
+        self.handshake = array("I")
+        self.slots = {}
+        self.first_seq = array("Q")
+        self.seq = 0
+        self._free = []
+
+    @property
+    def head(self):
+        """Ring position of the most recent sample."""
+        return (self.seq - 1) % self.length
+
+    def __len__(self):
+        return min(self.seq, self.length)
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.times, self.total_rx, self.total_tx,
+                                                 self.rx, self.tx, self.handshake, self.first_seq))
+
+    # ---------------------------
+    # Recording
+    # ---------------------------
+    def _slot(self, key):
+        slot = self.slots.get(key)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self.first_seq)
+            zeros = bytes(8 * self.length)
+            self.rx.frombytes(zeros)
+            self.tx.frombytes(zeros)
+            self.handshake.frombytes(bytes(self.handshake.itemsize * self.length))
+            self.first_seq.append(0)
+        self.first_seq[slot] = self.seq
+        self.slots[key] = slot
+        return slot
+
+    def record(self, taken_at, peers):
+        position = self.seq % self.length
+        self.times[position] = taken_at
+        rx = self.rx
+        tx = self.tx
+        handshake = self.handshake
+        length = self.length
+        seen = set()
+        total_rx = total_tx = 0
+        for peer in peers:
+            slot = self._slot(peer.public_key)
+            seen.add(peer.public_key)
+            index = slot * length + position
+            rx[index] = peer.rx_bytes
+            tx[index] = peer.tx_bytes
+            handshake[index] = peer.latest_handshake or 0
+            total_rx += peer.rx_bytes
+            total_tx += peer.tx_bytes
+        self.total_rx[position] = total_rx
+        self.total_tx[position] = total_tx
+        for key in [key for key in self.slots if key not in seen]:
+            self._free.append(self.slots.pop(key))
+        self.seq += 1
+
+    # ---------------------------
+    # Reading
+    # ---------------------------
+    def _order(self, start_seq=0):
+        """Ring positions of the valid samples, oldest first."""
+        first = max(self.seq - self.length, start_seq)
+        return [seq % self.length for seq in range(first, self.seq)]
+
+    def sample_times(self):
+        return [self.times[p] for p in self._order()]
+
+    def series(self, key, metric="rx"):
+        """Samples of one peer ("rx", "tx" or "handshake"), oldest first."""
+        slot = self.slots.get(key)
+        if slot is None:
+            return []
+        data = memoryview(getattr(self, metric))[slot * self.length:(slot + 1) * self.length]
+        return [data[p] for p in self._order(self.first_seq[slot])]
+
+    def total_series(self, metric="rx"):
+        data = self.total_rx if metric == "rx" else self.total_tx
+        return [data[p] for p in self._order()]
+
+    def _rates(self, positions, values):
+        rates = []
+        for i in range(1, len(positions)):
+            elapsed = self.times[positions[i]] - self.times[positions[i - 1]]
+            delta = values[positions[i]] - values[positions[i - 1]]
+            rates.append(delta / elapsed if elapsed > 0 and delta > 0 else 0.0)
+        return rates
+
+    def rates(self, key, metric="rx"):
+        """Bytes per second between consecutive samples of one peer."""
+        slot = self.slots.get(key)
+        if slot is None:
+            return []
+        data = memoryview(getattr(self, metric))[slot * self.length:(slot + 1) * self.length]
+        return self._rates(self._order(self.first_seq[slot]), data)
+
+    def total_rates(self, metric="rx"):
+        return self._rates(self._order(), self.total_rx if metric == "rx" else self.total_tx)
+
+    def rate(self, key, metric="rx"):
+        """Latest rate of one peer, in bytes per second."""
+        slot = self.slots.get(key)
+        if slot is None or self.seq - self.first_seq[slot] < 2:
+            return 0.0
+        return self._rates(self._order(self.seq - 2), memoryview(getattr(self, metric))[
+            slot * self.length:(slot + 1) * self.length])[-1]
+
+    def top_peers(self, count=10, metric="rx"):
+        """[(public key, latest rate)] of the busiest peers."""
+        if self.seq < 2:
+            return []
+        last, prev = self.head, (self.seq - 2) % self.length
+        elapsed = self.times[last] - self.times[prev]
+        if elapsed <= 0:
+            return []
+        data = getattr(self, metric)
+        length = self.length
+        rates = []
+        for key, slot in self.slots.items():
+            if self.seq - self.first_seq[slot] < 2:
+                continue
+            delta = data[slot * length + last] - data[slot * length + prev]
+            if delta > 0:
+                rates.append((delta / elapsed, key))
+        rates.sort(reverse=True)
+        return [(key, rate) for rate, key in rates[:count]]
+
+
+class MetricsStore:
+    """Time series for every running interface, fed from StatusSnapshots."""
+
+    def __init__(self, length=SERIES_LENGTH, min_interval=MIN_SAMPLE_INTERVAL):
+        self.length = length
+        self.min_interval = min_interval
+        self.interfaces = {}
+        self.last_sample = None
+
+    def record(self, snapshot):
+        """Sample a snapshot; use as a StatusEngine subscriber."""
+        if not snapshot.ok:
+            return False
+        if self.last_sample is not None and snapshot.taken_at - self.last_sample < self.min_interval:
+            return False
+        self.last_sample = snapshot.taken_at
+        for name, interface in snapshot.interfaces.items():
+            series = self.interfaces.get(name)
+            if series is None:
+                series = self.interfaces[name] = InterfaceSeries(name, self.length)
+            series.record(snapshot.taken_at, interface.peers)
+        for name in [name for name in self.interfaces if name not in snapshot.interfaces]:
+            # Interface went down; its counters restart from zero anyway.
+            del self.interfaces[name]
+        return True
+
+    def get(self, iface):
+        return self.interfaces.get(interface_name(iface))
+
+    @property
+    def nbytes(self):
+        return sum(series.nbytes for series in self.interfaces.values())
+
+
+def format_rate(rate):
+    for unit in ("B/s", "KiB/s", "MiB/s", "GiB/s"):
+        if rate < 1024:
+            return ("%d %s" if unit == "B/s" else "%.1f %s") % (rate, unit)
+        rate /= 1024.0
+    return "%.1f TiB/s" % rate
+
+
+def sparkline(values, width=None):
+    """Unicode block sparkline of values (the last ``width`` of them)."""
+    if width is not None:
+        values = values[-width:]
+    if not values:
+        return ""
+    top = max(values)
+    if top <= 0:
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / top
+    return "".join(SPARK_CHARS[int(value * scale)] for value in values)
@@ -0,0 +1,150 @@
+"""Adaptive background status polling.
+
+StatusMonitor keeps the status snapshot fresh while it is enabled.  It
+polls quickly while things are changing (right after a connect or
+disconnect, when the set of running interfaces changes, or when a
+handshake is about to expire) and backs off exponentially while the
+state is steady.  Every tick is a single RefreshScheduler request, i.e.
+one ``wg show all dump`` for all interfaces, and nothing runs while the
+window is iconified.
+"""
+import time
+
+from wireguard_gui.status import HANDSHAKE_TIMEOUT
+
+MIN_INTERVAL_MS = 1000
+MAX_INTERVAL_MS = 30000
+BACKOFF = 2.0
+
+# Poll fast once a handshake is this close to HANDSHAKE_TIMEOUT.
+STALE_MARGIN = 30
+
+
+class StatusMonitor:
+    """Opt-in poller driving a RefreshScheduler."""
+
+    def __init__(self, root, engine, scheduler,
+                 min_interval_ms=MIN_INTERVAL_MS, max_interval_ms=MAX_INTERVAL_MS):
+        self.root = root
+        self.engine = engine
+        self.scheduler = scheduler
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.interval_ms = min_interval_ms
+        self.enabled = False
+        self.pins = 0
+        self.holds = 0
+        self.ticks = 0
+        self._after_id = None
+        self._signature = None
+        engine.subscribe(self.on_snapshot)
+        root.bind("<Map>", self._on_map, add="+")
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.kick()
+
+    def stop(self):
+        self.enabled = False
+        if not self.active:
+            self._cancel()
+
+    @property
+    def active(self):
+        return self.enabled or self.pins > 0 or self.holds > 0
+
+    def pin(self):
+        """Poll at the fastest rate, enabled or not (e.g. while a graph is shown)."""
+        self.pins += 1
+        self.kick()
+
+    def unpin(self):
+        self.pins = max(0, self.pins - 1)
+        if not self.active:
+            self._cancel()
+
+    def hold(self):
+        """Keep polling at the adaptive rate, enabled or not (e.g. for failover groups)."""
+        self.holds += 1
+        if self._after_id is None:
+            self.kick()
+
+    def release(self):
+        self.holds = max(0, self.holds - 1)
+        if not self.active:
+            self._cancel()
+
+    def kick(self):
+        """Something is about to change: go back to the fastest rate."""
+        self.interval_ms = self.min_interval_ms
+        if self.active:
+            self._schedule(self.min_interval_ms)
+
+    # ---------------------------
+    # Scheduling
+    # ---------------------------
+    def _cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule(self, delay_ms):
+        self._cancel()
+        self._after_id = self.root.after(int(delay_ms), self._tick)
+
+    def _iconified(self):
+        try:
+            return self.root.state() == "iconic"
+        except Exception:
+            return False
+
+    def _tick(self):
+        self._after_id = None
+        if not self.active or self._iconified():
+            # Resumed by <Map> when the window is shown again.
+            return
+        self.ticks += 1
+        self.scheduler.request(0)
+
+    def _on_map(self, event):
+        if event.widget is self.root and self.active and self._after_id is None \
+                and not self.scheduler.busy:
+            self.kick()
+
+    # ---------------------------
+    # Adapting to state
+    # ---------------------------
+    def on_snapshot(self, snapshot):
+        signature = self.signature(snapshot)
+        if self.pins or signature != self._signature or self.handshake_expiring(snapshot):
+            self.interval_ms = self.min_interval_ms
+        else:
+            self.interval_ms = min(self.max_interval_ms, self.interval_ms * BACKOFF)
+        self._signature = signature
+        if self.active:
+            self._schedule(self.interval_ms)
+
+    @staticmethod
+    def signature(snapshot):
+        """What counts as a state change: interfaces up and handshakes alive."""
+        if not snapshot.ok:
+            return None
+        now = snapshot.taken_at
+        return tuple(
+            (name, tuple(bool(p.latest_handshake) and now - p.latest_handshake < HANDSHAKE_TIMEOUT
+                         for p in interface.peers))
+            for name, interface in sorted(snapshot.interfaces.items())
+        )
+
+    @staticmethod
+    def handshake_expiring(snapshot, now=None):
+        now = now or time.time()
+        for peer in snapshot.peers():
+            if not peer.latest_handshake:
+                continue
+            age = now - peer.latest_handshake
+            if HANDSHAKE_TIMEOUT - STALE_MARGIN <= age < HANDSHAKE_TIMEOUT:
+                return True
+        return False
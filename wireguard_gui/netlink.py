@@ -0,0 +1,486 @@
+"""Native WireGuard status over generic netlink.
+
+Talks to the kernel's ``wireguard`` generic netlink family directly
+(WG_CMD_GET_DEVICE), the same interface ``wg`` itself uses, so a status
+refresh costs a few syscalls instead of a fork/exec of ``wg``.  The result
+is the same {name: Interface} mapping that ``status.parse_dump`` builds.
+
+Reading device state needs CAP_NET_ADMIN.  NetlinkBackend raises
+StatusError when the family is missing or access is denied; the ``auto``
+status backend then falls back to the ``wg`` CLI.
+
+Raw replies can be recorded for offline parsing and benchmarking::
+
+    sudo python3 -m wireguard_gui.netlink --record replies.bin
+"""
+import binascii
+import collections
+import errno
+import os
+import socket
+import struct
+import sys
+import threading
+
+from wireguard_gui.status import Interface, Peer, StatusError, format_show
+
+NETLINK_GENERIC = 16
+
+NLM_F_REQUEST = 0x01
+NLM_F_MULTI = 0x02
+NLM_F_ACK = 0x04
+NLM_F_DUMP = 0x300
+
+NLMSG_ERROR = 0x2
+NLMSG_DONE = 0x3
+
+NLA_F_NESTED = 0x8000
+NLA_TYPE_MASK = 0x3FFF
+
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+
+WG_GENL_NAME = b"wireguard"
+WG_GENL_VERSION = 1
+WG_CMD_GET_DEVICE = 0
+
+WGDEVICE_A_IFINDEX = 1
+WGDEVICE_A_IFNAME = 2
+WGDEVICE_A_PRIVATE_KEY = 3
+WGDEVICE_A_PUBLIC_KEY = 4
+WGDEVICE_A_FLAGS = 5
+WGDEVICE_A_LISTEN_PORT = 6
+WGDEVICE_A_FWMARK = 7
+WGDEVICE_A_PEERS = 8
+
+WGPEER_A_PUBLIC_KEY = 1
+WGPEER_A_PRESHARED_KEY = 2
+WGPEER_A_FLAGS = 3
+WGPEER_A_ENDPOINT = 4
+WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL = 5
+WGPEER_A_LAST_HANDSHAKE_TIME = 6
+WGPEER_A_RX_BYTES = 7
+WGPEER_A_TX_BYTES = 8
+WGPEER_A_ALLOWEDIPS = 9
+WGPEER_A_PROTOCOL_VERSION = 10
+
+WGALLOWEDIP_A_FAMILY = 1
+WGALLOWEDIP_A_IPADDR = 2
+WGALLOWEDIP_A_CIDR_MASK = 3
+
+SYSFS_NET = "/sys/class/net"
+RECV_BUFSIZE = 1 << 18
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_GENLMSGHDR = struct.Struct("=BBH")
+_NLATTR = struct.Struct("=HH")
+_U16 = struct.Struct("=H")
+_U32 = struct.Struct("=I")
+_U64 = struct.Struct("=Q")
+_S32 = struct.Struct("=i")
+_TIMESPEC = struct.Struct("=qq")
+_BE16 = struct.Struct("!H")
+
+_ZERO_KEY = bytes(32)
+_LITTLE = sys.byteorder == "little"
+
+# Keys and allowed-IP lists already decoded, by their raw bytes.  Every
+# poll of a device sees mostly the same peers, so after the first one
+# decoding a peer is a few dict lookups; cleared when they grow past
+# DECODED_MAX entries.
+DECODED_MAX = 1 << 16
+_keys = {}
+_endpoints = {}
+_ips = {}
+
+
+class NetlinkError(StatusError):
+    """A netlink request failed; errno holds the kernel error code."""
+
+    def __init__(self, errno, message=None):
+        StatusError.__init__(self, message or os.strerror(errno))
+        self.errno = errno
+
+
+# ---------------------------
+# Wire format
+# ---------------------------
+def _align(n):
+    return (n + 3) & ~3
+
+
+def iter_messages(data):
+    """Yield (type, flags, payload memoryview) for each message in data."""
+    view = memoryview(data)
+    offset = 0
+    end = len(view)
+    while offset + _NLMSGHDR.size <= end:
+        length, msg_type, flags, _seq, _pid = _NLMSGHDR.unpack_from(view, offset)
+        if length < _NLMSGHDR.size or offset + length > end:
+            raise StatusError("truncated netlink message at offset %d" % offset)
+        yield msg_type, flags, view[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def iter_attrs(view):
+    """Yield (type, payload memoryview) for the attributes in view."""
+    offset = 0
+    end = len(view)
+    while offset + _NLATTR.size <= end:
+        length, attr_type = _NLATTR.unpack_from(view, offset)
+        if length < _NLATTR.size:
+            break
+        yield attr_type & NLA_TYPE_MASK, view[offset + _NLATTR.size:offset + length]
+        offset += _align(length)
+
+
+def _attr(attr_type, payload):
+    return _NLATTR.pack(_NLATTR.size + len(payload), attr_type) + payload + \
+        b"\0" * (_align(len(payload)) - len(payload))
+
+
+def _message(msg_type, flags, seq, payload):
+    return _NLMSGHDR.pack(_NLMSGHDR.size + len(payload), msg_type, flags, seq, 0) + payload
+
+
+def _error(data):
+    """errno of the first NLMSG_ERROR in data that is not an ACK, else 0."""
+    for msg_type, _flags, payload in iter_messages(data):
+        if msg_type == NLMSG_ERROR:
+            error = -_S32.unpack_from(payload)[0]
+            if error:
+                return error
+    return 0
+
+
+def _key(raw, _encode=binascii.b2a_base64):
+    key = _keys.get(raw)
+    if key is None and raw != _ZERO_KEY:
+        if len(_keys) >= DECODED_MAX:
+            _keys.clear()
+        key = _keys[raw] = _encode(raw, newline=False).decode("ascii")
+    return key
+
+
+def _endpoint(data, start, end):
+    family = _U16.unpack_from(data, start)[0]
+    if family == socket.AF_INET and end - start >= 8:
+        port = _BE16.unpack_from(data, start + 2)[0]
+        return "%s:%d" % (socket.inet_ntop(socket.AF_INET, data[start + 4:start + 8]), port)
+    if family == socket.AF_INET6 and end - start >= 24:
+        port = _BE16.unpack_from(data, start + 2)[0]
+        return "[%s]:%d" % (socket.inet_ntop(socket.AF_INET6, data[start + 8:start + 24]), port)
+    return None
+
+
+def _allowed_ips(data, offset, end, out, _unpack=_NLATTR.unpack_from, _inet_ntop=socket.inet_ntop):
+    """Append "addr/cidr" strings for the WGPEER_A_ALLOWEDIPS list in data[offset:end] to out.
+
+    This is the innermost loop for big hub devices, so attribute walking
+    is inlined instead of going through iter_attrs.
+    """
+    while offset + 4 <= end:
+        length, _index = _unpack(data, offset)
+        if length < 4:
+            break
+        inner = offset + 4
+        inner_end = offset + length
+        family = address = None
+        cidr = 0
+        while inner + 4 <= inner_end:
+            alen, atype = _unpack(data, inner)
+            if alen < 4:
+                break
+            atype &= NLA_TYPE_MASK
+            if atype == WGALLOWEDIP_A_FAMILY:
+                family = data[inner + 4] | (data[inner + 5] << 8) if _LITTLE else \
+                    (data[inner + 4] << 8) | data[inner + 5]
+            elif atype == WGALLOWEDIP_A_IPADDR:
+                address = data[inner + 4:inner + alen]
+            elif atype == WGALLOWEDIP_A_CIDR_MASK:
+                cidr = data[inner + 4]
+            inner += (alen + 3) & ~3
+        if address is not None and family in (socket.AF_INET, socket.AF_INET6):
+            out.append("%s/%d" % (_inet_ntop(family, address), cidr))
+        offset += (length + 3) & ~3
+
+
+def _peer(data, offset, end, _unpack=_NLATTR.unpack_from):
+    """One peer's attributes in data[offset:end], as a list in Peer field order.
+
+    Offsets into one bytes object rather than memoryview slices: slicing
+    and indexing bytes is several times cheaper, and this runs per peer.
+    """
+    public_key = preshared_key = endpoint = keepalive = None
+    allowed_ips = []
+    handshake = rx_bytes = tx_bytes = 0
+    while offset + 4 <= end:
+        length, attr_type = _unpack(data, offset)
+        if length < 4:
+            break
+        attr_type &= NLA_TYPE_MASK
+        start = offset + 4
+        if attr_type == WGPEER_A_ALLOWEDIPS:
+            raw = data[start:offset + length]
+            ips = _ips.get(raw)
+            if ips is None:
+                if len(_ips) >= DECODED_MAX:
+                    _ips.clear()
+                found = []
+                _allowed_ips(raw, 0, len(raw), found)
+                ips = _ips[raw] = tuple(found)
+            allowed_ips.extend(ips)
+        elif attr_type == WGPEER_A_PUBLIC_KEY:
+            public_key = _key(data[start:start + 32])
+        elif attr_type == WGPEER_A_PRESHARED_KEY:
+            preshared_key = _key(data[start:start + 32])
+        elif attr_type == WGPEER_A_ENDPOINT:
+            raw = data[start:offset + length]
+            endpoint = _endpoints.get(raw)
+            if endpoint is None:
+                if len(_endpoints) >= DECODED_MAX:
+                    _endpoints.clear()
+                endpoint = _endpoints[raw] = _endpoint(raw, 0, len(raw))
+        elif attr_type == WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL:
+            keepalive = _U16.unpack_from(data, start)[0] or None
+        elif attr_type == WGPEER_A_LAST_HANDSHAKE_TIME:
+            handshake = _TIMESPEC.unpack_from(data, start)[0]
+        elif attr_type == WGPEER_A_RX_BYTES:
+            rx_bytes = _U64.unpack_from(data, start)[0]
+        elif attr_type == WGPEER_A_TX_BYTES:
+            tx_bytes = _U64.unpack_from(data, start)[0]
+        offset += (length + 3) & ~3
+    return [public_key, preshared_key, endpoint, allowed_ips, handshake, rx_bytes, tx_bytes, keepalive]
+
+
+def _peers(data, known, _unpack=_NLATTR.unpack_from):
+    """Add the peers of a WGDEVICE_A_PEERS list (bytes) to known."""
+    offset = 0
+    end = len(data)
+    while offset + 4 <= end:
+        length, _index = _unpack(data, offset)
+        if length < 4:
+            break
+        peer = _peer(data, offset + 4, offset + length)
+        # A peer whose allowed IPs did not fit continues in the next message
+        if known and known[-1][0] == peer[0]:
+            known[-1][3].extend(peer[3])
+        else:
+            known.append(peer)
+        offset += (length + 3) & ~3
+
+
+def parse_messages(data, devices=None):
+    """Parse WG_CMD_GET_DEVICE replies into per-device state.
+
+    A device with many peers is split over several messages by the kernel.
+    Each message repeats the device attributes, and when a single peer's
+    allowed IPs do not fit, the next message starts with the same peer
+    again; those are merged like ``wg`` does.  ``devices`` may carry state
+    between calls when replies arrive in several reads; build_interfaces
+    turns the state into Interface records.
+    """
+    if devices is None:
+        devices = collections.OrderedDict()
+    for msg_type, _flags, payload in iter_messages(data):
+        if msg_type == NLMSG_DONE:
+            continue
+        if msg_type == NLMSG_ERROR:
+            error = -_S32.unpack_from(payload)[0]
+            if error:
+                raise NetlinkError(error)
+            continue
+        name = None
+        fields = {}
+        peers = None
+        for attr_type, value in iter_attrs(payload[_GENLMSGHDR.size:]):
+            if attr_type == WGDEVICE_A_IFNAME:
+                name = bytes(value).split(b"\0", 1)[0].decode("utf-8", "replace")
+            elif attr_type == WGDEVICE_A_PUBLIC_KEY:
+                fields["public_key"] = _key(value.tobytes())
+            elif attr_type == WGDEVICE_A_LISTEN_PORT:
+                fields["listen_port"] = _U16.unpack_from(value)[0]
+            elif attr_type == WGDEVICE_A_FWMARK:
+                fwmark = _U32.unpack_from(value)[0]
+                fields["fwmark"] = "0x%x" % fwmark if fwmark else None
+            elif attr_type == WGDEVICE_A_PEERS:
+                peers = value
+        if name is None:
+            continue
+        device = devices.get(name)
+        if device is None:
+            device = devices[name] = {"public_key": None, "listen_port": None,
+                                      "fwmark": None, "peers": []}
+        device.update(fields)
+        if peers is not None:
+            _peers(peers.tobytes(), device["peers"])
+    return devices
+
+
+def build_interfaces(devices):
+    """Turn parse_messages state into {name: Interface} records."""
+    result = collections.OrderedDict()
+    for name, device in devices.items():
+        peers = tuple(
+            Peer(name, p[0], p[1], p[2], tuple(p[3]), p[4], p[5], p[6], p[7])
+            for p in device["peers"]
+        )
+        result[name] = Interface(name, device["public_key"], device["listen_port"],
+                                 device["fwmark"], peers)
+    return result
+
+
+def parse_replies(data):
+    """Parse a buffer of recorded replies straight into {name: Interface}."""
+    return build_interfaces(parse_messages(data))
+
+
+# ---------------------------
+# Socket client
+# ---------------------------
+def list_wireguard_interfaces(sysfs=SYSFS_NET):
+    """Names of WireGuard links, from the DEVTYPE the module sets in sysfs."""
+    names = []
+    try:
+        entries = sorted(os.listdir(sysfs))
+    except OSError:
+        return names
+    for name in entries:
+        try:
+            with open(os.path.join(sysfs, name, "uevent")) as f:
+                if "DEVTYPE=wireguard\n" in f.read():
+                    names.append(name)
+        except OSError:
+            continue
+    return names
+
+
+class GenlClient:
+    """Minimal generic netlink socket for the wireguard family."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        self.sock.bind((0, 0))
+        self._seq = 0
+        self._buf = bytearray(RECV_BUFSIZE)
+        self.family_id = self._resolve_family(WG_GENL_NAME)
+
+    def close(self):
+        self.sock.close()
+
+    def _request(self, msg_type, flags, cmd, version, attrs):
+        self._seq += 1
+        payload = _GENLMSGHDR.pack(cmd, version, 0) + attrs
+        self.sock.send(_message(msg_type, flags | NLM_F_REQUEST, self._seq, payload))
+        return self._seq
+
+    def _replies(self, seq):
+        """Yield raw reply chunks until DONE, or the ACK/error of seq."""
+        while True:
+            size = self.sock.recv_into(self._buf)
+            chunk = bytes(self._buf[:size])
+            yield chunk
+            last = None
+            for msg_type, flags, payload in iter_messages(chunk):
+                last = msg_type
+                if msg_type == NLMSG_ERROR:
+                    return
+                if msg_type != NLMSG_DONE and not flags & NLM_F_MULTI:
+                    return
+            if last == NLMSG_DONE:
+                return
+
+    def _resolve_family(self, name):
+        seq = self._request(GENL_ID_CTRL, 0, CTRL_CMD_GETFAMILY, 1,
+                            _attr(CTRL_ATTR_FAMILY_NAME, name + b"\0"))
+        for chunk in self._replies(seq):
+            for msg_type, _flags, payload in iter_messages(chunk):
+                if msg_type == NLMSG_ERROR:
+                    error = -_S32.unpack_from(payload)[0]
+                    if error:
+                        raise NetlinkError(error, "wireguard netlink family not available: %s"
+                                           % os.strerror(error))
+                    continue
+                for attr_type, value in iter_attrs(payload[_GENLMSGHDR.size:]):
+                    if attr_type == CTRL_ATTR_FAMILY_ID:
+                        return _U16.unpack_from(value)[0]
+        raise StatusError("wireguard netlink family not available")
+
+    def get_device_raw(self, ifname):
+        """Return the raw reply bytes of WG_CMD_GET_DEVICE for ifname."""
+        seq = self._request(self.family_id, NLM_F_ACK | NLM_F_DUMP, WG_CMD_GET_DEVICE,
+                            WG_GENL_VERSION, _attr(WGDEVICE_A_IFNAME, ifname.encode() + b"\0"))
+        return b"".join(self._replies(seq))
+
+
+class NetlinkBackend:
+    """StatusEngine backend reading device state over generic netlink."""
+
+    name = "netlink"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            try:
+                self._client = GenlClient()
+            except OSError as e:
+                raise NetlinkError(e.errno or 0, "netlink unavailable: %s" % e)
+        return self._client
+
+    def available(self):
+        try:
+            with self._lock:
+                self._get_client()
+            return True
+        except StatusError:
+            return False
+
+    def dump_raw(self):
+        """Raw replies for every WireGuard interface, concatenated."""
+        with self._lock:
+            client = self._get_client()
+            try:
+                replies = []
+                for name in list_wireguard_interfaces():
+                    raw = client.get_device_raw(name)
+                    # Skip a device removed since it was listed
+                    if _error(raw) != errno.ENODEV:
+                        replies.append(raw)
+                return b"".join(replies)
+            except OSError as e:
+                client.close()
+                self._client = None
+                raise NetlinkError(e.errno or 0, "netlink query failed: %s" % e)
+
+    def dump(self):
+        return parse_replies(self.dump_raw())
+
+    def show(self):
+        return format_show(self.dump())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query WireGuard devices over netlink.")
+    parser.add_argument("--record", metavar="FILE",
+                        help="write the raw netlink replies to FILE instead of printing")
+    parser.add_argument("--parse", metavar="FILE",
+                        help="parse previously recorded replies from FILE")
+    args = parser.parse_args()
+
+    if args.parse:
+        with open(args.parse, "rb") as f:
+            sys.stdout.write(format_show(parse_replies(f.read())))
+    elif args.record:
+        data = NetlinkBackend().dump_raw()
+        with open(args.record, "wb") as f:
+            f.write(data)
+        print("recorded %d bytes to %s" % (len(data), args.record))
+    else:
+        sys.stdout.write(NetlinkBackend().show())
@@ -0,0 +1,169 @@
+"""Virtualized peer table.
+
+A ttk.Treeview holds only as many items as fit on screen; scrolling
+rewrites their values from the PeerTableModel instead of moving through
+thousands of Tk items.  Inserting, sorting or filtering 5,000 peers
+therefore costs the same on the Tk side as 50.
+"""
+import time
+from tkinter import ttk
+
+from wireguard_gui.peers import SORT_COLUMNS, PeerTableModel, format_row
+
+COLUMNS = (
+    ("key", "Public key", 260),
+    ("endpoint", "Endpoint", 170),
+    ("allowed", "Allowed IPs", 200),
+    ("handshake", "Handshake", 100),
+    ("rx", "Received", 90),
+    ("tx", "Sent", 90),
+    ("probe", "Probe", 110),
+    ("state", "State", 90),
+)
+ROW_HEIGHT = 22
+HEADING_HEIGHT = 26
+
+
+class PeerTable(ttk.Frame):
+    """Treeview that renders only the visible window of a PeerTableModel."""
+
+    def __init__(self, master, model=None, on_activate=None, style=None, **kwargs):
+        ttk.Frame.__init__(self, master, **kwargs)
+        self.model = model or PeerTableModel()
+        self.on_activate = on_activate
+        self.offset = 0
+        self.selected_key = None
+        self._items = []
+        self._shown = {}
+
+        tree_style = style or "Peers.Treeview"
+        ttk.Style(self).configure(tree_style, rowheight=ROW_HEIGHT)
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in COLUMNS], show="headings",
+                                 selectmode="browse", style=tree_style, height=1)
+        for column, title, width in COLUMNS:
+            sortable = column in SORT_COLUMNS
+            self.tree.heading(column, text=title,
+                              command=(lambda c=column: self.sort_by(c)) if sortable else "")
+            self.tree.column(column, width=width, stretch=column in ("key", "allowed"))
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-len(self._items)))
+        self.tree.bind("<Next>", lambda e: self.scroll(len(self._items)))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Double-1>", self._on_double)
+        self.tree.bind("<Return>", self._on_double)
+        self._update_headings()
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def set_peers(self, config=None, interface=None):
+        self.model.set_peers(config, interface)
+        self.refresh()
+
+    def set_filter(self, text):
+        self.model.set_filter(text)
+        self.offset = 0
+        self.refresh()
+
+    def set_probes(self, probes):
+        self.model.set_probes(probes)
+        self.refresh()
+
+    def sort_by(self, column):
+        self.model.sort_by(column)
+        self._update_headings()
+        self.refresh()
+
+    def scroll(self, rows):
+        self._scroll_to(self.offset + rows)
+        return "break"
+
+    def refresh(self):
+        """Redraw the visible rows from the model."""
+        self._scroll_to(self.offset)
+
+    # ---------------------------
+    # Rendering
+    # ---------------------------
+    def _scroll_to(self, offset):
+        total = len(self.model)
+        rows = len(self._items)
+        self.offset = max(0, min(offset, total - rows))
+        now = time.time()
+        selected = None
+        for index, item in enumerate(self._items):
+            position = self.offset + index
+            if position < total:
+                row = self.model[position]
+                values = format_row(row, now, self.model.probe_of(row))
+                if row.public_key == self.selected_key:
+                    selected = item
+            else:
+                values = ()
+            if self._shown.get(item) != values:
+                self.tree.item(item, values=values)
+                self._shown[item] = values
+        current = self.tree.selection()
+        if selected is None and current:
+            self.tree.selection_set(())
+        elif selected is not None and current != (selected,):
+            self.tree.selection_set(selected)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + rows) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _update_headings(self):
+        for column, title, _ in COLUMNS:
+            if column == self.model.sort_column:
+                title += " ▼" if self.model.descending else " ▲"
+            self.tree.heading(column, text=title)
+
+    def _on_resize(self, event):
+        rows = max(1, (event.height - HEADING_HEIGHT) // ROW_HEIGHT)
+        while len(self._items) < rows:
+            self._items.append(self.tree.insert("", "end", values=()))
+        while len(self._items) > rows:
+            item = self._items.pop()
+            self._shown.pop(item, None)
+            self.tree.delete(item)
+        self.refresh()
+
+    # ---------------------------
+    # Events
+    # ---------------------------
+    def _on_scrollbar(self, action, *args):
+        total = len(self.model)
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * total))
+        elif action == "scroll":
+            count, unit = int(args[0]), args[1]
+            self.scroll(count * (len(self._items) if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _row_for(self, item):
+        if item not in self._items:
+            return None
+        position = self.offset + self._items.index(item)
+        return self.model[position] if position < len(self.model) else None
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        row = self._row_for(selection[0]) if selection else None
+        if row is not None:
+            self.selected_key = row.public_key
+
+    def _on_double(self, event):
+        selection = self.tree.selection()
+        row = self._row_for(selection[0]) if selection else None
+        if row is not None and self.on_activate is not None:
+            self.on_activate(row)
@@ -0,0 +1,186 @@
+"""Peer list model behind the peer table.
+
+Merges the peers of a parsed config with the live status of the running
+interface, keeps them sorted and filtered, and exposes the result as a
+plain list the table windows into.  No Tk here: sorting and filtering
+5,000 peers is pure Python work and independent of what is on screen.
+"""
+import collections
+import ipaddress
+
+from wireguard_gui.probe import format_result
+from wireguard_gui.status import format_age, format_bytes
+
+PeerRow = collections.namedtuple("PeerRow", [
+    "public_key", "endpoint", "allowed_ips", "latest_handshake", "rx_bytes", "tx_bytes",
+    "persistent_keepalive", "configured", "running", "lineno",
+])
+
+# Columns that can be sorted, with the direction used on the first click.
+SORT_COLUMNS = {
+    "key": False,
+    "endpoint": False,
+    "handshake": False,   # youngest handshake first
+    "rx": True,           # busiest first
+    "tx": True,
+}
+
+
+def _endpoint_key(endpoint):
+    """Sort endpoints numerically by address, then port; names after, unset last."""
+    if not endpoint:
+        return (2, 0, 0, "")
+    host, _, port = endpoint.rpartition(":")
+    try:
+        address = ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return (1, 0, 0, endpoint)
+    return (0, address.version, int(address), port.zfill(5))
+
+
+def _handshake_key(row):
+    # Never-handshaken peers sort after all others in either direction.
+    return (not row.latest_handshake, -(row.latest_handshake or 0))
+
+
+class PeerTableModel:
+    """Sorted, filtered view over the peers of one interface."""
+
+    def __init__(self):
+        self.rows = []
+        self.sort_column = "handshake"
+        self.descending = SORT_COLUMNS["handshake"]
+        self.filter_text = ""
+        self.probes = {}       # endpoint -> ProbeResult
+        self.view = []
+        self._sorted = []
+        self._haystack = {}
+        self._endpoint_keys = {}
+
+    def __len__(self):
+        return len(self.view)
+
+    def __getitem__(self, index):
+        return self.view[index]
+
+    # ---------------------------
+    # Data
+    # ---------------------------
+    def set_peers(self, config=None, interface=None):
+        """Rebuild rows from a WgConfig and/or a running status Interface."""
+        rows = collections.OrderedDict()
+        if config is not None:
+            for section in config.peers:
+                key = section.get("PublicKey")
+                if not key:
+                    continue
+                rows[key] = PeerRow(key, section.get("Endpoint"), tuple(section.get_list("AllowedIPs")),
+                                    None, 0, 0, None, True, False, section.lineno)
+        if interface is not None:
+            for peer in interface.peers:
+                row = rows.get(peer.public_key)
+                rows[peer.public_key] = PeerRow(
+                    peer.public_key, peer.endpoint or (row.endpoint if row else None),
+                    tuple(peer.allowed_ips), peer.latest_handshake, peer.rx_bytes, peer.tx_bytes,
+                    peer.persistent_keepalive, row is not None, True, row.lineno if row else None)
+        self.rows = list(rows.values())
+        self._haystack = {}
+        if len(self._endpoint_keys) > 4 * len(self.rows) + 1024:
+            self._endpoint_keys = {}
+        self._resort()
+
+    def set_probes(self, probes):
+        """Remember {endpoint: ProbeResult} from the endpoint prober for the rows."""
+        self.probes = dict(probes)
+
+    def probe_of(self, row):
+        return self.probes.get(row.endpoint) if row.endpoint else None
+
+    def sort_by(self, column, descending=None):
+        """Sort by column; the same column again reverses the order."""
+        if column not in SORT_COLUMNS:
+            raise ValueError("cannot sort by %r" % column)
+        if descending is None:
+            descending = (not self.descending) if column == self.sort_column else SORT_COLUMNS[column]
+        self.sort_column = column
+        self.descending = descending
+        self._resort()
+
+    def set_filter(self, text):
+        """Show only rows containing text; typing more narrows the current view."""
+        text = text.strip().lower()
+        previous = self.filter_text
+        self.filter_text = text
+        if not text:
+            self.view = self._sorted
+        elif previous and text.startswith(previous):
+            self.view = [row for row in self.view if text in self._search_text(row)]
+        else:
+            self.view = [row for row in self._sorted if text in self._search_text(row)]
+
+    def index_of(self, public_key):
+        for index, row in enumerate(self.view):
+            if row.public_key == public_key:
+                return index
+        return None
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _search_text(self, row):
+        text = self._haystack.get(row.public_key)
+        if text is None:
+            text = self._haystack[row.public_key] = " ".join(
+                [row.public_key, row.endpoint or ""] + list(row.allowed_ips)).lower()
+        return text
+
+    def _sort_key(self):
+        column = self.sort_column
+        if column == "handshake":
+            return _handshake_key
+        if column == "endpoint":
+            cache = self._endpoint_keys
+
+            def key(row):
+                value = cache.get(row.endpoint)
+                if value is None:
+                    value = cache[row.endpoint] = _endpoint_key(row.endpoint)
+                return value
+            return key
+        if column == "rx":
+            return lambda row: row.rx_bytes
+        if column == "tx":
+            return lambda row: row.tx_bytes
+        return lambda row: row.public_key
+
+    def _resort(self):
+        self._sorted = sorted(self.rows, key=self._sort_key(), reverse=self.descending)
+        if self.sort_column == "handshake" and self.descending:
+            # Keep never-handshaken peers at the end when reversed, too.
+            split = next((i for i, row in enumerate(self._sorted) if row.latest_handshake), len(self._sorted))
+            self._sorted = self._sorted[split:] + self._sorted[:split]
+        text, self.filter_text = self.filter_text, ""
+        self.set_filter(text)
+
+
+def format_row(row, now=None, probe=None):
+    """Display values for a PeerRow, in PeerTable column order.
+
+    probe is the row's endpoint ProbeResult, if it has been probed.
+    """
+    if row.running and row.configured:
+        state = "up"
+    elif row.running:
+        state = "not in config"
+    else:
+        state = "config only"
+    return (
+        row.public_key,
+        row.endpoint or "",
+        ", ".join(row.allowed_ips),
+        format_age(row.latest_handshake, now) if row.running else "",
+        format_bytes(row.rx_bytes) if row.running else "",
+        format_bytes(row.tx_bytes) if row.running else "",
+        format_result(probe),
+        state,
+    )
@@ -0,0 +1,285 @@
+"""Searchable interface picker.
+
+An entry showing the selected interface; typing in it (or the ▾ button)
+opens a popup of InterfaceIndex results ranked for the text so far.  As
+with PeerTable, the popup's listbox holds only the rows that fit on
+screen and scrolling rewrites them from the result list, so a search
+over thousands of configs never creates thousands of Tk items; the list
+holds the best LIMIT results.
+
+The selection goes to a StringVar, the same one the combobox used to
+drive, so everything tracing it keeps working.
+"""
+import time
+import tkinter as tk
+
+from wireguard_gui.search import InterfaceIndex
+from wireguard_gui.status import format_age
+from wireguard_gui.timing import TIMINGS
+
+ROWS = 12
+LIMIT = 500  # best results kept; typing narrows them further
+DEFAULT_COLORS = {
+    "surface_light": "#262c36",
+    "fg": "#e6edf3",
+    "fg_muted": "#7d8590",
+    "accent": "#58a6ff",
+    "success": "#3fb950",
+    "border": "#30363d",
+}
+
+
+def format_result(result, now):
+    mark = "●" if result.connected else "○"
+    text = "%s %s" % (mark, result.entry)
+    if result.last_used:
+        text += "   · used %s" % format_age(result.last_used, now)
+    return text
+
+
+class InterfacePicker(tk.Frame):
+    """Entry plus a popup of ranked, virtualized search results."""
+
+    def __init__(self, master, variable, connected=None, last_used=None, colors=None,
+                 width=35, font=("Segoe UI", 10), **kwargs):
+        self.colors = dict(DEFAULT_COLORS, **(colors or {}))
+        kwargs.setdefault("bg", master.cget("bg"))
+        tk.Frame.__init__(self, master, **kwargs)
+        self.variable = variable
+        self.index = InterfaceIndex()
+        # Callables: set of running interface names, {entry: unix time}
+        self.connected = connected or set
+        self.last_used = last_used or dict
+        self.results = []
+        self.offset = 0
+        self.active = 0
+        self.popup = None
+        self.listbox = None
+        self.scrollbar = None
+        self._editing = False
+
+        self.query_var = tk.StringVar(value=variable.get())
+        self.entry = tk.Entry(
+            self,
+            textvariable=self.query_var,
+            width=width,
+            font=font,
+            bg=self.colors["surface_light"],
+            fg=self.colors["fg"],
+            insertbackground=self.colors["accent"],
+            relief="flat"
+        )
+        self.entry.pack(side="left", fill="x", expand=True, ipady=3)
+        self.button = tk.Button(
+            self,
+            text="▾",
+            command=self.toggle,
+            bg=self.colors["surface_light"],
+            fg=self.colors["fg"],
+            activebackground=self.colors["border"],
+            relief="flat",
+            takefocus=False
+        )
+        self.button.pack(side="left", fill="y")
+
+        self.query_var.trace_add("write", self._on_query)
+        self._variable_trace = variable.trace_add("write", self._on_variable)
+        self.entry.bind("<Key>", self._on_key)
+        self.entry.bind("<Down>", lambda e: self._move(1))
+        self.entry.bind("<Up>", lambda e: self._move(-1))
+        self.entry.bind("<Next>", lambda e: self._move(ROWS))
+        self.entry.bind("<Prior>", lambda e: self._move(-ROWS))
+        self.entry.bind("<Return>", self._on_return)
+        self.entry.bind("<KP_Enter>", self._on_return)
+        self.entry.bind("<Escape>", lambda e: self.cancel())
+        self.entry.bind("<FocusIn>", lambda e: self.entry.select_range(0, "end"))
+        self.entry.bind("<FocusOut>", self._on_focus_out)
+        self.bind("<Destroy>", self._on_destroy)
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def set_entries(self, entries):
+        """Replace the choices (interface names and config paths)."""
+        self.index.set_entries(entries)
+        if self.popup is not None:
+            self.search()
+
+    @TIMINGS.timed("ui interface search")
+    def search(self):
+        query = self.query_var.get() if self._editing else ""
+        self.results = self.index.search(query, self.connected(), self.last_used(), limit=LIMIT)
+        self.offset = 0
+        self.active = 0
+        self._render()
+
+    def open(self):
+        if self.popup is None:
+            self._build_popup()
+        self.search()
+
+    def close(self):
+        if self.popup is not None:
+            self.popup.destroy()
+            self.popup = self.listbox = self.scrollbar = None
+
+    def toggle(self):
+        if self.popup is not None:
+            self.cancel()
+            return
+        self.entry.focus_set()
+        self._editing = False
+        self.open()
+
+    def choose(self, entry):
+        self._editing = False
+        self.close()
+        if entry != self.variable.get():
+            self.variable.set(entry)
+        else:
+            self._show_selection()
+
+    def cancel(self):
+        self._editing = False
+        self.close()
+        self._show_selection()
+
+    # ---------------------------
+    # Rendering
+    # ---------------------------
+    def _build_popup(self):
+        popup = tk.Toplevel(self)
+        popup.overrideredirect(True)
+        popup.transient(self.winfo_toplevel())
+        frame = tk.Frame(popup, bg=self.colors["border"], bd=1)
+        frame.pack(fill="both", expand=True)
+        self.listbox = tk.Listbox(
+            frame,
+            height=ROWS,
+            font=self.entry.cget("font"),
+            bg=self.colors["surface_light"],
+            fg=self.colors["fg"],
+            selectbackground=self.colors["accent"],
+            relief="flat",
+            activestyle="none",
+            exportselection=False,
+            takefocus=False
+        )
+        self.scrollbar = tk.Scrollbar(frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.listbox.insert("end", *[""] * ROWS)
+        self.listbox.bind("<ButtonRelease-1>", self._on_click)
+        self.listbox.bind("<MouseWheel>", lambda e: self._scroll(-3 if e.delta > 0 else 3))
+        self.listbox.bind("<Button-4>", lambda e: self._scroll(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll(3))
+        self.popup = popup
+        self.update_idletasks()
+        popup.geometry("%dx%d+%d+%d" % (
+            max(self.winfo_width(), 420), popup.winfo_reqheight(),
+            self.winfo_rootx(), self.winfo_rooty() + self.winfo_height()))
+
+    def _render(self):
+        if self.listbox is None:
+            return
+        total = len(self.results)
+        self.offset = max(0, min(self.offset, total - ROWS))
+        now = time.time()
+        for row in range(ROWS):
+            position = self.offset + row
+            text = format_result(self.results[position], now) if position < total else ""
+            if self.listbox.get(row) != text:
+                self.listbox.delete(row)
+                self.listbox.insert(row, text)
+            if position < total:
+                connected = self.results[position].connected
+                self.listbox.itemconfig(row, fg=self.colors["success" if connected else "fg"])
+        self.listbox.selection_clear(0, "end")
+        if total:
+            self.listbox.selection_set(self.active - self.offset)
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + ROWS) / total))
+        else:
+            self.listbox.delete(0)
+            self.listbox.insert(0, "no matching interface")
+            self.listbox.itemconfig(0, fg=self.colors["fg_muted"])
+            self.scrollbar.set(0, 1)
+
+    def _scroll(self, rows):
+        self.offset += rows
+        self.offset = max(0, min(self.offset, len(self.results) - ROWS))
+        self.active = min(max(self.active, self.offset), self.offset + ROWS - 1)
+        self._render()
+        return "break"
+
+    def _move(self, rows):
+        if self.popup is None:
+            self.open()
+            return "break"
+        if not self.results:
+            return "break"
+        self.active = max(0, min(self.active + rows, len(self.results) - 1))
+        if self.active < self.offset:
+            self.offset = self.active
+        elif self.active >= self.offset + ROWS:
+            self.offset = self.active - ROWS + 1
+        self._render()
+        return "break"
+
+    def _show_selection(self):
+        self.query_var.set(self.variable.get())
+        self.entry.icursor("end")
+
+    # ---------------------------
+    # Events
+    # ---------------------------
+    def _on_query(self, *args):
+        if self._editing:
+            self.open()
+
+    def _on_variable(self, *args):
+        if not self._editing:
+            self._show_selection()
+
+    def _on_return(self, event):
+        if self.popup is not None and self.results:
+            self.choose(self.results[self.active].entry)
+        else:
+            self.cancel()
+        return "break"
+
+    def _on_click(self, event):
+        position = self.offset + self.listbox.nearest(event.y)
+        if position < len(self.results):
+            self.choose(self.results[position].entry)
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self._scroll(int(float(args[0]) * len(self.results)) - self.offset)
+        elif action == "scroll":
+            count, unit = int(args[0]), args[1]
+            self._scroll(count * (ROWS if unit == "pages" else 1))
+
+    def _on_focus_out(self, event):
+        # Clicks in the popup take the focus first; let them land.
+        self.after(150, self._close_if_unfocused)
+
+    def _close_if_unfocused(self):
+        try:
+            focus = self.focus_get()
+        except (KeyError, tk.TclError):
+            focus = None
+        if self.popup is None or focus is self.entry:
+            return
+        if focus is not None and str(focus).startswith(str(self.popup)):
+            self.entry.focus_set()
+            return
+        self.cancel()
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.variable.trace_remove("write", self._variable_trace)
+
+    def _on_key(self, event):
+        # Anything typed switches from showing the selection to searching.
+        if (event.char and event.char.isprintable()) or event.keysym in ("BackSpace", "Delete"):
+            self._editing = True
@@ -0,0 +1,183 @@
+"""Path-compressed binary prefix trie over IPv4 and IPv6 networks.
+
+Networks are Prefix tuples (version, network address as an int, prefix
+length); parse_prefix reads them from CIDR text with inet_pton, which is
+an order of magnitude cheaper than building ipaddress objects for every
+AllowedIPs entry of a large hub config.
+
+Each inserted prefix is a node carrying a list of values (a network can
+be inserted more than once, e.g. the same AllowedIPs on two peers).
+Nodes only exist where a prefix ends or two branches split, so the depth
+stays near log2(n) instead of 32/128 and inserting or looking up 10,000
+networks is a few hundred thousand steps in all.
+
+    trie = PrefixTrie()
+    trie.insert(parse_prefix("10.0.0.0/8"), "office")
+    trie.lookup(parse_prefix("10.1.2.3"))   # (Prefix 10.0.0.0/8, ['office'])
+
+``items`` walks every prefix together with the nearest prefix that
+contains it, which is what overlap checks need.
+"""
+import collections
+import ipaddress
+import socket
+
+BITS = {4: 32, 6: 128}
+_FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+
+class Prefix(collections.namedtuple("Prefix", ["version", "key", "length"])):
+    """A network: IP version, network address as an int and prefix length."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        address = ipaddress.IPv4Address(self.key) if self.version == 4 else ipaddress.IPv6Address(self.key)
+        return "%s/%d" % (address, self.length)
+
+    @classmethod
+    def from_network(cls, network):
+        return cls(network.version, int(network.network_address), network.prefixlen)
+
+
+def parse_prefix(text, strict=True):
+    """Prefix of CIDR text ("10.0.0.0/24", "fd00::1", ...); raises ValueError.
+
+    Like ipaddress.ip_network, host bits are an error unless strict is
+    false, in which case they are masked off.
+    """
+    address, sep, length = text.strip().partition("/")
+    version = 6 if ":" in address else 4
+    bits = BITS[version]
+    try:
+        key = int.from_bytes(socket.inet_pton(_FAMILIES[version], address), "big")
+    except OSError:
+        raise ValueError("%r is not an IP address" % address)
+    if not sep:
+        length = bits
+    elif length.isdigit() and int(length) <= bits:
+        length = int(length)
+    else:
+        raise ValueError("%r is not a valid prefix length" % length)
+    network = key >> (bits - length) << (bits - length)
+    if strict and network != key:
+        raise ValueError("%s has host bits set" % text.strip())
+    return Prefix(version, network, length)
+
+
+class _Node:
+    __slots__ = ("key", "length", "children", "prefix", "values")
+
+    def __init__(self, key, length):
+        self.key = key
+        self.length = length
+        self.children = [None, None]
+        self.prefix = None
+        self.values = []
+
+
+class PrefixTrie:
+    """Prefixes of both IP versions with longest-prefix-match lookups."""
+
+    def __init__(self):
+        self._roots = {version: _Node(0, 0) for version in BITS}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def insert(self, prefix, value):
+        """Add value under prefix; returns the list of the prefix's values."""
+        version, key, length = prefix
+        bits = BITS[version]
+        node = self._roots[version]
+        while node.length != length:
+            bit = (key >> (bits - 1 - node.length)) & 1
+            child = node.children[bit]
+            if child is None:
+                child = node.children[bit] = _Node(key, length)
+                node = child
+                break
+            common = bits - (key ^ child.key).bit_length()
+            if common >= child.length and length >= child.length:
+                node = child
+                continue
+            common = min(common, length)
+            # Split: a branch node where the new prefix and the child part ways.
+            middle = _Node(key >> (bits - common) << (bits - common), common)
+            middle.children[(child.key >> (bits - 1 - common)) & 1] = child
+            node.children[bit] = middle
+            node = middle
+        if node.prefix is None:
+            node.prefix = prefix
+        node.values.append(value)
+        self._count += 1
+        return node.values
+
+    def _find(self, prefix):
+        version, key, length = prefix
+        bits = BITS[version]
+        node = self._roots[version]
+        while node is not None:
+            if node.length > length or (node.length and (key ^ node.key) >> (bits - node.length)):
+                return None
+            if node.length == length:
+                return node
+            node = node.children[(key >> (bits - 1 - node.length)) & 1]
+        return None
+
+    def get(self, prefix):
+        """Values inserted under exactly this prefix."""
+        node = self._find(prefix)
+        return list(node.values) if node is not None else []
+
+    def remove(self, prefix, value):
+        """Remove one occurrence of value under prefix; returns whether it was there.
+
+        Emptied nodes stay as branch nodes; they cost a step on lookups
+        through them and nothing else.
+        """
+        node = self._find(prefix)
+        if node is None or value not in node.values:
+            return False
+        node.values.remove(value)
+        if not node.values:
+            node.prefix = None
+        self._count -= 1
+        return True
+
+    def lookup(self, address):
+        """(prefix, values) of the longest prefix containing address, or None.
+
+        address is a Prefix too (a host address is a full-length prefix).
+        """
+        version, key, _ = address
+        bits = BITS[version]
+        node = self._roots[version]
+        best = None
+        while node is not None:
+            if node.length and (key ^ node.key) >> (bits - node.length):
+                break
+            if node.values:
+                best = node
+            if node.length == bits:
+                break
+            node = node.children[(key >> (bits - 1 - node.length)) & 1]
+        return (best.prefix, list(best.values)) if best is not None else None
+
+    def items(self):
+        """Yield (prefix, values, covering) in address order, IPv4 first.
+
+        covering is the (prefix, values) of the nearest shorter prefix
+        containing this one, or None.
+        """
+        for version in sorted(BITS):
+            stack = [(self._roots[version], None)]
+            while stack:
+                node, covering = stack.pop()
+                if node.values:
+                    yield node.prefix, list(node.values), covering
+                    covering = (node.prefix, node.values)
+                for child in reversed(node.children):
+                    if child is not None:
+                        stack.append((child, covering))
@@ -0,0 +1,227 @@
+"""Endpoint reachability prober.
+
+``probe(endpoints)`` sends a UDP datagram to every peer Endpoint at once
+(at most ``concurrency`` in flight, each with its own timeout) on one
+asyncio loop, and returns a ProbeResult per endpoint:
+
+    reply        something answered; rtt is the round trip
+    refused      the host answered with ICMP port unreachable (it is up,
+                 nothing listens on the port); rtt is the round trip
+    no reply     nothing came back within the timeout
+    unresolved   the host name does not resolve
+    error        the datagram could not be sent (no route, bad address)
+
+A WireGuard endpoint drops anything that is not an authenticated
+handshake, so a healthy one usually shows "no reply", and only the
+handshake age of a running peer proves it is reachable.  The probe is
+for the other cases: a refused port, an unresolvable name or an
+unroutable address point at the endpoint and not at the tunnel.  A UDP
+echo on 127.0.0.1 stands in for a responsive endpoint in tests.
+
+Host names go through RESOLVER, which caches answers (and failures,
+shorter) so probing hundreds of peers of the same hub resolves its name
+once.
+"""
+import asyncio
+import collections
+import ipaddress
+import socket
+import threading
+import time
+
+from wireguard_gui.timing import TIMINGS
+
+REPLY = "reply"
+REFUSED = "refused"
+SILENT = "no reply"
+UNRESOLVED = "unresolved"
+ERROR = "error"
+
+CONCURRENCY = 64
+TIMEOUT = 1.0
+ATTEMPTS = 2
+PAYLOAD = b"wireguard-gui probe\n"
+RESOLVE_TTL = 300.0
+NEGATIVE_TTL = 30.0
+
+ProbeResult = collections.namedtuple("ProbeResult", ["endpoint", "address", "state", "rtt", "error", "probed_at"])
+
+
+def parse_endpoint(endpoint):
+    """(host, port) of "host:port" or "[v6 address]:port"; raises ValueError."""
+    host, sep, port = endpoint.strip().rpartition(":")
+    if not sep or not host or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError("%r is not host:port" % endpoint)
+    if host.startswith("[") and host.endswith("]"):
+        host = host[1:-1]
+    elif ":" in host:
+        raise ValueError("%r: IPv6 addresses need brackets" % endpoint)
+    return host, int(port)
+
+
+def endpoints_of(configs):
+    """Distinct peer Endpoints of {path: WgConfig}, in config order."""
+    endpoints = collections.OrderedDict()
+    for config in configs.values():
+        for peer in config.peers:
+            endpoint = peer.get("Endpoint")
+            if endpoint:
+                endpoints[endpoint] = None
+    return list(endpoints)
+
+
+class Resolver:
+    """getaddrinfo with a TTL cache shared by all probe runs."""
+
+    def __init__(self, ttl=RESOLVE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}   # (host, port) -> (expires, (family, (address, port)) or error text)
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def cached(self, host, port):
+        with self._lock:
+            entry = self._cache.get((host, port))
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def _store(self, host, port, value, ttl):
+        with self._lock:
+            self._cache[(host, port)] = (time.monotonic() + ttl, value)
+
+    async def resolve(self, host, port, pending=None):
+        """(family, (address, port)) for host, or an error text.
+
+        pending is a dict shared by one run, so concurrent lookups of the
+        same name wait for a single getaddrinfo.
+        """
+        try:
+            address = ipaddress.ip_address(host.split("%")[0])
+        except ValueError:
+            pass
+        else:
+            return (socket.AF_INET6 if address.version == 6 else socket.AF_INET), (host, port)
+        found = self.cached(host, port)
+        if found is not None:
+            return found
+        if pending is not None and (host, port) in pending:
+            return await asyncio.shield(pending[(host, port)])
+        lookup = asyncio.ensure_future(self._lookup(host, port))
+        if pending is not None:
+            pending[(host, port)] = lookup
+        return await lookup
+
+    async def _lookup(self, host, port):
+        with self._lock:
+            self.misses += 1
+        loop = asyncio.get_running_loop()
+        try:
+            with TIMINGS.timer("probe resolve"):
+                infos = await loop.getaddrinfo(host, port, type=socket.SOCK_DGRAM)
+        except (socket.gaierror, UnicodeError) as e:
+            error = str(e)
+            self._store(host, port, error, self.negative_ttl)
+            return error
+        family, _, _, _, sockaddr = infos[0]
+        found = (family, sockaddr[:2])
+        self._store(host, port, found, self.ttl)
+        return found
+
+
+RESOLVER = Resolver()
+
+
+class _Probe(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.answer = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        if not self.answer.done():
+            self.answer.set_result(REPLY)
+
+    def error_received(self, exc):
+        if not self.answer.done():
+            self.answer.set_result(REFUSED if isinstance(exc, ConnectionRefusedError) else exc)
+
+
+async def _send(family, sockaddr, timeout, payload):
+    """(state, rtt, error) of one datagram to sockaddr."""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(_Probe, remote_addr=sockaddr, family=family)
+    try:
+        started = time.perf_counter()
+        transport.sendto(payload)
+        try:
+            answer = await asyncio.wait_for(asyncio.shield(protocol.answer), timeout)
+        except asyncio.TimeoutError:
+            return SILENT, None, None
+        rtt = time.perf_counter() - started
+        if isinstance(answer, Exception):
+            return ERROR, None, str(answer)
+        return answer, rtt, None
+    finally:
+        transport.close()
+
+
+async def probe_endpoint(endpoint, resolver=RESOLVER, timeout=TIMEOUT, attempts=ATTEMPTS,
+                         payload=PAYLOAD, pending=None):
+    """ProbeResult for one endpoint; a datagram lost on the way is retried."""
+    try:
+        host, port = parse_endpoint(endpoint)
+    except ValueError as e:
+        return ProbeResult(endpoint, None, ERROR, None, str(e), time.time())
+    resolved = await resolver.resolve(host, port, pending)
+    if isinstance(resolved, str):
+        return ProbeResult(endpoint, None, UNRESOLVED, None, resolved, time.time())
+    family, sockaddr = resolved
+    address = sockaddr[0]
+    state, rtt, error = SILENT, None, None
+    for _ in range(max(1, attempts)):
+        try:
+            state, rtt, error = await _send(family, sockaddr, timeout, payload)
+        except OSError as e:
+            state, rtt, error = ERROR, None, e.strerror or str(e)
+        if state != SILENT:
+            break
+    if rtt is not None:
+        TIMINGS.record("probe rtt", rtt)
+    return ProbeResult(endpoint, address, state, rtt, error, time.time())
+
+
+async def probe_all(endpoints, concurrency=CONCURRENCY, resolver=RESOLVER, **kwargs):
+    """{endpoint: ProbeResult}, probing at most concurrency endpoints at once."""
+    endpoints = list(collections.OrderedDict.fromkeys(endpoints))
+    limit = asyncio.Semaphore(max(1, concurrency))
+    pending = {}
+
+    async def bounded(endpoint):
+        async with limit:
+            return await probe_endpoint(endpoint, resolver, pending=pending, **kwargs)
+
+    results = await asyncio.gather(*[bounded(endpoint) for endpoint in endpoints])
+    return collections.OrderedDict(zip(endpoints, results))
+
+
+@TIMINGS.timed("probe run")
+def probe(endpoints, concurrency=CONCURRENCY, resolver=RESOLVER, **kwargs):
+    """Blocking probe_all on a fresh event loop; run it in a worker thread."""
+    return asyncio.run(probe_all(endpoints, concurrency, resolver, **kwargs))
+
+
+def format_result(result):
+    """'0.4 ms', 'refused 1.2 ms', 'no reply', ... for a table cell."""
+    if result is None:
+        return ""
+    if result.state == REPLY:
+        return "%.1f ms" % (result.rtt * 1000)
+    if result.state == REFUSED:
+        return "refused %.1f ms" % (result.rtt * 1000)
+    return result.state
@@ -0,0 +1,157 @@
+"""Which peer carries an address: longest-prefix match over AllowedIPs.
+
+RouteIndex compiles the AllowedIPs of running interfaces (from a
+StatusSnapshot) and of known configs into two PrefixTries and answers
+lookups against both: ``running`` is where traffic goes now, across all
+interfaces, the way the routes wg-quick installs resolve it;
+``configured`` is where it would go by the config files, which also
+covers tunnels that are down.
+
+Syncing is incremental.  Every interface and config is a source with a
+signature (the peers' keys and AllowedIPs for status, the stamp the
+config cache sets on every parse of a file for configs); a source whose
+signature is unchanged costs one comparison, and a changed one only
+inserts and removes the networks that differ.  A lookup is a parse with
+inet_pton and a walk of at most a few dozen trie nodes.
+
+``resolve`` takes any text (a pasted list, a log file) and looks up every
+distinct IPv4 and IPv6 address in it, including IPv4-mapped ones
+(::ffff:10.0.0.1, looked up as the IPv4 address they carry); networks (10.0.0.0/8, 2001:db8::/32) are skipped.
+Syncs and lookups hold a lock, so a worker can resolve a large file
+while the Tk thread keeps syncing.
+"""
+import collections
+import re
+import threading
+
+from wireguard_gui.prefixes import Prefix, PrefixTrie, parse_prefix
+
+RUNNING = "running"
+CONFIGURED = "config"
+
+Route = collections.namedtuple("Route", ["interface", "public_key", "network", "source", "path", "lineno"])
+
+Match = collections.namedtuple("Match", ["address", "running", "configured"])
+
+# Candidates only; inet_pton decides what really is an address (so times
+# like 12:34:56 and MAC addresses drop out).
+ADDRESS_RE = re.compile(
+    r"(?<![\w.])(?:\d{1,3}\.){3}\d{1,3}(?!\w|\.\d|/)"                 # IPv4, also 1.2.3.4:51820
+    r"|(?<![\w.:])[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){1,6}"
+    r":(?:\d{1,3}\.){3}\d{1,3}(?!\w|\.\d|/)"                              # IPv4-mapped, ::ffff:10.0.0.1
+    r"|(?<![\w.:])[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){2,7}(?![\w:./])"  # IPv6, also [fd00::1]:51820
+)
+
+
+def _interface_entries(interface):
+    entries = []
+    for peer in interface.peers:
+        for item in peer.allowed_ips:
+            try:
+                prefix = parse_prefix(item, strict=False)
+            except ValueError:
+                continue
+            entries.append((prefix, Route(interface.name, peer.public_key, str(prefix), RUNNING, None, None)))
+    return entries
+
+
+def _config_entries(path, config):
+    entries = []
+    name = config.name or path
+    for peer in config.peers:
+        key = peer.get("PublicKey")
+        for item in peer.get_list("AllowedIPs"):
+            try:
+                prefix = parse_prefix(item, strict=False)
+            except ValueError:
+                continue
+            entries.append((prefix, Route(name, key, str(prefix), CONFIGURED, path, peer.lineno)))
+    return entries
+
+
+class RouteIndex:
+    """AllowedIPs of running interfaces and configs, for longest-prefix lookups."""
+
+    def __init__(self):
+        self.running = PrefixTrie()
+        self.configured = PrefixTrie()
+        self.snapshot = None
+        self._sources = {}
+        self.rebuilt = 0
+        self._lock = threading.Lock()
+
+    def _update(self, trie, source, signature, entries):
+        """Make source contribute entries() to trie; no-op when signature is unchanged."""
+        old = self._sources.get(source)
+        if old is not None and old[0] == signature:
+            return False
+        before = old[1] if old is not None else collections.Counter()
+        after = collections.Counter(entries())
+        for (prefix, route), count in (before - after).items():
+            for _ in range(count):
+                trie.remove(prefix, route)
+        for (prefix, route), count in (after - before).items():
+            for _ in range(count):
+                trie.insert(prefix, route)
+        self._sources[source] = (signature, after)
+        self.rebuilt += 1
+        return True
+
+    def _drop(self, trie, kind, keep):
+        for source in [s for s in self._sources if s[0] == kind and s[1] not in keep]:
+            for (prefix, route), count in self._sources.pop(source)[1].items():
+                for _ in range(count):
+                    trie.remove(prefix, route)
+
+    def sync_status(self, snapshot):
+        """Follow the running interfaces of a StatusSnapshot (failed snapshots are ignored)."""
+        if snapshot is self.snapshot or not snapshot.ok:
+            return
+        with self._lock:
+            self.snapshot = snapshot
+            for name, interface in snapshot.interfaces.items():
+                signature = tuple((peer.public_key, peer.allowed_ips) for peer in interface.peers)
+                self._update(self.running, (RUNNING, name), signature,
+                             lambda: _interface_entries(interface))
+            self._drop(self.running, RUNNING, snapshot.interfaces)
+
+    def sync_configs(self, configs):
+        """Follow {path: WgConfig}; paths missing from configs are dropped."""
+        with self._lock:
+            for path, config in configs.items():
+                signature = config.stamp if config.stamp is not None else config
+                self._update(self.configured, (CONFIGURED, path), signature,
+                             lambda: _config_entries(path, config))
+            self._drop(self.configured, CONFIGURED, configs)
+
+    def lookup(self, address):
+        """Match for one address (text); raises ValueError for anything but an address."""
+        if "/" in address:
+            raise ValueError("%r is a network, not an address" % address)
+        prefix = parse_prefix(address)
+        if prefix.version == 6 and prefix.key >> 32 == 0xffff:
+            prefix = Prefix(4, prefix.key & 0xffffffff, 32)
+        with self._lock:
+            return Match(str(address).strip(), self.running.lookup(prefix), self.configured.lookup(prefix))
+
+    def resolve(self, text):
+        """[(address, occurrences, Match)] for every distinct address in text, first seen first."""
+        counts = collections.Counter()
+        for candidate in ADDRESS_RE.findall(text):
+            counts[candidate] += 1
+        results = []
+        for address, count in counts.items():
+            try:
+                results.append((address, count, self.lookup(address)))
+            except ValueError:
+                continue
+        return results
+
+
+def describe(found):
+    """'wg0 peer abcd…= via 10.0.0.0/24' for a (prefix, routes) lookup result, or '-'."""
+    if not found:
+        return "-"
+    prefix, routes = found
+    return ", ".join("%s peer %s via %s" % (route.interface, (route.public_key or "?")[:8] + "…", prefix)
+                     for route in routes)
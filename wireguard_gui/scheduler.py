@@ -0,0 +1,83 @@
+"""Coalescing refresh scheduling.
+
+Status refresh requests arrive from many places (every keystroke in the
+interface box, startup, reloads, finished commands).  RefreshScheduler
+debounces them with ``after`` and runs at most one status query at a time
+in the background; requests that arrive while a query is in flight are
+folded into a single follow-up query, as soon as the most urgent of them
+asked for.  Queries run on a worker of their own, so a bulk operation
+filling the command pool never holds up the status.
+"""
+import time
+
+from wireguard_gui.jobs import JobRunner
+from wireguard_gui.timing import TIMINGS
+
+DEFAULT_DELAY_MS = 250
+
+
+class RefreshScheduler:
+    """Debounce and coalesce StatusEngine refreshes.
+
+    ``root`` only needs ``after``/``after_cancel`` (a Tk widget).  Queries
+    run on a one-worker JobRunner whose callbacks go to ``runner``'s event
+    queue, so they are delivered by the GUI's usual process_events.
+    """
+
+    def __init__(self, root, engine, runner, delay_ms=DEFAULT_DELAY_MS):
+        self.root = root
+        self.engine = engine
+        self.runner = JobRunner(max_workers=1, events=runner.events)
+        self.delay_ms = delay_ms
+        self.requested = 0
+        self.queries = 0
+        self._after_id = None
+        self._in_flight = False
+        self._again = None  # shortest delay asked for while a query was in flight
+        self._fired_at = None
+
+    @property
+    def busy(self):
+        return self._in_flight or self._after_id is not None
+
+    def request(self, delay_ms=None):
+        """Ask for a refresh delay_ms from now.
+
+        Every request restarts the debounce window, so a burst of requests
+        (typing) collapses into one query after the burst ends.
+        """
+        self.requested += 1
+        delay = self.delay_ms if delay_ms is None else delay_ms
+        if self._in_flight:
+            self._again = delay if self._again is None else min(self._again, delay)
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(delay, self._fire)
+
+    def cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._again = None
+
+    def close(self):
+        self.cancel()
+        self.runner.shutdown()
+
+    def _fire(self):
+        self._after_id = None
+        self._in_flight = True
+        self._fired_at = time.perf_counter()
+        self.queries += 1
+        self.runner.call(self.engine.query, on_done=self._done, label="status refresh")
+
+    def _done(self, job):
+        self._in_flight = False
+        if job.result is not None:
+            self.engine.publish(job.result)
+        # Query in the pool, hand-off to the Tk thread and publishing
+        TIMINGS.record("update_status", time.perf_counter() - self._fired_at)
+        if self._again is not None:
+            delay, self._again = self._again, None
+            self.request(delay)
@@ -0,0 +1,231 @@
+"""Ranked fuzzy search over interface names and config paths.
+
+InterfaceIndex keeps a trigram index (every 3-character slice of the
+lower-cased entry -> entry ids), so a query only looks at entries that
+share trigrams with it instead of scanning thousands of names.  An entry
+matches a term when it contains the term: the entries holding all of the
+term's trigrams, checked by substring.  Only when fewer than FUZZY_BELOW
+entries contain it are typos looked for too, as entries sharing at least
+half of the term's trigrams.  Terms shorter than three characters are
+matched by substring.
+
+Ranking, best first: exact name, name prefix, prefix of a word in the
+name (after - _ . or /), substring of the name, substring of the path,
+then trigram similarity; all terms of the query must match and their
+scores add up.  Between equally good matches connected interfaces and
+recently used ones come first, so with an empty query they lead and the
+rest follows alphabetically; the bonus never lifts a worse match above a
+better one.  ``limit`` keeps only the best results, so a one-letter query
+over thousands of entries does not sort all of them.
+
+``is:up``, ``is:down``, ``is:recent`` and ``is:custom`` in a query filter
+by those tags.
+"""
+import collections
+import heapq
+import math
+import time
+
+from wireguard_gui.status import interface_name
+
+CONNECTED_BONUS = 30
+FUZZY_BELOW = 20
+RECENT_BONUSES = ((86400, 20), (7 * 86400, 10), (None, 5))  # used within: bonus
+TAGS = ("up", "down", "recent", "custom")
+
+Result = collections.namedtuple("Result", ["entry", "score", "connected", "last_used"])
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _recent_bonus(last_used, now):
+    if not last_used:
+        return 0
+    for within, bonus in RECENT_BONUSES:
+        if within is None or now - last_used <= within:
+            return bonus
+    return 0
+
+
+def _term_score(term, name, hay, similarity):
+    if name == term:
+        return 100
+    if name.startswith(term):
+        return 80
+    position = name.find(term)
+    if position > 0 and name[position - 1] in "-_./":
+        return 60
+    if position >= 0:
+        return 40
+    if term in hay:
+        return 25
+    return 20 * similarity
+
+
+class InterfaceIndex:
+    """Dropdown entries (interface names or config paths) with a trigram index."""
+
+    def __init__(self, entries=()):
+        self._entries = {}     # id -> entry
+        self._ids = {}         # entry -> id
+        self._interfaces = {}  # id -> interface name
+        self._names = {}       # id -> lower-cased interface name
+        self._hay = {}         # id -> lower-cased entry
+        self._postings = collections.defaultdict(set)
+        self._by_interface = collections.defaultdict(set)  # interface name -> ids
+        self._sorted = None    # ids by entry, for empty queries; rebuilt after changes
+        self._next = 0
+        self.set_entries(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry):
+        return entry in self._ids
+
+    def add(self, entry):
+        if entry in self._ids:
+            return
+        entry_id = self._next
+        self._next += 1
+        hay = entry.lower()
+        self._entries[entry_id] = entry
+        self._ids[entry] = entry_id
+        self._interfaces[entry_id] = interface_name(entry)
+        self._names[entry_id] = self._interfaces[entry_id].lower()
+        self._hay[entry_id] = hay
+        self._by_interface[self._interfaces[entry_id]].add(entry_id)
+        self._sorted = None
+        for trigram in trigrams(hay):
+            self._postings[trigram].add(entry_id)
+
+    def remove(self, entry):
+        entry_id = self._ids.pop(entry, None)
+        if entry_id is None:
+            return
+        ids = self._by_interface[self._interfaces[entry_id]]
+        ids.discard(entry_id)
+        if not ids:
+            del self._by_interface[self._interfaces[entry_id]]
+        del self._entries[entry_id], self._interfaces[entry_id], self._names[entry_id]
+        self._sorted = None
+        for trigram in trigrams(self._hay.pop(entry_id)):
+            postings = self._postings[trigram]
+            postings.discard(entry_id)
+            if not postings:
+                del self._postings[trigram]
+
+    def set_entries(self, entries):
+        """Make the index hold exactly entries; only the differences are indexed."""
+        wanted = set(entries)
+        for entry in [e for e in self._ids if e not in wanted]:
+            self.remove(entry)
+        for entry in entries:
+            self.add(entry)
+
+    def _containing(self, term):
+        """ids of the entries containing term."""
+        if len(term) < 3:
+            return [i for i, hay in self._hay.items() if term in hay]
+        # Intersect the postings, smallest first
+        ids = None
+        for trigram in sorted(trigrams(term), key=lambda t: len(self._postings.get(t, ()))):
+            postings = self._postings.get(trigram)
+            if not postings:
+                return []
+            ids = set(postings) if ids is None else ids & postings
+            if not ids:
+                return []
+        return [i for i in ids if term in self._hay[i]]
+
+    def _matching(self, term):
+        """{id: trigram similarity} of the entries matching one term."""
+        matching = dict.fromkeys(self._containing(term), 1.0)
+        if len(matching) >= FUZZY_BELOW or len(term) < 3:
+            return matching
+        wanted = trigrams(term)
+        counts = collections.Counter()
+        for trigram in wanted:
+            counts.update(self._postings.get(trigram, ()))
+        need = max(1, math.ceil(len(wanted) / 2.0))
+        for i, count in counts.items():
+            if count >= need and i not in matching:
+                matching[i] = count / float(len(wanted))
+        return matching
+
+    def _browse(self, connected, last_used, now, limit):
+        """Results of an empty query: connected and recent first, then by name."""
+        boosted = set()
+        for name in connected:
+            boosted.update(self._by_interface.get(name, ()))
+        boosted.update(self._ids[e] for e in last_used if e in self._ids)
+        first = sorted((-((CONNECTED_BONUS if self._interfaces[i] in connected else 0)
+                          + _recent_bonus(last_used.get(self._entries[i]), now)), self._hay[i], i)
+                       for i in boosted)
+        ids = [i for _, _, i in first]
+        if self._sorted is None:
+            self._sorted = sorted(self._entries, key=self._hay.__getitem__)
+        for i in self._sorted:
+            if limit is not None and len(ids) >= limit:
+                break
+            if i not in boosted:
+                ids.append(i)
+        return [Result(self._entries[i], 0, self._interfaces[i] in connected,
+                       last_used.get(self._entries[i])) for i in ids[:limit]]
+
+    def search(self, query="", connected=(), last_used=None, now=None, limit=None):
+        """Ranked [Result] for query, at most limit of them.
+
+        connected is a set of running interface names, last_used a
+        {entry: unix time} of when entries were last used.
+        """
+        now = now or time.time()
+        last_used = last_used or {}
+        terms, tags = [], []
+        for word in query.lower().split():
+            if word.startswith("is:") and word[3:] in TAGS:
+                tags.append(word[3:])
+            else:
+                terms.append(word)
+
+        if not terms and not tags:
+            return self._browse(connected, last_used, now, limit)
+        candidates = None
+        similarities = []
+        for term in terms:
+            matching = self._matching(term)
+            similarities.append(matching)
+            candidates = set(matching) if candidates is None else candidates & set(matching)
+        if candidates is None and "up" in tags:
+            candidates = set()
+            for name in connected:
+                candidates.update(self._by_interface.get(name, ()))
+        if candidates is None:
+            candidates = self._entries.keys()
+
+        entries, names, hays, interfaces = self._entries, self._names, self._hay, self._interfaces
+        scored = list(zip(terms, similarities))
+        results = []
+        for entry_id in candidates:
+            entry = entries[entry_id]
+            is_up = interfaces[entry_id] in connected
+            used = last_used.get(entry)
+            if tags and not all(
+                    (tag == "up" and is_up) or (tag == "down" and not is_up)
+                    or (tag == "recent" and used) or (tag == "custom" and "/" in entry)
+                    for tag in tags):
+                continue
+            hay = hays[entry_id]
+            score = 0
+            for term, matching in scored:
+                score += _term_score(term, names[entry_id], hay, matching[entry_id])
+            bonus = (CONNECTED_BONUS if is_up else 0) + (_recent_bonus(used, now) if used else 0)
+            results.append((-score, -bonus, hay, entry_id))
+        if limit is not None and limit < len(results):
+            results = heapq.nsmallest(limit, results)
+        else:
+            results.sort()
+        return [Result(entries[i], -score, interfaces[i] in connected, last_used.get(entries[i]))
+                for score, _, _, i in results]
@@ -0,0 +1,47 @@
+"""Startup milestones, recorded for benchmarks/bench_startup.py.
+
+When WG_GUI_STARTUP_TRACE names a file, the GUI appends a line
+``<milestone> <time.monotonic()>`` to it as each milestone is reached and
+closes itself once all of them are in.  CLOCK_MONOTONIC is system-wide,
+so the benchmark can subtract the time it spawned the process.  Without
+the variable every mark is a no-op.
+"""
+import os
+import time
+
+TRACE_ENV = "WG_GUI_STARTUP_TRACE"
+
+# init: __init__ returned; window: first Expose of the main window;
+# interfaces: dropdown filled; status: first status snapshot shown.
+MILESTONES = ("init", "window", "interfaces", "status")
+
+
+class StartupTrace:
+    """Write each milestone once; call on_complete when all are reached."""
+
+    def __init__(self, path=None, on_complete=None, milestones=MILESTONES):
+        self.path = path
+        self.on_complete = on_complete
+        self.milestones = milestones
+        self.reached = {}
+
+    @classmethod
+    def from_env(cls, on_complete=None):
+        return cls(os.environ.get(TRACE_ENV) or None, on_complete)
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    @property
+    def complete(self):
+        return all(name in self.reached for name in self.milestones)
+
+    def mark(self, name):
+        if self.path is None or name in self.reached:
+            return
+        self.reached[name] = time.monotonic()
+        with open(self.path, "a") as f:
+            f.write("%s %.6f\n" % (name, self.reached[name]))
+        if self.complete and self.on_complete is not None:
+            self.on_complete()
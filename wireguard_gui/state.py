@@ -0,0 +1,170 @@
+"""Remembered GUI state in one JSON file.
+
+$XDG_STATE_HOME/wireguard-gui/state.json (next to the accounting files)
+holds everything the GUI remembers between runs:
+
+    last_interface   the interface selected last
+    custom_configs   config paths added with "Browse Config"
+    geometry         {window: "WxH" or "WxH+X+Y"}
+    interfaces       {name: {"last_used": unix time, "last_connected": unix time}}
+
+The file is read once, on first access; after that reads are served from
+memory.  Changes only mark the store dirty and arm a timer, so a burst
+of them (every button press updates ``last_used``) becomes a single
+write WRITE_DELAY seconds later, off the calling thread.  Writes go to a
+temporary file that is renamed over the old one, so a crash leaves
+either the old or the new state and never half a file; a write that
+fails keeps the store dirty and is retried RETRY_DELAY seconds later.  The old
+``~/.wg_gui_last`` and ``~/.wg_gui_custom_configs`` are imported the
+first time, when there is no state file yet.
+"""
+import atexit
+import copy
+import json
+import os
+import threading
+
+from wireguard_gui.accounting import state_dir
+
+STATE_FILE = os.path.join(state_dir(), "state.json")
+LEGACY_LAST_FILE = os.path.expanduser("~/.wg_gui_last")
+LEGACY_CUSTOM_FILE = os.path.expanduser("~/.wg_gui_custom_configs")
+WRITE_DELAY = 1.0
+RETRY_DELAY = 30.0
+VERSION = 1
+
+
+def _read_legacy():
+    data = {}
+    try:
+        with open(LEGACY_LAST_FILE) as f:
+            data["last_interface"] = f.read().strip()
+    except OSError:
+        pass
+    try:
+        with open(LEGACY_CUSTOM_FILE) as f:
+            data["custom_configs"] = [line.strip() for line in f if line.strip()]
+    except OSError:
+        pass
+    return data
+
+
+class StateStore:
+    """In-memory state with coalesced, atomic writes to a JSON file."""
+
+    def __init__(self, path=STATE_FILE, delay=WRITE_DELAY):
+        self.path = path
+        self.delay = delay
+        self.writes = 0
+        self.error = None
+        self._data = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+
+    def _state(self):
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if not isinstance(data, dict):
+                    raise ValueError("not a JSON object")
+            except FileNotFoundError:
+                data = _read_legacy()
+                self._dirty = bool(data)
+            except (OSError, ValueError) as e:
+                # Unreadable or corrupt: keep it aside and start over rather
+                # than fail to start
+                self.error = e
+                data = {}
+                try:
+                    os.replace(self.path, self.path + ".corrupt")
+                except OSError:
+                    pass
+            self._data = data
+        return self._data
+
+    def get(self, key, default=None):
+        """A copy of the value of key (the store's own value cannot be mutated)."""
+        with self._lock:
+            value = self._state().get(key, default)
+            return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def set(self, key, value):
+        with self._lock:
+            data = self._state()
+            if data.get(key) == value:
+                return
+            data[key] = copy.deepcopy(value)
+            self._changed()
+
+    def set_item(self, key, name, value):
+        """Set name in the dict stored under key."""
+        with self._lock:
+            table = self._state().setdefault(key, {})
+            if table.get(name) == value:
+                return
+            table[name] = copy.deepcopy(value)
+            self._changed()
+
+    def interface(self, name):
+        """Metadata remembered for an interface, {} when there is none."""
+        with self._lock:
+            return dict(self._state().get("interfaces", {}).get(name, {}))
+
+    def update_interface(self, name, **fields):
+        with self._lock:
+            entry = self._state().setdefault("interfaces", {}).setdefault(name, {})
+            if all(entry.get(key) == value for key, value in fields.items()):
+                return
+            entry.update(fields)
+            self._changed()
+
+    def _changed(self, delay=None):
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.delay if delay is None else delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes now (the timer calls this; so does close)."""
+        # One writer at a time, each writing what it took under the lock, so
+        # an older state never lands after a newer one.  A change made
+        # during the write re-arms the timer.
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                text = json.dumps(dict(self._data, version=VERSION), indent=1, sort_keys=True)
+            tmp = "%s.%d.tmp" % (self.path, os.getpid())
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp, "w") as f:
+                    f.write(text + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self.writes += 1
+                self.error = None
+            except OSError as e:
+                self.error = e
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                # Nothing was written: keep the changes and try again later
+                with self._lock:
+                    self._changed(RETRY_DELAY)
+
+    def close(self):
+        self.flush()
+
+
+STATE = StateStore()
+atexit.register(STATE.flush)
@@ -0,0 +1,372 @@
+"""WireGuard runtime status.
+
+A single status query is parsed into typed interface and peer records.
+The resulting StatusSnapshot is shared by everything that needs to know
+about running tunnels, so one refresh serves the status indicator, the
+info panel and any other view.
+
+Queries go through a backend: ``cli`` runs ``wg show all dump``,
+``netlink`` (see wireguard_gui.netlink) asks the kernel directly.  The
+default, ``auto``, prefers netlink, so a poll costs no subprocess, and
+falls back to the CLI while netlink fails; set WG_GUI_STATUS_BACKEND to
+force one.
+"""
+import collections
+import errno
+import os
+import shutil
+import subprocess
+import time
+
+from wireguard_gui.timing import TIMINGS
+
+DUMP_CMD = ["wg", "show", "all", "dump"]
+SHOW_CMD = ["wg"]
+BACKEND_ENV = "WG_GUI_STATUS_BACKEND"
+
+# A handshake older than this means the session keys have expired
+# (REJECT_AFTER_TIME in the WireGuard protocol).
+HANDSHAKE_TIMEOUT = 180
+
+# FallbackBackend retries its primary after RETRY_AFTER seconds, doubling
+# up to RETRY_MAX while it keeps failing.
+RETRY_AFTER = 5.0
+RETRY_MAX = 300.0
+# Errors about one device (it went away mid-query), not the backend.
+DEVICE_ERRNOS = (errno.ENODEV, errno.ENXIO)
+
+Interface = collections.namedtuple(
+    "Interface", ["name", "public_key", "listen_port", "fwmark", "peers"]
+)
+
+Peer = collections.namedtuple(
+    "Peer",
+    [
+        "interface",
+        "public_key",
+        "preshared_key",
+        "endpoint",
+        "allowed_ips",
+        "latest_handshake",
+        "rx_bytes",
+        "tx_bytes",
+        "persistent_keepalive",
+    ],
+)
+
+
+class StatusError(Exception):
+    """Raised when WireGuard status cannot be read."""
+
+
+def interface_name(iface):
+    """Return the interface name for an interface name or config path."""
+    if "/" in iface:
+        name = os.path.basename(iface)
+        return name[:-5] if name.endswith(".conf") else name
+    return iface
+
+
+def _none(value):
+    return None if value in ("(none)", "off", "") else value
+
+
+def _int(value):
+    value = _none(value)
+    return int(value) if value is not None else None
+
+
+def parse_dump(text):
+    """Parse ``wg show all dump`` output into {name: Interface}.
+
+    Interface lines have 5 tab separated fields, peer lines 9.  The private
+    key in interface lines is deliberately not kept.
+    """
+    interfaces = collections.OrderedDict()
+    peers = collections.defaultdict(list)
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if not line:
+            continue
+        fields = line.split("\t")
+        try:
+            if len(fields) == 5:
+                name, _private, public, port, fwmark = fields
+                interfaces[name] = (public, _int(port), _none(fwmark))
+            elif len(fields) == 9:
+                name = fields[0]
+                allowed = _none(fields[4])
+                peers[name].append(Peer(
+                    interface=name,
+                    public_key=fields[1],
+                    preshared_key=_none(fields[2]),
+                    endpoint=_none(fields[3]),
+                    allowed_ips=tuple(allowed.split(",")) if allowed else (),
+                    latest_handshake=int(fields[5]),
+                    rx_bytes=int(fields[6]),
+                    tx_bytes=int(fields[7]),
+                    persistent_keepalive=_int(fields[8]),
+                ))
+            else:
+                raise ValueError("unexpected field count %d" % len(fields))
+        except ValueError as e:
+            raise StatusError("line %d of wg dump: %s" % (lineno, e))
+
+    result = collections.OrderedDict()
+    for name, (public, port, fwmark) in interfaces.items():
+        result[name] = Interface(name, public, port, fwmark, tuple(peers.get(name, ())))
+    return result
+
+
+def format_dump(interfaces):
+    """Render {name: Interface} back into ``wg show all dump`` text."""
+    def field(value):
+        return "(none)" if value is None else str(value)
+
+    lines = []
+    for interface in interfaces.values():
+        lines.append("\t".join([interface.name, "(hidden)", field(interface.public_key),
+                                str(interface.listen_port or 0), interface.fwmark or "off"]))
+        for p in interface.peers:
+            lines.append("\t".join([
+                interface.name, p.public_key, field(p.preshared_key), field(p.endpoint),
+                ",".join(p.allowed_ips) or "(none)", str(p.latest_handshake),
+                str(p.rx_bytes), str(p.tx_bytes), str(p.persistent_keepalive or "off"),
+            ]))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class StatusSnapshot:
+    """Parsed state of all running WireGuard interfaces at one point in time."""
+
+    def __init__(self, interfaces=None, error=None, taken_at=None):
+        self.interfaces = interfaces if interfaces is not None else {}
+        self.error = error
+        self.taken_at = taken_at if taken_at is not None else time.time()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def get(self, iface):
+        """Return the Interface for a name or config path, or None."""
+        return self.interfaces.get(interface_name(iface))
+
+    def is_up(self, iface):
+        """True/False for a known state, None when status is unavailable."""
+        if not self.ok:
+            return None
+        return interface_name(iface) in self.interfaces
+
+    def peers(self):
+        for interface in self.interfaces.values():
+            for peer in interface.peers:
+                yield peer
+
+    def latest_handshake(self, iface):
+        interface = self.get(iface)
+        if not interface:
+            return None
+        handshakes = [p.latest_handshake for p in interface.peers if p.latest_handshake]
+        return max(handshakes) if handshakes else None
+
+    def totals(self, iface):
+        """Return (rx_bytes, tx_bytes) summed over all peers of iface."""
+        interface = self.get(iface)
+        if not interface:
+            return 0, 0
+        return (sum(p.rx_bytes for p in interface.peers),
+                sum(p.tx_bytes for p in interface.peers))
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class CliBackend:
+    """Status from the ``wg`` command line tool."""
+
+    name = "cli"
+
+    def __init__(self, dump_cmd=None, show_cmd=None):
+        self.dump_cmd = list(dump_cmd or DUMP_CMD)
+        self.show_cmd = list(show_cmd or SHOW_CMD)
+
+    def available(self):
+        return shutil.which(self.dump_cmd[0]) is not None
+
+    def dump(self):
+        try:
+            out = subprocess.check_output(self.dump_cmd, text=True, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise StatusError(str(e))
+        return parse_dump(out)
+
+    def show(self):
+        try:
+            return subprocess.check_output(self.show_cmd, text=True, stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            return e.output
+        except OSError as e:
+            raise StatusError(str(e))
+
+
+class FallbackBackend:
+    """Use primary; while it fails use fallback, retrying primary with backoff.
+
+    An error about a single device (DEVICE_ERRNOS) is passed on without
+    switching: the backend works, the interface just went away.
+    """
+
+    def __init__(self, primary, fallback, clock=time.monotonic):
+        self.primary = primary
+        self.fallback = fallback
+        self.clock = clock
+        self.failures = 0
+        self.retry_at = None
+        self.last_error = None
+        self.active = primary
+        if not primary.available():
+            self._failed(StatusError("%s backend not available" % primary.name))
+
+    @property
+    def name(self):
+        return self.active.name
+
+    def available(self):
+        return self.active.available()
+
+    def _failed(self, error):
+        self.last_error = error
+        self.failures += 1
+        self.retry_at = self.clock() + min(RETRY_MAX, RETRY_AFTER * 2 ** (self.failures - 1))
+        self.active = self.fallback
+
+    def _call(self, method):
+        if self.active is not self.primary and self.clock() >= self.retry_at:
+            self.active = self.primary
+        if self.active is self.primary:
+            try:
+                result = getattr(self.primary, method)()
+            except StatusError as e:
+                if getattr(e, "errno", None) in DEVICE_ERRNOS:
+                    raise
+                self._failed(e)
+            else:
+                self.failures = 0
+                return result
+        return getattr(self.fallback, method)()
+
+    def dump(self):
+        return self._call("dump")
+
+    def show(self):
+        return self._call("show")
+
+
+def make_backend(name=None):
+    """Create a status backend: "auto" (default), "netlink" or "cli"."""
+    name = name or os.environ.get(BACKEND_ENV) or "auto"
+    if name == "cli":
+        return CliBackend()
+    from wireguard_gui.netlink import NetlinkBackend
+    if name == "netlink":
+        return NetlinkBackend()
+    if name == "auto":
+        return FallbackBackend(NetlinkBackend(), CliBackend())
+    raise ValueError("unknown status backend %r" % name)
+
+
+class StatusEngine:
+    """Owns the current StatusSnapshot and refreshes it on demand."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or make_backend()
+        self.snapshot = StatusSnapshot(error="not refreshed yet")
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Call callback(snapshot) after every refresh."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def query(self):
+        """Query the backend and return a new snapshot (no side effects)."""
+        with TIMINGS.timer("status query"):
+            try:
+                return StatusSnapshot(self.backend.dump())
+            except StatusError as e:
+                return StatusSnapshot(error=str(e))
+
+    def show(self):
+        """Human readable status of all interfaces, like ``wg show``."""
+        return self.backend.show()
+
+    def publish(self, snapshot):
+        with TIMINGS.timer("status publish"):
+            self.snapshot = snapshot
+            for callback in list(self._listeners):
+                callback(snapshot)
+        return snapshot
+
+    def refresh(self):
+        return self.publish(self.query())
+
+
+# ---------------------------
+# Formatting helpers
+# ---------------------------
+def format_bytes(count):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if count < 1024:
+            return ("%d %s" if unit == "B" else "%.1f %s") % (count, unit)
+        count /= 1024.0
+    return "%.1f TiB" % count
+
+
+def format_age(timestamp, now=None):
+    """Describe how long ago a unix timestamp was, e.g. '42s ago'."""
+    if not timestamp:
+        return "never"
+    age = int((now or time.time()) - timestamp)
+    if age < 60:
+        return "%ds ago" % age
+    if age < 3600:
+        return "%dm ago" % (age // 60)
+    if age < 86400:
+        return "%dh ago" % (age // 3600)
+    return "%dd ago" % (age // 86400)
+
+
+def format_show(interfaces, now=None):
+    """Render {name: Interface} the way ``wg show`` does."""
+    now = now or time.time()
+    lines = []
+    for interface in interfaces.values():
+        if lines:
+            lines.append("")
+        lines.append("interface: %s" % interface.name)
+        if interface.public_key:
+            lines.append("  public key: %s" % interface.public_key)
+        lines.append("  private key: (hidden)")
+        if interface.listen_port:
+            lines.append("  listening port: %d" % interface.listen_port)
+        if interface.fwmark:
+            lines.append("  fwmark: %s" % interface.fwmark)
+        for peer in interface.peers:
+            lines.append("")
+            lines.append("peer: %s" % peer.public_key)
+            if peer.preshared_key:
+                lines.append("  preshared key: (hidden)")
+            if peer.endpoint:
+                lines.append("  endpoint: %s" % peer.endpoint)
+            lines.append("  allowed ips: %s" % (", ".join(peer.allowed_ips) or "(none)"))
+            if peer.latest_handshake:
+                lines.append("  latest handshake: %s" % format_age(peer.latest_handshake, now))
+            if peer.rx_bytes or peer.tx_bytes:
+                lines.append("  transfer: %s received, %s sent" % (
+                    format_bytes(peer.rx_bytes), format_bytes(peer.tx_bytes)))
+            if peer.persistent_keepalive:
+                lines.append("  persistent keepalive: every %d seconds" % peer.persistent_keepalive)
+    return "\n".join(lines) + "\n" if lines else ""
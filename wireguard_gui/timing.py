@@ -0,0 +1,227 @@
+"""Latency histograms for hot paths, and an on-demand cProfile capture.
+
+TIMINGS collects how long named operations take: commands (by program
+and subcommand, so "sudo wg-quick up office" counts as "wg-quick up"),
+helper requests, status queries and publishing, console flushes, config
+scans and every button handler.  Each operation gets a Histogram with
+log-spaced buckets (2^(1/8) apart, about 9%), so recording is O(1) and
+p50/p95/p99 come out within a bucket of the truth regardless of how many
+samples there are.  Recording is thread safe; workers record too.
+
+The Profiler wraps cProfile for the Tk thread only: worker threads are
+already covered by the histograms, and profiling them all would slow
+everything down enough to change what is being measured.
+"""
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import math
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+
+# Buckets start at 1 us and grow by 2^(1/8): 8 per doubling up to ~1000 s.
+MIN_SECONDS = 1e-6
+STEPS_PER_DOUBLING = 8
+BUCKETS = STEPS_PER_DOUBLING * 30
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Fixed log-bucket latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def bucket(seconds):
+        if seconds <= MIN_SECONDS:
+            return 0
+        return min(BUCKETS - 1, int(math.log2(seconds / MIN_SECONDS) * STEPS_PER_DOUBLING))
+
+    def record(self, seconds):
+        self.counts[self.bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Approximate percentile in seconds (bucket midpoint, clamped to min/max)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                value = MIN_SECONDS * 2 ** ((index + 0.5) / STEPS_PER_DOUBLING)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        result = {"count": self.count, "total": self.total,
+                  "mean": self.total / self.count if self.count else None,
+                  "min": self.min, "max": self.max}
+        for percent in PERCENTILES:
+            result["p%d" % percent] = self.percentile(percent)
+        return result
+
+
+class Timings:
+    """Named histograms; see TIMINGS."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        """Decorator recording every call of the function under name."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.started = time.time()
+
+    def summary(self):
+        """{name: {count, total, mean, min, max, p50, p95, p99}} in seconds."""
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+
+TIMINGS = Timings()
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return "%.0f µs" % (seconds * 1e6)
+    if seconds < 1:
+        return "%.1f ms" % (seconds * 1e3)
+    return "%.2f s" % seconds
+
+
+def command_kind(cmd):
+    """Operation name of a command line: program and subcommand, no sudo or targets."""
+    args = list(cmd)
+    if args and os.path.basename(args[0]) == "sudo":
+        args = args[1:]
+        while args and args[0].startswith("-"):
+            args = args[1:]
+    if not args:
+        return "command"
+    program = os.path.basename(args[0])
+    if program.startswith("python") and args[1:2] == ["-m"]:
+        return "python -m %s" % args[2] if len(args) > 2 else program
+    if program in ("wg", "wg-quick", "ip") and len(args) > 1 and not args[1].startswith("-"):
+        return "%s %s" % (program, args[1])
+    return program
+
+
+class Profiler:
+    """Toggleable cProfile capture of the calling (Tk) thread."""
+
+    def __init__(self):
+        self.profile = None
+        self.stats = None
+        self.started = None
+        self.duration = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        if self.profile is not None:
+            return
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        if self.profile is None:
+            return
+        self.profile.disable()
+        self.duration = time.perf_counter() - self.started
+        self.stats = pstats.Stats(self.profile)
+        self.profile = None
+
+    def report(self, limit=30, sort="cumulative"):
+        """Text of the top functions of the last capture."""
+        if self.stats is None:
+            return ""
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats(sort).print_stats(limit)
+        return "%.1fs captured\n%s" % (self.duration, out.getvalue())
+
+    def top(self, limit=50):
+        """[{function, calls, tottime, cumtime}] of the last capture, by cumulative time."""
+        if self.stats is None:
+            return []
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in self.stats.stats.items():
+            rows.append({"function": "%s:%d(%s)" % (filename, line, name), "calls": calls,
+                         "tottime": tottime, "cumtime": cumtime})
+        rows.sort(key=lambda row: row["cumtime"], reverse=True)
+        return rows[:limit]
+
+
+def report(timings=TIMINGS, profiler=None, extra=None):
+    """Everything a bug report needs, as a JSON-serializable dict."""
+    data = {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "since": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(timings.started)),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timings": timings.summary(),
+    }
+    if profiler is not None and profiler.stats is not None:
+        data["profile"] = {"seconds": profiler.duration, "top": profiler.top()}
+    if extra:
+        data.update(extra)
+    return data
+
+
+def export(path, timings=TIMINGS, profiler=None, extra=None):
+    with open(path, "w") as f:
+        json.dump(report(timings, profiler, extra), f, indent=2)
+        f.write("\n")
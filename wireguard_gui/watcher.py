@@ -0,0 +1,398 @@
+"""Config file discovery that follows the filesystem instead of rescanning.
+
+ConfigWatcher lists each watched directory once and afterwards reports
+only what changed: configs added, removed, renamed or rewritten.  On
+Linux it uses inotify (through ctypes, no extra dependency); directories
+inotify cannot watch (root-only /etc/wireguard, or no inotify at all)
+are polled instead, and polling only lists a directory again when its
+mtime changed.  A watched directory that is deleted or moved away is
+polled until it exists again, and then watched again.
+
+Changes are delivered in batches of Change tuples to ``on_changes``,
+through ``post`` when given so a GUI receives them on its own thread.
+"""
+import collections
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+CONFIG_SUFFIX = ".conf"
+POLL_INTERVAL = 5.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 65536
+
+# kind is "added", "removed", "changed" or "renamed" (old_path set).
+Change = collections.namedtuple("Change", "kind path old_path")
+
+
+class Inotify:
+    """Minimal inotify binding: add/remove watches, read raw events."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = (ctypes.c_int, ctypes.c_int)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._add(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm(self.fd, wd)
+
+    def read(self):
+        """[(wd, mask, cookie, name)] for all queued events."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, cookie, name))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class _Dir:
+    """A watched directory: all configs in it, or only some file names."""
+
+    def __init__(self, path, names=None):
+        self.path = path
+        self.names = names
+        self.known = set()
+        self.stamps = {}
+        self.stamp = None
+        self.wd = None
+
+    def matches(self, name):
+        if self.names is None:
+            return name.endswith(CONFIG_SUFFIX)
+        return name in self.names
+
+    def join(self, name):
+        return os.path.join(self.path, name)
+
+
+def _dir_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ino)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ConfigWatcher:
+    """Report config files appearing, disappearing or changing.
+
+    ``list_dir`` lists a directory the watcher cannot read itself (e.g.
+    through the privileged helper); it may return names with or without
+    the .conf suffix.
+    """
+
+    def __init__(self, on_changes, post=None, poll_interval=POLL_INTERVAL, list_dir=None,
+                 use_inotify=True):
+        self.on_changes = on_changes
+        self.post = post
+        self.poll_interval = poll_interval
+        self.list_dir = list_dir
+        self._dirs = {}
+        self._by_wd = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._wake_r, self._wake_w = os.pipe()
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None
+
+    @property
+    def backend(self):
+        return "inotify" if self.inotify is not None else "poll"
+
+    @property
+    def polled(self):
+        """Directories that are polled rather than watched."""
+        with self._lock:
+            return sorted(d.path for d in self._dirs.values() if d.wd is None)
+
+    # ---------------------------
+    # Watches
+    # ---------------------------
+    def watch_dir(self, path):
+        """Watch every config in path; returns the configs there now."""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._dirs.get(path)
+            if entry is None:
+                entry = self._dirs[path] = _Dir(path)
+                self._attach(entry)
+            elif entry.names is not None:
+                entry.names = None
+                self._scan(entry)
+            return sorted(entry.join(name) for name in entry.known)
+
+    def watch_file(self, path):
+        """Watch a single file; returns whether it exists now."""
+        directory, name = os.path.split(os.path.abspath(path))
+        with self._lock:
+            entry = self._dirs.get(directory)
+            if entry is None:
+                entry = self._dirs[directory] = _Dir(directory, {name})
+                self._attach(entry)
+            elif entry.names is not None and name not in entry.names:
+                entry.names.add(name)
+                if os.path.exists(path):
+                    entry.known.add(name)
+                    entry.stamps[name] = _file_stamp(path)
+            return name in entry.known
+
+    def unwatch_file(self, path):
+        directory, name = os.path.split(os.path.abspath(path))
+        with self._lock:
+            entry = self._dirs.get(directory)
+            if entry is None or entry.names is None:
+                return
+            entry.names.discard(name)
+            entry.known.discard(name)
+            entry.stamps.pop(name, None)
+            if not entry.names:
+                self._detach(entry)
+                del self._dirs[directory]
+
+    def _attach(self, entry):
+        """Watch entry if inotify can, and list it; returns the Changes."""
+        # Watch before listing so nothing created in between is missed.
+        if self.inotify is not None:
+            try:
+                entry.wd = self.inotify.add_watch(entry.path)
+                self._by_wd[entry.wd] = entry
+            except OSError:
+                entry.wd = None
+        return self._scan(entry)
+
+    def _detach(self, entry):
+        if entry.wd is not None:
+            self._by_wd.pop(entry.wd, None)
+            self.inotify.rm_watch(entry.wd)
+            entry.wd = None
+
+    def _list(self, entry):
+        try:
+            names = os.listdir(entry.path)
+        except PermissionError:
+            if self.list_dir is None:
+                return []
+            names = [n if n.endswith(CONFIG_SUFFIX) else n + CONFIG_SUFFIX
+                     for n in self.list_dir(entry.path)]
+        except OSError:
+            return []
+        return [name for name in names if entry.matches(name)]
+
+    def _scan(self, entry):
+        """(Re)list entry; returns the Changes against what was known."""
+        entry.stamp = _dir_stamp(entry.path)
+        if entry.stamp is None:
+            names = set()
+        elif entry.names is not None:
+            # A few files in a possibly huge directory: stat, don't list.
+            names = {name for name in entry.names if os.path.exists(entry.join(name))}
+        else:
+            names = set(self._list(entry))
+        changes = [Change("added", entry.join(n), None) for n in sorted(names - entry.known)]
+        changes += [Change("removed", entry.join(n), None) for n in sorted(entry.known - names)]
+        entry.known = names
+        if entry.names is not None:
+            entry.stamps = {name: _file_stamp(entry.join(name)) for name in names}
+        return changes
+
+    def rescan(self):
+        """List every watched directory again and report the differences.
+
+        Only needed where inotify cannot see changes (e.g. files changed
+        on another NFS client); normal operation never rescans.
+        """
+        with self._lock:
+            changes = []
+            for entry in self._dirs.values():
+                changes += self._attach(entry) if entry.wd is None else self._scan(entry)
+        if changes:
+            self._deliver(changes)
+        return changes
+
+    # ---------------------------
+    # Event loop
+    # ---------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="config-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._wake_r is None:
+            return
+        self._stopped = True
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+        # A second stop() must not close fd numbers reused since
+        self._wake_r = self._wake_w = None
+
+    def _loop(self):
+        fds = [self._wake_r] + ([self.inotify.fd] if self.inotify is not None else [])
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stopped:
+            with self._lock:
+                polling = any(d.wd is None for d in self._dirs.values())
+            timeout = max(0.0, next_poll - time.monotonic()) if polling else None
+            try:
+                ready, _, _ = select.select(fds, [], [], timeout)
+            except InterruptedError:
+                continue
+            if self._stopped:
+                return
+            changes = []
+            with self._lock:
+                if self.inotify is not None and self.inotify.fd in ready:
+                    changes += self._handle_events(self.inotify.read())
+                if polling and time.monotonic() >= next_poll:
+                    changes += self._poll()
+                    next_poll = time.monotonic() + self.poll_interval
+            if changes:
+                self._deliver(changes)
+
+    def _deliver(self, changes):
+        if self.post is not None:
+            self.post(self.on_changes, changes)
+        else:
+            self.on_changes(changes)
+
+    def _handle_events(self, events):
+        changes = []
+        moved = {}
+        for wd, mask, cookie, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: resynchronise every watched directory.
+                for entry in self._dirs.values():
+                    if entry.wd is not None:
+                        changes += self._scan(entry)
+                continue
+            entry = self._by_wd.get(wd)
+            if entry is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                # The directory itself went away; poll until it comes back.
+                self._detach(entry)
+                changes += [Change("removed", entry.join(n), None) for n in sorted(entry.known)]
+                entry.known = set()
+                entry.stamps = {}
+                entry.stamp = None
+                continue
+            if mask & IN_ISDIR or not entry.matches(name):
+                continue
+            path = entry.join(name)
+            if mask & IN_MOVED_FROM:
+                if name in entry.known:
+                    entry.known.discard(name)
+                    moved[cookie] = path
+            elif mask & IN_MOVED_TO:
+                old = moved.pop(cookie, None)
+                if name in entry.known:
+                    if old is not None:
+                        changes.append(Change("removed", old, None))
+                    changes.append(Change("changed", path, None))
+                else:
+                    entry.known.add(name)
+                    changes.append(Change("renamed", path, old) if old else Change("added", path, None))
+            elif mask & IN_CREATE:
+                if name not in entry.known:
+                    entry.known.add(name)
+                    changes.append(Change("added", path, None))
+            elif mask & IN_DELETE:
+                if name in entry.known:
+                    entry.known.discard(name)
+                    changes.append(Change("removed", path, None))
+            elif mask & IN_CLOSE_WRITE:
+                changes.append(Change("changed", path, None))
+        # Moved out of every watched directory.
+        changes += [Change("removed", path, None) for path in moved.values()]
+        return changes
+
+    def _poll(self):
+        changes = []
+        for entry in self._dirs.values():
+            if entry.wd is not None:
+                continue
+            stamp = _dir_stamp(entry.path)
+            if stamp != entry.stamp:
+                # Maybe a deleted directory is back: watch it again
+                changes += self._attach(entry) if stamp is not None else self._scan(entry)
+            elif entry.names is not None:
+                # Only a handful of explicitly watched files: stat them.
+                for name in entry.known:
+                    path = entry.join(name)
+                    file_stamp = _file_stamp(path)
+                    if file_stamp != entry.stamps.get(name):
+                        entry.stamps[name] = file_stamp
+                        changes.append(Change("changed", path, None))
+        return changes